@@ -6,6 +6,7 @@ from fastapi import APIRouter
 
 from api.v1.users.routes import router as users_router
 from api.v1.organizations.routes import router as organization_router
+from api.v1.jobs.routes import router as jobs_router
 
 # from api.v1.events.routes import router as events_router
 # from api.v1.associateds.routes import router as associateds_router
@@ -29,6 +30,9 @@ v1_router.include_router(
     organization_router, prefix="/organizations", tags=["Organizations"]
 )
 
+# --- Jobs router --- #
+v1_router.include_router(jobs_router, prefix="/jobs", tags=["Jobs"])
+
 # # --- Events router --- #
 # v1_router.include_router(events_router, prefix="/events", tags=["Events"])
 
@@ -3,13 +3,26 @@ Agenda - Controller
 """
 
 # build-in imports
-from uuid import uuid4
-from typing import List
+from typing import AsyncIterator, List
+
+# external imports
+from tortoise.transactions import in_transaction
 
 # module imports
 from auth.service import check_authorization_on_event
-from .models import AgendaModel
-from .schemas import Day, DayIn, DayOut, ConferenceIn, ConferenceOut
+from db.loader import BatchLoader
+from api.v1.speakers.controller import SpeakerController
+from .export import bump_agenda_version
+from .intervals import find_overlaps
+from .models import AgendaDaysModel, ConferencesModel
+from .schemas import (
+    Day,
+    DayIn,
+    DayOut,
+    ConferenceIn,
+    ConferenceOut,
+    ConferencesConflict,
+)
 
 
 class AgendaControllerModel:
@@ -18,7 +31,8 @@ class AgendaControllerModel:
     """
 
     def __init__(self):
-        self.model = AgendaModel
+        self.model = AgendaDaysModel
+        self.conferences = ConferencesModel
 
     async def create_day(self, day: DayIn, user: dict) -> DayOut:
         """
@@ -27,21 +41,16 @@ class AgendaControllerModel:
         if not check_authorization_on_event(user, day.event):
             return 403
 
-        query = {"event": day.event, "date": day.date}
-        existing_day = await self.model.find(query)
+        existing_day = await self.model.filter(event=day.event, date=day.date).exists()
         if existing_day:
             return 409
 
-        day_data: dict = day.dict()
-        day_data.update({"uuid": str(uuid4())})
-
-        new_day = Day(**day_data)
-
-        inserted_id = await self.model.create(new_day.dict())
-        if not inserted_id:
+        new_day = await self.model.create(**day.dict())
+        if not new_day:
             return False
 
-        return DayOut(**new_day.dict())
+        await bump_agenda_version(new_day.event)
+        return DayOut(**self._day_to_dict(new_day), conferences=[])
 
     async def create_conference(
         self, day_id: str, conference: ConferenceIn, user: dict
@@ -49,100 +58,107 @@ class AgendaControllerModel:
         """
         Add a new conference to one day.
         """
-        query = {"uuid": day_id}
-        day = await self.model.find(query)
+        day = await self.model.get_or_none(id=day_id)
 
         if not day:
             return 404
-        if not check_authorization_on_event(user, day["event"]):
+        if not check_authorization_on_event(user, day.event):
             return 403
 
-        conference_data: dict = conference.dict()
-        conference_data.update({"uuid": str(uuid4())})
-        conference_data.update({"speakerInfo": {}})
+        async with in_transaction() as connection:
+            await self._lock_day(day.id, connection)
+            conflict = await self._check_overlaps(day.id, conference, connection)
+            if conflict:
+                return conflict
 
-        inserted_id = await self.model.add_to_set(
-            query,
-            "conferences",
-            conference_data,
-        )
+            new_conference = await self.conferences.create(
+                day=day, using_db=connection, **self._conference_to_db(conference)
+            )
 
-        if not inserted_id:
+        if not new_conference:
             return False
-        return ConferenceOut(**conference_data)
+
+        await bump_agenda_version(day.event)
+        return ConferenceOut(**self._conference_to_dict(new_conference))
 
     async def read_day(self, day_id: str) -> DayOut:
         """
         Retrieve a existing day
         """
-        query = {"uuid": day_id}
-        day = await self.model.find(query)
+        day = await self.model.get_or_none(id=day_id)
         if not day:
             return False
 
-        for i in range(len(day["conferences"])):
-            speaker_info = await self.model.find_from_foregyn_key(
-                "speakers", [day["conferences"][i]["speaker"]]
-            )
-            day["conferences"][i]["speakerInfo"] = speaker_info[0]
-
-        return DayOut(**day)
+        days = await self._populate_days([day], self._speakers_loader())
+        return days[0]
 
     async def read_all_days(self, event_id: str) -> List[DayOut]:
         """
         Retrieve a list of days
         """
-        days = await self.model.find({"event": event_id}, only_one=False)
+        days = await self.model.filter(event=event_id).order_by("date")
 
         if len(days) == 0:
             return []
 
-        populated_days = []
-        for day in days:
-            all_day_info = await self.read_day(day["uuid"])
-            populated_days.append(all_day_info)
+        # All the speakers of all days are resolved in a single query.
+        return await self._populate_days(days, self._speakers_loader())
+
+    async def stream_days(self, event_id: str) -> AsyncIterator[DayOut]:
+        """
+        Yield the days of one event one by one (constant memory exports).
+        All the speakers of the event are resolved in a single query.
+        """
+        days = await self.model.filter(event=event_id).order_by("date")
+
+        speakers = self._speakers_loader()
+        speakers.add(
+            await self.conferences.filter(day__event=event_id)
+            .distinct()
+            .values_list("speaker", flat=True)
+        )
+        await speakers.dispatch()
 
-        return populated_days
+        for day in days:
+            populated_days = await self._populate_days([day], speakers)
+            yield populated_days[0]
 
     async def get_conference(self, conference_id: str) -> ConferenceOut:
         """
         Return a conference.
         """
-        day = await self.model.find({"conferences.uuid": conference_id})
-        if not day:
+        conference = await self.conferences.get_or_none(id=conference_id)
+        if not conference:
             return False
 
-        _conferences = day["conferences"]
-        _conference = [conf for conf in _conferences if conf["uuid"] == conference_id]
-        conference = _conference[0]
-
-        speaker_info = await self.model.find_from_foregyn_key(
-            "speakers", [conference["speaker"]]
-        )
-        conference["speakerInfo"] = speaker_info[0]
-        return conference
+        conference_data = self._conference_to_dict(conference)
+        speaker_info = await self._speakers_loader().load(conference.speaker)
+        conference_data["speakerInfo"] = speaker_info or {}
+        return conference_data
 
     async def update_day(self, day_id: str, new_day_data: DayIn, user: dict) -> int:
         """
         Update a existing day
         """
-        query = {"uuid": day_id}
-        day = await self.model.find(query)
+        day = await self.model.get_or_none(id=day_id)
 
         if not day:
             return 404
-        if day["event"] != new_day_data.event:
+        if day.event != new_day_data.event:
             return 412
-        if not check_authorization_on_event(user, day["event"]):
+        if not check_authorization_on_event(user, day.event):
             return 403
 
-        ocuped_date = await self.model.find({"date": new_day_data.date})
-        if ocuped_date["uuid"] != day_id:
+        ocuped_date = (
+            await self.model.filter(event=day.event, date=new_day_data.date)
+            .exclude(id=day_id)
+            .exists()
+        )
+        if ocuped_date:
             return 409
 
-        new_data = new_day_data.dict()
-        updated = await self.model.update(query, new_data)
-
+        updated = await self.model.filter(id=day_id).update(**new_day_data.dict())
+        await bump_agenda_version(day.event)
         return updated
 
     async def update_conference(
@@ -151,58 +167,192 @@ class AgendaControllerModel:
         """
         Update a existing conference.
         """
-        day = await self.model.find({"conferences.uuid": conference_id})
+        conference = await self._get_conference_with_day(conference_id)
 
-        if not day:
+        if not conference:
             return 404
-        if not check_authorization_on_event(user, day["event"]):
+        if not check_authorization_on_event(user, conference.day.event):
             return 403
 
-        conference: dict = conference_data.dict()
-        conference.update({"uuid": conference_id})
-        conference.update({"speakerInfo": {}})
-
-        query = {"uuid": day["uuid"], "conferences.uuid": conference_id}
-        data = {"conferences.$": conference}
-        updated = await self.model.update(query, data)
+        async with in_transaction() as connection:
+            await self._lock_day(conference.day_id, connection)
+            conflict = await self._check_overlaps(
+                conference.day_id, conference_data, connection, exclude_id=conference_id
+            )
+            if conflict:
+                return conflict
+
+            # Only the row of this conference is rewritten.
+            updated = (
+                await self.conferences.filter(id=conference_id)
+                .using_db(connection)
+                .update(**self._conference_to_db(conference_data))
+            )
 
+        await bump_agenda_version(conference.day.event)
         return updated
 
     async def delete_conferene(self, conference_id: str, user: dict) -> int:
         """
         Remove a conference from a day
         """
-        day = await self.model.find({"conferences.uuid": conference_id})
+        conference = await self._get_conference_with_day(conference_id)
 
-        if not day:
+        if not conference:
             return 404
-        if not check_authorization_on_event(user, day["event"]):
+        if not check_authorization_on_event(user, conference.day.event):
             return 403
 
-        query = {"uuid": day["uuid"]}
-        array_name = "conferences"
-        condition = {"uuid": conference_id}
-        deleted = await self.model.pull_array(query, array_name, condition)
-
+        deleted = await self.conferences.filter(id=conference_id).delete()
+        await bump_agenda_version(conference.day.event)
         return deleted
 
     async def delete_day(self, day_id: str, user: dict) -> int:
         """
         Delete a day
         """
-        query = {"uuid": day_id}
-        day = await self.model.find(query)
+        day = await self.model.get_or_none(id=day_id)
 
         if not day:
             return 404, None
-        if not check_authorization_on_event(user, day["event"]):
+        if not check_authorization_on_event(user, day.event):
             return 403, None
 
-        deleted = await self.model.delete(query)
+        # The conferences of the day are removed on cascade.
+        deleted = await self.model.filter(id=day_id).delete()
+        await bump_agenda_version(day.event)
 
-        day["conferences"] = []
-        day = Day(**day)
+        day = Day(**self._day_to_dict(day), conferences=[])
         return deleted, day
 
+    async def _get_conference_with_day(self, conference_id: str) -> ConferencesModel:
+        """
+        Return a conference with its day fetched (needed to check authorization).
+        """
+        conference = await self.conferences.get_or_none(id=conference_id)
+        if conference:
+            await conference.fetch_related("day")
+        return conference
+
+    async def _lock_day(self, day_id: str, connection) -> None:
+        """
+        Lock the day row until the end of the transaction. The conferences of
+        one day are checked and written one transaction at a time, then two
+        concurrent requests can't both pass the overlap check.
+        """
+        await self.model.filter(id=day_id).select_for_update().using_db(
+            connection
+        ).first()
+
+    async def _check_overlaps(
+        self,
+        day_id: str,
+        conference: ConferenceIn,
+        connection,
+        exclude_id: str = None,
+    ) -> ConferencesConflict:
+        """
+        Look for the conferences of the same day that overlap the passed one
+        in the same room or with the same speaker.
+        Return None if there are not conflicts.
+        * Call it with the day locked (_lock_day) in the same transaction.
+        """
+        same_day = self.conferences.filter(day_id=day_id).using_db(connection)
+        if exclude_id:
+            same_day = same_day.exclude(id=exclude_id)
+
+        start, end = conference.startHour, conference.endHour
+        same_room = await find_overlaps(
+            same_day.filter(room=conference.room), start, end
+        )
+        same_speaker = await find_overlaps(
+            same_day.filter(speaker=conference.speaker), start, end
+        )
+
+        conflicts = {overlap.id: overlap for overlap in same_room + same_speaker}
+        if not conflicts:
+            return None
+
+        return ConferencesConflict(
+            message="The conference overlaps with other talks",
+            conflicts=[
+                self._conference_to_dict(overlap) for overlap in conflicts.values()
+            ],
+        )
+
+    def _speakers_loader(self) -> BatchLoader:
+        """
+        Return a new (request scoped) loader for the speakers table.
+        """
+        return BatchLoader(SpeakerController.find_many)
+
+    async def _populate_days(
+        self, days: List[AgendaDaysModel], speakers: BatchLoader
+    ) -> List[DayOut]:
+        """
+        Build the days response with the conferences of all the passed days
+        (one query) and the speakerInfo of every conference.
+        """
+        conferences = await self.conferences.filter(
+            day_id__in=[day.id for day in days]
+        ).order_by("day_id", "start_hour")
+
+        speakers_info = await speakers.load_many(
+            conference.speaker for conference in conferences
+        )
+
+        conferences_by_day = {day.id: [] for day in days}
+        for conference, speaker_info in zip(conferences, speakers_info):
+            conference_data = self._conference_to_dict(conference)
+            conference_data["speakerInfo"] = speaker_info or {}
+            conferences_by_day[conference.day_id].append(conference_data)
+
+        return [
+            DayOut(**self._day_to_dict(day), conferences=conferences_by_day[day.id])
+            for day in days
+        ]
+
+    @staticmethod
+    def _day_to_dict(day: AgendaDaysModel) -> dict:
+        """
+        Map a day row to the day schema fields.
+        """
+        return {
+            "uuid": str(day.id),
+            "event": day.event,
+            "date": day.date,
+            "title": day.title,
+        }
+
+    @staticmethod
+    def _conference_to_dict(conference: ConferencesModel) -> dict:
+        """
+        Map a conference row to the conference schema fields.
+        """
+        return {
+            "uuid": str(conference.id),
+            "name": conference.name,
+            "startHour": conference.start_hour,
+            "endHour": conference.end_hour,
+            "description": conference.description,
+            "speaker": conference.speaker,
+            "room": conference.room,
+            "speakerInfo": {},
+        }
+
+    @staticmethod
+    def _conference_to_db(conference: ConferenceIn) -> dict:
+        """
+        Map the conference schema to the table columns.
+        """
+        return {
+            "name": conference.name,
+            "start_hour": conference.startHour,
+            "end_hour": conference.endHour,
+            "description": conference.description,
+            "speaker": conference.speaker,
+            "room": conference.room,
+        }
+
 
 AgendaController = AgendaControllerModel()
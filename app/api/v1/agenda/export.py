@@ -0,0 +1,225 @@
+"""
+Agenda - Export (iCalendar and NDJSON).
+
+The exports are streamed day by day and the rendered chunks are cached in
+redis under the current agenda version. Every write on the agenda bumps the
+version, then the cache is valid until the agenda changes.
+"""
+
+import time
+from datetime import datetime
+from typing import AsyncIterator
+from uuid import uuid4
+
+from fastapi.concurrency import run_in_threadpool
+
+from worker.connection import redis_connection
+from .schemas import DayOut
+
+
+###################
+# Export Settings #
+###################
+
+CACHE_TTL = 60 * 60 * 24  # One day
+CACHE_PAGE_SIZE = 32
+
+ICAL_MEDIA_TYPE = "text/calendar; charset=utf-8"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+###################
+# Agenda Versions #
+###################
+
+
+def _version_key(event_id: str) -> str:
+    return f"agenda:{event_id}:version"
+
+
+def _get_version(event_id: str) -> str:
+    """
+    Return the agenda version. The first version is seeded with a timestamp,
+    then a flushed redis never repeats an old version (and its ETag).
+    """
+    key = _version_key(event_id)
+    redis_connection.set(key, time.time_ns(), nx=True)
+    return redis_connection.get(key).decode()
+
+
+def _bump_version(event_id: str) -> None:
+    key = _version_key(event_id)
+    pipeline = redis_connection.pipeline()
+    pipeline.set(key, time.time_ns(), nx=True)
+    pipeline.incr(key)
+    pipeline.execute()
+
+
+async def agenda_version(event_id: str) -> str:
+    """
+    Return the current version of the agenda of one event.
+    """
+    return await run_in_threadpool(_get_version, event_id)
+
+
+async def bump_agenda_version(event_id: str) -> None:
+    """
+    Invalidate the exports of one event. Call it on every agenda write.
+    """
+    await run_in_threadpool(_bump_version, event_id)
+
+
+#############
+# Renderers #
+#############
+
+
+def _ical_escape(text: str) -> str:
+    """
+    Escape a TEXT value (RFC 5545 - 3.3.11).
+    """
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _ical_line(line: str) -> str:
+    """
+    Fold a content line in chunks of max 75 octets (RFC 5545 - 3.1).
+    """
+    folded, current, size = [], [], 0
+    for char in line:
+        char_size = len(char.encode())
+        if size + char_size > 75:
+            folded.append("".join(current))
+            current, size = [" "], 1
+        current.append(char)
+        size += char_size
+    folded.append("".join(current))
+    return "\r\n".join(folded) + "\r\n"
+
+
+def _ical_datetime(date: datetime, hour: str) -> str:
+    """
+    Floating local time (the event timezone is not stored in the agenda).
+    """
+    return f"{date:%Y%m%d}T{hour.replace(':', '')}00"
+
+
+def _ical_events(day: DayOut, stamp: str) -> str:
+    """
+    Render the VEVENTs of the conferences of one day.
+    Days without a ISO date (YYYY-MM-DD) can't be placed in a calendar.
+    """
+    try:
+        date = datetime.strptime(day.date[:10], "%Y-%m-%d")
+    except ValueError:
+        return ""
+
+    lines = []
+    for conference in day.conferences:
+        speaker_name = conference.speakerInfo.get("name", "")
+        description = conference.description
+        if speaker_name:
+            description = f"{speaker_name}\n\n{description}"
+
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{conference.uuid}@unu",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{_ical_datetime(date, conference.startHour)}",
+            f"DTEND:{_ical_datetime(date, conference.endHour)}",
+            f"SUMMARY:{_ical_escape(conference.name)}",
+            f"DESCRIPTION:{_ical_escape(description)}",
+        ]
+        if conference.room:
+            lines.append(f"LOCATION:{_ical_escape(conference.room)}")
+        lines.append("END:VEVENT")
+
+    return "".join(_ical_line(line) for line in lines)
+
+
+async def render_ical(days: AsyncIterator[DayOut]) -> AsyncIterator[bytes]:
+    """
+    Render the agenda as a iCalendar file, one chunk per day.
+    """
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    header = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Unu//Agenda//ES"]
+    yield "".join(_ical_line(line) for line in header).encode()
+
+    async for day in days:
+        events = _ical_events(day, stamp)
+        if events:
+            yield events.encode()
+
+    yield _ical_line("END:VCALENDAR").encode()
+
+
+async def render_ndjson(days: AsyncIterator[DayOut]) -> AsyncIterator[bytes]:
+    """
+    Render the agenda as newline delimited json, one day (DayOut) per line.
+    """
+    async for day in days:
+        yield (day.json() + "\n").encode()
+
+
+EXPORT_FORMATS = {
+    "ics": (ICAL_MEDIA_TYPE, render_ical),
+    "ndjson": (NDJSON_MEDIA_TYPE, render_ndjson),
+}
+
+
+#################
+# Cached Stream #
+#################
+
+
+async def cached_stream(
+    cache_key: str, rendered: AsyncIterator[bytes]
+) -> AsyncIterator[bytes]:
+    """
+    Stream the cached chunks if they exist. If not, stream the rendered chunks
+    and store them while they are sent. The cache is only published when
+    the stream ends, then a cancelled download never leaves a partial copy.
+
+    Params:
+    ------
+    - cache_key: str - The key of the export in its current version.
+    - rendered: AsyncIterator[bytes] - The export generator (lazy).
+    """
+    if await run_in_threadpool(redis_connection.exists, cache_key):
+        start = 0
+        while True:
+            end = start + CACHE_PAGE_SIZE - 1
+            chunks = await run_in_threadpool(
+                redis_connection.lrange, cache_key, start, end
+            )
+            for chunk in chunks:
+                yield chunk
+            if len(chunks) < CACHE_PAGE_SIZE:
+                return
+            start += CACHE_PAGE_SIZE
+
+    temp_key = f"{cache_key}:{uuid4()}"
+    async for chunk in rendered:
+        await run_in_threadpool(_push_chunk, temp_key, chunk)
+        yield chunk
+
+    await run_in_threadpool(_publish, temp_key, cache_key)
+
+
+def _push_chunk(key: str, chunk: bytes) -> None:
+    pipeline = redis_connection.pipeline()
+    pipeline.rpush(key, chunk)
+    pipeline.expire(key, CACHE_TTL)
+    pipeline.execute()
+
+
+def _publish(temp_key: str, cache_key: str) -> None:
+    # An empty export has no chunks, then there is nothing to publish.
+    if redis_connection.exists(temp_key):
+        redis_connection.rename(temp_key, cache_key)
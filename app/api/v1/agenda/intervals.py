@@ -0,0 +1,60 @@
+"""
+Agenda - Time intervals.
+
+The conferences of one bucket (a room of a day, or a speaker in a day) never
+overlap. Then, with the bucket sorted by start hour (db index), a new interval
+[start, end) only can overlap:
+  - The conferences that start inside it: start <= c.start < end.
+  - The last conference that starts before it, if it ends after start.
+Both are index range seeks: O(log n) per check, no matter the agenda size.
+"""
+
+import re
+from typing import List
+
+from tortoise.queryset import QuerySet
+
+
+HOUR_REGEX = re.compile(r"^([01]?\d|2[0-3]):([0-5]\d)$")
+
+
+def parse_hour(value: str) -> str:
+    """
+    Validate a hour in 24h format and return it zero padded (HH:MM).
+
+    Params:
+    ------
+    - value: str - The hour. Eg: "9:30", "09:30" or "18:05"
+
+    Return:
+    ------
+    - hour: str - The normalized hour. Eg: "09:30"
+    """
+    match = HOUR_REGEX.match(value.strip())
+    if not match:
+        raise ValueError("Invalid hour, use the 24h format HH:MM")
+    hours, minutes = match.groups()
+    return f"{int(hours):02d}:{minutes}"
+
+
+async def find_overlaps(bucket: QuerySet, start: str, end: str) -> List:
+    """
+    Return the conferences of the bucket that overlap the interval [start, end).
+
+    Params:
+    ------
+    - bucket: QuerySet - The conferences of one room/day or speaker/day.
+    - start: str - The normalized start hour.
+    - end: str - The normalized end hour.
+
+    Return:
+    ------
+    - overlaps: List[ConferencesModel] - The conflicting conferences.
+    """
+    overlaps = await bucket.filter(start_hour__gte=start, start_hour__lt=end)
+
+    previous = await bucket.filter(start_hour__lt=start).order_by("-start_hour").first()
+    if previous and previous.end_hour > start:
+        overlaps.insert(0, previous)
+
+    return overlaps
@@ -1,13 +1,58 @@
 """
-Agenda db - Model
+Agenda db - Models
 """
 
-from db.crud import CRUD
+from tortoise import fields
+from utils.abstrac_model import UnuBaseModel
 
 
-###########################################
-##           Events CRUD ORM             ##
-###########################################
+class AgendaDaysModel(UnuBaseModel):
+    """
+    Agenda day entitie.
+    """
 
-COLLECTION_NAME = "agenda"
-AgendaModel = CRUD(COLLECTION_NAME)
+    # The event uuid the day belongs.
+    event = fields.CharField(max_length=36)
+    date = fields.CharField(max_length=30)
+    title = fields.CharField(max_length=120)
+
+    class Meta:
+        """
+        Meta properties.
+        """
+
+        table = "agenda_days"
+        # Also serves the lookups of all days of one event.
+        unique_together = (("event", "date"),)
+
+
+class ConferencesModel(UnuBaseModel):
+    """
+    Conference entitie. Each conference is a row related to one day.
+    """
+
+    name = fields.CharField(max_length=120)
+    start_hour = fields.CharField(max_length=5)
+    end_hour = fields.CharField(max_length=5)
+    description = fields.TextField()
+    # The speaker uuid.
+    speaker = fields.CharField(max_length=36)
+    # The room or track. Empty string for one track agendas.
+    room = fields.CharField(max_length=60, default="")
+
+    day = fields.ForeignKeyField(
+        "models.AgendaDaysModel", related_name="conferences", on_delete=fields.CASCADE
+    )
+
+    class Meta:
+        """
+        Meta properties.
+        """
+
+        table = "conferences"
+        # Sorted buckets for the agenda reads and the overlap checks.
+        indexes = (
+            ("day", "start_hour"),
+            ("day", "room", "start_hour"),
+            ("speaker", "day", "start_hour"),
+        )
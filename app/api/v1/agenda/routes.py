@@ -8,12 +8,16 @@ from typing import List
 # external imports
 import requests
 from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 
 # module
 from auth.service import get_current_user
 from config import settings
 from utils import exceptions, responses
-from .schemas import DayIn, DayOut, ConferenceIn, ConferenceOut
+from utils.conditional import ConditionalGet
+from .export import EXPORT_FORMATS, agenda_version, cached_stream
+from .schemas import DayIn, DayOut, ConferenceIn, ConferenceOut, ConferencesConflict
 from .controller import AgendaController
 
 
@@ -30,10 +34,10 @@ router = APIRouter()
     status_code=201,
     response_model=DayOut,
     responses={
-        "401": {"model": exceptions.Unauthorized},
-        "403": {"model": exceptions.Forbidden},
-        "409": {"model": exceptions.Conflict},
-        "500": {"model": exceptions.ServerError},
+        "401": {"model": responses.Unauthorized},
+        "403": {"model": responses.Forbidden},
+        "409": {"model": responses.Conflict},
+        "500": {"model": responses.ServerError},
     },
 )
 async def create_a_new_day(
@@ -65,10 +69,11 @@ async def create_a_new_day(
     status_code=201,
     response_model=ConferenceOut,
     responses={
-        "401": {"model": exceptions.Unauthorized},
-        "403": {"model": exceptions.Forbidden},
-        "404": {"model": exceptions.NotFound},
-        "500": {"model": exceptions.ServerError},
+        "401": {"model": responses.Unauthorized},
+        "403": {"model": responses.Forbidden},
+        "404": {"model": responses.NotFound},
+        "409": {"model": ConferencesConflict},
+        "500": {"model": responses.ServerError},
     },
 )
 async def create_a_conference_to_day(
@@ -83,6 +88,9 @@ async def create_a_conference_to_day(
         exceptions.forbidden_403("Operation Forbidden")
     if conference == 404:
         exceptions.not_fount_404("Day not found")
+    if isinstance(conference, ConferencesConflict):
+        # The body is the conflict itself (the documented 409 model).
+        return JSONResponse(status_code=409, content=jsonable_encoder(conference))
     if not conference:
         exceptions.server_error_500("Server Error")
 
@@ -99,7 +107,7 @@ async def create_a_conference_to_day(
     status_code=200,
     response_model=List[DayOut],
     responses={
-        "500": {"model": exceptions.ServerError},
+        "500": {"model": responses.ServerError},
     },
 )
 async def get_all_days(event_id: str):
@@ -115,8 +123,8 @@ async def get_all_days(event_id: str):
     status_code=200,
     response_model=DayOut,
     responses={
-        "404": {"mode": exceptions.NotFound},
-        "500": {"model": exceptions.ServerError},
+        "404": {"mode": responses.NotFound},
+        "500": {"model": responses.ServerError},
     },
 )
 async def get_a_day(day_id: str, _=Depends(get_current_user)):
@@ -136,9 +144,9 @@ async def get_a_day(day_id: str, _=Depends(get_current_user)):
     status_code=200,
     response_model=ConferenceOut,
     responses={
-        "401": {"model": exceptions.Unauthorized},
-        "404": {"model": exceptions.NotFound},
-        "500": {"model": exceptions.ServerError},
+        "401": {"model": responses.Unauthorized},
+        "404": {"model": responses.NotFound},
+        "500": {"model": responses.ServerError},
     },
 )
 async def get_one_conference(conference_id: str, _=Depends(get_current_user)):
@@ -151,6 +159,76 @@ async def get_one_conference(conference_id: str, _=Depends(get_current_user)):
     return conference
 
 
+###########################################
+##          Export Agenda Entities       ##
+###########################################
+
+
+@router.get(
+    "/{event_id}.ics",
+    status_code=200,
+    response_class=StreamingResponse,
+    responses={
+        "200": {"content": {"text/calendar": {}}},
+        "304": {"description": "Not Modified"},
+        "500": {"model": responses.ServerError},
+    },
+)
+async def export_agenda_as_icalendar(
+    event_id: str, conditional: ConditionalGet = Depends()
+):
+    """
+    Download the agenda of one event as a iCalendar (.ics) file.
+    """
+    return await _export_agenda(event_id, "ics", conditional)
+
+
+@router.get(
+    "/{event_id}.ndjson",
+    status_code=200,
+    response_class=StreamingResponse,
+    responses={
+        "200": {"content": {"application/x-ndjson": {}}},
+        "304": {"description": "Not Modified"},
+        "500": {"model": responses.ServerError},
+    },
+)
+async def export_agenda_as_ndjson(
+    event_id: str, conditional: ConditionalGet = Depends()
+):
+    """
+    Stream the agenda of one event as newline delimited json (a day per line).
+    """
+    return await _export_agenda(event_id, "ndjson", conditional)
+
+
+async def _export_agenda(
+    event_id: str, export_format: str, conditional: ConditionalGet
+):
+    """
+    Stream a export of the agenda. The ETag and the cache key are derived
+    from the agenda version, then both change only when the agenda changes.
+    """
+    version = await agenda_version(event_id)
+    etag = f'W/"{event_id}-{version}-{export_format}"'
+
+    not_modified = conditional.evaluate_validators(
+        etag, cache_control="public, no-cache"
+    )
+    if not_modified:
+        return not_modified
+
+    media_type, render = EXPORT_FORMATS[export_format]
+    rendered = render(AgendaController.stream_days(event_id))
+    cache_key = f"agenda:{event_id}:{export_format}:{version}"
+
+    return StreamingResponse(
+        cached_stream(cache_key, rendered),
+        media_type=media_type,
+        headers=conditional.headers,
+    )
+
+
 ###########################################
 ##         Update Agenda Entities        ##
 ###########################################
@@ -161,12 +239,12 @@ async def get_one_conference(conference_id: str, _=Depends(get_current_user)):
     status_code=200,
     response_model=responses.Updated,
     responses={
-        "401": {"model": exceptions.Unauthorized},
-        "403": {"model": exceptions.Forbidden},
-        "404": {"model": exceptions.NotFound},
-        "409": {"model": exceptions.Conflict},
-        "412": {"mode": exceptions.FailPrecondition},
-        "500": {"model": exceptions.ServerError},
+        "401": {"model": responses.Unauthorized},
+        "403": {"model": responses.Forbidden},
+        "404": {"model": responses.NotFound},
+        "409": {"model": responses.Conflict},
+        "412": {"mode": responses.FailPrecondition},
+        "500": {"model": responses.ServerError},
     },
 )
 async def update_a_existing_day(
@@ -194,10 +272,11 @@ async def update_a_existing_day(
     status_code=200,
     response_model=responses.Updated,
     responses={
-        "401": {"model": exceptions.Unauthorized},
-        "403": {"model": exceptions.Forbidden},
-        "404": {"model": exceptions.NotFound},
-        "500": {"model": exceptions.ServerError},
+        "401": {"model": responses.Unauthorized},
+        "403": {"model": responses.Forbidden},
+        "404": {"model": responses.NotFound},
+        "409": {"model": ConferencesConflict},
+        "500": {"model": responses.ServerError},
     },
 )
 async def update_a_conference(
@@ -212,6 +291,8 @@ async def update_a_conference(
         exceptions.forbidden_403("Operation forbidden")
     if updated == 404:
         exceptions.not_fount_404("Conference not found")
+    if isinstance(updated, ConferencesConflict):
+        return JSONResponse(status_code=409, content=jsonable_encoder(updated))
 
     return {"detail": "Modified success", "modifiedCount": updated}
 
@@ -226,10 +307,10 @@ async def update_a_conference(
     status_code=200,
     response_model=responses.Deleted,
     responses={
-        "401": {"model": exceptions.Unauthorized},
-        "403": {"model": exceptions.Forbidden},
-        "404": {"model": exceptions.NotFound},
-        "500": {"mode": exceptions.ServerError},
+        "401": {"model": responses.Unauthorized},
+        "403": {"model": responses.Forbidden},
+        "404": {"model": responses.NotFound},
+        "500": {"mode": responses.ServerError},
     },
 )
 async def delete_a_conference(
@@ -256,10 +337,10 @@ async def delete_a_conference(
     status_code=200,
     response_model=responses.Deleted,
     responses={
-        "401": {"model": exceptions.Unauthorized},
-        "403": {"model": exceptions.Forbidden},
-        "404": {"model": exceptions.NotFound},
-        "500": {"model": exceptions.ServerError},
+        "401": {"model": responses.Unauthorized},
+        "403": {"model": responses.Forbidden},
+        "404": {"model": responses.NotFound},
+        "500": {"model": responses.ServerError},
     },
 )
 async def delete_a_existing_day(
@@ -3,30 +3,65 @@ Agenga - Schema
 """
 
 from typing import List, Optional
-from pydantic import BaseModel, Field  # pylint: disable-msg=E0611
+from pydantic import BaseModel, Field, validator  # pylint: disable-msg=E0611
 
+from .intervals import parse_hour
 
-class ConferenceIn(BaseModel):
+
+class ConferenceBase(BaseModel):
     """
-    Body for create a conference.
+    Fields of a conference.
     """
 
     name: str
-    startHour: str
-    endHour: str
+    startHour: str = Field(..., example="09:30", description="24h format HH:MM")
+    endHour: str = Field(..., example="10:15", description="24h format HH:MM")
     description: str
     speaker: str = Field(description="The speaker uuid - Foregyn Key")
+    room: str = Field("", description="The room or track. Empty for one track")
+
+
+class ConferenceIn(ConferenceBase):
+    """
+    Body for create a conference.
+    """
 
+    @validator("startHour", "endHour")
+    def normalize_hour(cls, value: str) -> str:
+        """
+        Store the hours zero padded, then they sort as times.
+        """
+        return parse_hour(value)
 
-class ConferenceOut(ConferenceIn):
+    @validator("endHour")
+    def end_after_start(cls, value: str, values: dict) -> str:
+        """
+        A conference must end after it starts (same day).
+        """
+        if "startHour" in values and value <= values["startHour"]:
+            raise ValueError("endHour must be after startHour")
+        return value
+
+
+class ConferenceOut(ConferenceBase):
     """
-    Conference schema and response body.
+    Conference schema and response body (the stored hours aren't validated
+    again).
     """
 
     uuid: str
     speakerInfo: dict
 
 
+class ConferencesConflict(BaseModel):
+    """
+    Detail of a 409 response when a conference overlaps other talks.
+    """
+
+    message: str = Field(example="The conference overlaps with other talks")
+    conflicts: List[ConferenceOut]
+
+
 class DayIn(BaseModel):
     """
     Body for create a day in agenda.
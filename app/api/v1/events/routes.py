@@ -13,6 +13,7 @@ from fastapi import APIRouter, Body, BackgroundTasks, Depends
 from auth.service import get_current_user, check_permission
 from config import settings
 from utils import exceptions, responses
+from api.v1.participants.controller import ParticipantsController
 from .schemas import EventsIn, EventOut, Event, EventUpdate
 from .controller import EventController
 
@@ -160,6 +161,9 @@ async def update_a_existing_event(
         if not uuid in user["myCollaborations"]:
             exceptions.forbidden_403("Operation Forbidden")
 
+    # Keep the reminder date of the participants directory.
+    await ParticipantsController.reschedule(event_id, body.startDate, body.utc)
+
     return {"detail": "Modified success", "modifiedCount": updated}
 
 
@@ -0,0 +1,131 @@
+"""
+Jobs - Controller
+"""
+
+# build-in imports
+import hmac
+from collections import defaultdict
+from typing import List, Tuple
+
+# external imports
+from fastapi.concurrency import run_in_threadpool
+from rq import Worker
+
+# module imports
+from config import settings
+from worker import metrics
+from worker.connection import redis_connection
+from worker.deadletter import INDEX_KEY, summary
+from worker.priorities import queue_stats
+from worker.scheduler import SCHEDULE_KEY
+from .schemas import JobsDashboard
+
+# Error groups shown on the dashboard.
+DASHBOARD_DEAD_LETTERS = 10
+
+
+class JobsControllerModel:
+    """
+    Jobs controller.
+    """
+
+    async def metrics(self, authorization: str) -> str:
+        """
+        Return the jobs metrics in the Prometheus text format (only with the
+        METRICS_TOKEN as bearer token).
+        """
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not settings.METRICS_TOKEN or not hmac.compare_digest(
+            (authorization or "").encode(), expected.encode()
+        ):
+            return 401
+        return await run_in_threadpool(self._render_metrics)
+
+    async def dashboard(self, user) -> JobsDashboard:
+        """
+        Return the queues, functions, dead jobs and workers (admin only).
+        """
+        if user.email != settings.EMAIL_ADMIN:
+            return 403
+        return await run_in_threadpool(self._dashboard)
+
+    def _render_metrics(self) -> str:
+        gauges = []
+        for stat in queue_stats():
+            labels = {"queue": stat["queue"], "priority": stat["priority"]}
+            gauges += [
+                ("rq_queue_depth", "Jobs waiting.", labels, stat["depth"]),
+                (
+                    "rq_queue_oldest_wait_seconds",
+                    "Wait of the oldest job.",
+                    labels,
+                    stat["wait"],
+                ),
+                ("rq_queue_running", "Jobs running.", labels, stat["running"]),
+            ]
+        for state, count in self._worker_states():
+            gauges.append(("rq_workers", "Workers by state.", {"state": state}, count))
+
+        pipeline = redis_connection.pipeline()
+        pipeline.zcard(SCHEDULE_KEY)
+        pipeline.zcard(INDEX_KEY)
+        scheduled, dead = pipeline.execute()
+        gauges += [
+            ("rq_scheduled_jobs", "Jobs waiting their date.", {}, scheduled),
+            ("rq_dead_letters", "Jobs in the dead letter store.", {}, dead),
+        ]
+        return metrics.render(gauges)
+
+    def _dashboard(self) -> JobsDashboard:
+        series = metrics.read()
+        queues = [
+            {
+                **stat,
+                "wait_time": metrics.histogram(
+                    "rq_job_wait_seconds", {"queue": stat["queue"]}, series
+                ),
+                "run_time": metrics.histogram(
+                    "rq_job_run_seconds", {"queue": stat["queue"]}, series
+                ),
+            }
+            for stat in queue_stats()
+        ]
+
+        functions = defaultdict(dict)
+        for labels, value in metrics.series_labels("rq_jobs_enqueued_total", series):
+            functions[labels["function"], labels["queue"]]["enqueued"] = int(value)
+        for labels, value in metrics.series_labels("rq_jobs_total", series):
+            functions[labels["function"], labels["queue"]][labels["status"]] = int(
+                value
+            )
+
+        workers = [
+            {
+                "name": worker.name,
+                "state": worker.get_state(),
+                "queues": worker.queue_names(),
+                "current_job": worker.get_current_job_id(),
+            }
+            for worker in Worker.all(connection=redis_connection)
+        ]
+
+        return JobsDashboard(
+            queues=queues,
+            functions=[
+                {"function": function, "queue": queue, **counts}
+                for (function, queue), counts in sorted(functions.items())
+            ],
+            dead_letters=summary()[:DASHBOARD_DEAD_LETTERS],
+            scheduled=redis_connection.zcard(SCHEDULE_KEY),
+            workers=workers,
+        )
+
+    @staticmethod
+    def _worker_states() -> List[Tuple[str, int]]:
+        states = defaultdict(int)
+        for worker in Worker.all(connection=redis_connection):
+            states[worker.get_state()] += 1
+        return sorted(states.items())
+
+
+JobsController = JobsControllerModel()
@@ -0,0 +1,71 @@
+"""
+Jobs - Routes.
+"""
+
+# external imports
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import PlainTextResponse
+
+# module imports
+from auth.service import get_auth_user
+from utils import responses, exceptions
+from .schemas import JobsDashboard
+from .controller import JobsController
+
+
+router = APIRouter()
+
+
+###########################
+# Prometheus Jobs Metrics #
+###########################
+
+
+@router.get(
+    "/metrics",
+    status_code=200,
+    response_class=PlainTextResponse,
+    responses={
+        "401": {"model": responses.Unauthorized},
+        "500": {"model": responses.ServerError},
+    },
+)
+async def get_jobs_metrics(authorization: str = Header(None)):
+    """
+    Return the queues and jobs metrics in the Prometheus text format.
+    Requires the METRICS_TOKEN as bearer token (Authorization header).
+    """
+    jobs_metrics = await JobsController.metrics(authorization)
+
+    if jobs_metrics == 401:
+        exceptions.unauthorized_401("Invalid metrics token")
+
+    return jobs_metrics
+
+
+##################
+# Jobs Dashboard #
+##################
+
+
+@router.get(
+    "/dashboard",
+    status_code=200,
+    response_model=JobsDashboard,
+    responses={
+        "401": {"model": responses.Unauthorized},
+        "403": {"model": responses.Forbidden},
+        "500": {"model": responses.ServerError},
+    },
+)
+async def get_jobs_dashboard(user=Depends(get_auth_user)):
+    """
+    Return the backlog and latencies per queue, the runs per function, the
+    most frequent dead job errors and the workers.
+    """
+    dashboard = await JobsController.dashboard(user)
+
+    if dashboard == 403:
+        exceptions.forbidden_403("Operation forbidden")
+
+    return dashboard
@@ -0,0 +1,81 @@
+"""
+Jobs - Schemas
+"""
+
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field  # pylint: disable-msg=E0611
+
+
+class Latency(BaseModel):
+    """
+    Summary of a latency histogram (seconds).
+    """
+
+    count: int
+    mean: float
+    p50: float = Field(description="Upper bound of the bucket")
+    p95: float = Field(description="Upper bound of the bucket")
+
+
+class QueueStats(BaseModel):
+    """
+    Backlog and latencies of a queue.
+    """
+
+    queue: str
+    priority: str = Field(example="critical", description="critical | default | bulk")
+    depth: int
+    wait: float = Field(description="Seconds waiting of the oldest job")
+    running: int
+    wait_time: Latency
+    run_time: Latency
+
+
+class FunctionStats(BaseModel):
+    """
+    Runs of a job function.
+    """
+
+    function: str
+    queue: str
+    enqueued: int = 0
+    finished: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+class DeadLetterGroup(BaseModel):
+    """
+    Dead jobs with the same error.
+    """
+
+    fingerprint: str
+    count: int
+    function: str
+    error_type: str
+    error: str
+    last_failed_at: datetime
+
+
+class WorkerStats(BaseModel):
+    """
+    A running worker.
+    """
+
+    name: str
+    state: str
+    queues: List[str]
+    current_job: Optional[str]
+
+
+class JobsDashboard(BaseModel):
+    """
+    Status of the background jobs.
+    """
+
+    queues: List[QueueStats]
+    functions: List[FunctionStats]
+    dead_letters: List[DeadLetterGroup]
+    scheduled: int = Field(description="Jobs waiting their date")
+    workers: List[WorkerStats]
@@ -2,13 +2,20 @@
 Mail - Controller
 """
 
+# build-in imports
+from typing import List
+
 # external imports
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 
 # module imports
 from auth.service import check_authorization_on_event
 from mails.service import send_special_email, send_close_event_email
-from .models import MailsModel
+from mails.campaigns import campaign_progress
+from storage.service import upload_file
+from api.v1.events.models import EventsModel
+from api.v1.participants.models import ParticipantsDirectoriesModel, ParticipantsModel
 
 
 class MailControllerModel:
@@ -17,19 +24,21 @@ class MailControllerModel:
     """
 
     def __init__(self):
-        self.model = MailsModel
+        self.model = ParticipantsDirectoriesModel
+        self.participants = ParticipantsModel
         self._send_special = send_special_email
         self._send_alert = send_close_event_email
 
     async def send_special(
         self, event_id: str, subject: str, message: str, file: UploadFile, user: dict
-    ) -> int:
+    ) -> str:
         """
         Send a special email to all participants
-        registere in the passed event
+        registere in the passed event. Return the campaign id.
+        The file is streamed to the storage once, the campaign sends a link.
         """
         # Check if directory exist
-        directory = await self.model.find({"event": event_id})
+        directory = await self.model.filter(event=event_id).exists()
 
         # Return status erro if an error occurs
         if not directory:
@@ -39,46 +48,66 @@ class MailControllerModel:
 
         # Get event info (if directory exists also the evnt)
         event = await self._get_event_data(event_id)
-        mails = directory["emails"]
+        mails = await self._get_emails(event_id)
+
+        attachment_url = None
+        if file:
+            attachment_url = await run_in_threadpool(upload_file, file=file)
+            if not attachment_url:
+                return 500
 
-        self._send_special(
+        return await run_in_threadpool(
+            self._send_special,
+            event_id=event_id,
             event_name=event["name"],
             message=message,
             subjet=subject,
             to_list=mails,
             event_url=event["event_url"],
-            image=file,
+            attachment_url=attachment_url,
         )
 
-    async def send_alert(self, event_id: str) -> int:
+    async def send_alert(self, event_id: str) -> str:
         """
-        Send a alerta email one day before the event.
+        Send a alerta email one day before the event. Return the campaign id.
         """
         # Check if directory exist
-        directory = await self.model.find({"event": event_id})
+        directory = await self.model.filter(event=event_id).exists()
 
         # Return status erro if an error occurs
         if not directory:
             return 404
 
         # Get event extra info
-        emails = directory["emails"]
+        emails = await self._get_emails(event_id)
         event = await self._get_event_data(event_id)
 
-        self._send_alert(
-            event_name=event["name"], event_url=event["event_url"], to_list=emails
+        return await run_in_threadpool(
+            self._send_alert,
+            event_id=event_id,
+            event_name=event["name"],
+            event_url=event["event_url"],
+            to_list=emails,
         )
 
+    async def get_campaign(self, campaign_id: str, user: dict) -> dict:
+        """
+        Return the sending progress of a campaign.
+        """
+        campaign = await run_in_threadpool(campaign_progress, campaign_id)
+
+        if not campaign:
+            return 404
+        if not check_authorization_on_event(user, campaign["event"]):
+            return 403
+
+        return campaign
+
     async def _get_event_data(self, event_id: str) -> dict:
         """
         Retrieve the event info neccessary to send a email.
         """
-        event_in_list = await self.model.find_from_foregyn_key(
-            collection="events",
-            foregyn_keys=[event_id],
-        )
-
-        event = event_in_list[0]
+        event = await EventsModel.find({"uuid": event_id})
 
         # Complete public event url
         org_url = event["organizationUrl"]
@@ -88,5 +117,13 @@ class MailControllerModel:
 
         return event
 
+    async def _get_emails(self, event_id: str) -> List[str]:
+        """
+        Retrieve the emails of the participants of the event.
+        """
+        return await self.participants.filter(event=event_id).values_list(
+            "email", flat=True
+        )
+
 
 MailController = MailControllerModel()
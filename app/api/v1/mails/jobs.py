@@ -0,0 +1,153 @@
+"""
+Mails - Background jobs.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import uuid4
+
+from fastapi.concurrency import run_in_threadpool
+from tortoise.query_utils import Q
+
+from worker.connection import redis_connection
+from worker.scheduler import schedule_at, cancel
+from db.jobs import run_db_job
+from api.v1.participants.models import ParticipantsDirectoriesModel
+from .controller import MailController
+
+
+logger = logging.getLogger(__name__)
+
+
+# The reminder is sent when the event starts in less than REMINDER_AHEAD.
+REMINDER_AHEAD = timedelta(days=1)
+# Max seconds to start one reminder campaign (lock expiration).
+REMINDER_LOCK_TTL = 60 * 5
+
+# KEYS[1]: lock key - ARGV: lock token. Delete the lock only if it's owned.
+RELEASE_LOCK_SCRIPT = redis_connection.register_script(
+    """
+    if redis.call("GET", KEYS[1]) == ARGV[1] then
+        return redis.call("DEL", KEYS[1])
+    end
+    return 0
+    """
+)
+
+
+def _reminder_lock_key(event_id: str) -> str:
+    return f"reminders:lock:{event_id}"
+
+
+def _reminder_job_id(event_id: str) -> str:
+    return f"reminder:{event_id}"
+
+
+def _due_reminders(now: datetime) -> Q:
+    """
+    The events that start in less than REMINDER_AHEAD and weren't reminded,
+    or whose reminder was marked but its campaign never saved (the sender
+    died between both, after the lock expired).
+    """
+    return Q(starts_at__gt=now, starts_at__lte=now + REMINDER_AHEAD) & (
+        Q(reminded_at__isnull=True)
+        | Q(
+            reminder_campaign__isnull=True,
+            reminded_at__lt=now - timedelta(seconds=REMINDER_LOCK_TTL),
+        )
+    )
+
+
+def schedule_reminder(event_id: str, starts_at: Optional[datetime]) -> None:
+    """
+    Schedule (or move) the day-before reminder of a event. The events
+    without start date have no reminder.
+    """
+    job_id = _reminder_job_id(event_id)
+    if not starts_at:
+        cancel(job_id)
+        return
+
+    schedule_at(send_reminder, starts_at - REMINDER_AHEAD, event_id, job_id=job_id)
+
+
+async def _send_reminder(event_id: str) -> bool:
+    """
+    Start the reminder campaign of a event, once: the event is locked in
+    redis (only one worker sends it) and marked as reminded before its
+    campaign is enqueued, then the campaign id is saved. A mark without
+    campaign is due again after the lock expires, then a crash between the
+    mark and the enqueue doesn't lose the reminder (a crash between the
+    enqueue and the save sends it twice: at least once).
+
+    Return:
+    ------
+    - sent: bool - False if it was already sent or isn't due.
+    """
+    lock_key, token = _reminder_lock_key(event_id), uuid4().hex
+    locked = await run_in_threadpool(
+        redis_connection.set, lock_key, token, nx=True, ex=REMINDER_LOCK_TTL
+    )
+    if not locked:
+        return False
+
+    now = datetime.utcnow()
+    try:
+        # Only the events that didn't start and weren't reminded yet.
+        marked = (
+            await ParticipantsDirectoriesModel.filter(_due_reminders(now))
+            .filter(event=event_id)
+            .update(reminded_at=now, reminder_campaign=None)
+        )
+        if not marked:
+            return False
+
+        # The campaign is enqueued after the mark is committed. If it fails,
+        # the mark is removed and the sweep sends it again.
+        try:
+            campaign_id = await MailController.send_alert(event_id)
+        except Exception:
+            await ParticipantsDirectoriesModel.filter(
+                event=event_id, reminded_at=now
+            ).update(reminded_at=None)
+            raise
+
+        await ParticipantsDirectoriesModel.filter(
+            event=event_id, reminded_at=now
+        ).update(reminder_campaign=str(campaign_id))
+        return True
+    finally:
+        await run_in_threadpool(RELEASE_LOCK_SCRIPT, keys=[lock_key], args=[token])
+
+
+async def _send_reminders() -> None:
+    """
+    Send the reminders missed by the scheduler (Eg: events created less
+    than a day before they start) or interrupted. The sweep reads the
+    starts_at index.
+    """
+    now = datetime.utcnow()
+    events = await ParticipantsDirectoriesModel.filter(
+        _due_reminders(now)
+    ).values_list("event", flat=True)
+
+    sent = 0
+    for event in events:
+        sent += await _send_reminder(event)
+
+    logger.info("Reminders sent: %s of %s due events", sent, len(events))
+
+
+def send_reminder(event_id: str) -> None:
+    """
+    Job: send the day-before reminder of a event (see schedule_reminder).
+    """
+    run_db_job(_send_reminder, event_id)
+
+
+def send_reminders() -> None:
+    """
+    Job: send the missed day-before reminders (see worker.periodic).
+    """
+    run_db_job(_send_reminders)
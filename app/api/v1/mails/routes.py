@@ -10,7 +10,7 @@ from fastapi import APIRouter, Form, UploadFile, Depends
 # module imports
 from auth.service import get_current_user
 from utils import exceptions
-from .schemas import MailResponse
+from .schemas import MailResponse, CampaignProgress
 from .controller import MailController
 
 
@@ -27,6 +27,7 @@ router = APIRouter()
     status_code=200,
     response_model=MailResponse,
     responses={
+        "400": {"model": exceptions.BadRequest},
         "401": {"model": exceptions.Unauthorized},
         "403": {"model": exceptions.Forbidden},
         "500": {"model": exceptions.ServerError},
@@ -51,8 +52,14 @@ async def send_special_email(
         exceptions.forbidden_403("Operation forbidden")
     if sended == 404:
         exceptions.not_fount_404("Event not found")
+    if sended == 500:
+        exceptions.server_error_500()
 
-    return {"detail": "Email sended", "target": f"Event: {event_id}"}
+    return {
+        "detail": "Email sended",
+        "target": f"Event: {event_id}",
+        "campaign": sended,
+    }
 
 
 ###########################################
@@ -78,4 +85,40 @@ async def send_alert_email(event_id: str):
     if sended == 404:
         exceptions.not_fount_404("Event not found")
 
-    return {"detail": "Email sended", "target": f"Event: {event_id}"}
+    return {
+        "detail": "Email sended",
+        "target": f"Event: {event_id}",
+        "campaign": sended,
+    }
+
+
+###########################################
+##         Get a campaign progress       ##
+###########################################
+
+
+@router.get(
+    "/campaigns/{campaign_id}",
+    status_code=200,
+    response_model=CampaignProgress,
+    responses={
+        "401": {"model": exceptions.Unauthorized},
+        "403": {"model": exceptions.Forbidden},
+        "404": {"model": exceptions.NotFound},
+        "500": {"model": exceptions.ServerError},
+    },
+)
+async def get_campaign_progress(
+    campaign_id: str, user: dict = Depends(get_current_user)
+):
+    """
+    Return the sending progress of a special or alert email.
+    """
+    campaign = await MailController.get_campaign(campaign_id, user)
+
+    if campaign == 403:
+        exceptions.forbidden_403("Operation forbidden")
+    if campaign == 404:
+        exceptions.not_fount_404("Campaign not found")
+
+    return campaign
@@ -2,6 +2,7 @@
 Mails - Schemas
 """
 
+from typing import Optional
 from pydantic import BaseModel, Field  # pylint: disable-msg=E0611
 
 
@@ -12,3 +13,19 @@ class MailResponse(BaseModel):
 
     detail: str = Field(example="Email sended")
     target: str = Field(example="Event/Email: str")
+    campaign: Optional[str] = Field(None, description="The campaign id")
+
+
+class CampaignProgress(BaseModel):
+    """
+    Sending progress of a mass email.
+    """
+
+    event: str
+    status: str = Field(example="sending", description="sending | completed | failed")
+    recipients: int
+    chunks: int
+    sent_chunks: int
+    failed_chunks: int
+    sent_recipients: int
+    created_at: int = Field(description="Unix timestamp")
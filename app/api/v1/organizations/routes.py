@@ -9,6 +9,7 @@ from fastapi import APIRouter, Depends
 from auth.service import get_auth_user
 from db import CRUD, IntegrityError
 from utils import responses, exceptions
+from utils.conditional import ConditionalGet
 from .schemas import Organization, OrganizationIn
 from .models import OrganizationsModel
 
@@ -65,15 +66,21 @@ async def create_a_new_organization(
     status_code=200,
     responses={
         "200": {"model": Organization},
+        "304": {"description": "Not Modified"},
         "401": {"model": responses.Unauthorized},
         "500": {"model": responses.ServerError},
     },
 )
-async def get_organizations_list(user=Depends(get_auth_user)) -> List[Organization]:
+async def get_organizations_list(
+    user=Depends(get_auth_user), conditional: ConditionalGet = Depends()
+) -> List[Organization]:
     """
     Retrieve all organizations of the current users.
     """
     organizations = await organizations_crud.read({"owner": user.id})
+    not_modified = conditional.evaluate_collection(user, *organizations)
+    if not_modified:
+        return not_modified
     return organizations
 
 
@@ -85,23 +92,33 @@ async def get_organizations_list(user=Depends(get_auth_user)) -> List[Organizati
     status_code=200,
     responses={
         "200": {"model": Organization},
+        "304": {"description": "Not Modified"},
         "401": {"model": responses.Unauthorized},
         "403": {"model": responses.Forbidden},
         "500": {"model": responses.ServerError},
     },
 )
 async def get_organization(
-    organization_id: str, user=Depends(get_auth_user)
+    organization_id: str,
+    user=Depends(get_auth_user),
+    conditional: ConditionalGet = Depends(),
 ) -> Organization:
     """
     Retrieve the organization with specific ID.
     """
-    organization = await organizations_crud.read_one({"id": organization_id})
+    organization = await organizations_crud.read_one(
+        {"id": organization_id}, return_db_model=True
+    )
     if not organization:
         exceptions.not_fount_404("Organization not found")
-    if organization.owner.id != user.id:
+    if organization.owner_id != user.id:
         exceptions.forbidden_403("Forbidden")
-    return organization
+
+    # The owner is nested in the response, then its changes also count.
+    not_modified = conditional.evaluate(organization, user)
+    if not_modified:
+        return not_modified
+    return await Organization.from_tortoise_orm(organization)
 
 
 #######################
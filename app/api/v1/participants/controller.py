@@ -3,90 +3,456 @@ Participants - Controller
 """
 
 # build-in imports
-from uuid import uuid4
+from typing import AsyncIterator, Callable, Iterable, List, Optional, Tuple
+
+# external imports
+from fastapi.concurrency import run_in_threadpool
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
 
 # module imports
 from auth.service import check_authorization_on_event
-from .models import ParticipantsModel
-from .schemas import PariticipantsDir, PariticipantsDirOut
+from api.v1.events.models import EventsModel
+from api.v1.mails.jobs import schedule_reminder
+from utils.dates import to_utc
+from .models import (
+    ParticipantsDirectoriesModel,
+    ParticipantsModel,
+    ParticipantsWaitlistModel,
+)
+from .schemas import (
+    PariticipantsDir,
+    PariticipantsDirOut,
+    BulkRegisterResponse,
+    ParticipantsCount,
+)
+from .seats import (
+    SeatsReset,
+    release_seats,
+    reserve_seats,
+    reset_seats,
+    seats_state,
+    seed_seats,
+)
+
+
+# Registrations retried when the seats counter is reset before the commit.
+SEATS_ATTEMPTS = 3
+# Rows per INSERT statement on bulk registrations.
+BULK_CHUNK_SIZE = 1000
+# Rows per page on the exports.
+EXPORT_PAGE_SIZE = 2000
 
 
 class ParticipantsControllerModel:
     """
-    Agenda controller.
+    Participants controller.
     """
 
     def __init__(self):
-        self.model = ParticipantsModel
+        self.model = ParticipantsDirectoriesModel
+        self.participants = ParticipantsModel
+        self.waitlist = ParticipantsWaitlistModel
 
     async def create(self, event_id: str) -> PariticipantsDir:
         """
         Create a new partiipants directory for the passed event
         """
-        directory = await self.model.find({"event": event_id})
+        directory = await self.model.filter(event=event_id).exists()
         if directory:
             return 409
 
-        event_in_list = await self.model.find_from_foregyn_key(
-            collection="events",
-            foregyn_keys=[event_id],
+        event = await EventsModel.find({"uuid": event_id})
+
+        new_directory = await self.model.create(
+            event=event_id,
+            event_name=event["name"],
+            organization=event["organizationName"],
+            starts_at=to_utc(event.get("startDate"), event.get("utc")),
         )
-        event = event_in_list[0]
+        if not new_directory:
+            return None
 
-        new_directory: dict = {}
-        new_directory.update({"event": event_id})
-        new_directory.update({"uuid": str(uuid4())})
-        new_directory.update({"eventName": event["name"]})
-        new_directory.update({"organization": event["organizationName"]})
-        new_directory.update({"emails": []})
+        await run_in_threadpool(schedule_reminder, event_id, new_directory.starts_at)
+        return PariticipantsDir(**self._directory_to_dict(new_directory), emails=[])
 
-        new_directory = PariticipantsDir(**new_directory)
-        inserted_id = await self.model.create(new_directory.dict())
+    async def register(self, event_id: str, email: str) -> BulkRegisterResponse:
+        """
+        Register a new participant: Add the email to the participants
+        of the event, or to the waitlist if the event is full.
+        """
+        return await self.register_many(event_id, [email])
 
-        if not inserted_id:
-            return None
+    async def register_many(
+        self, event_id: str, emails: Iterable[str]
+    ) -> BulkRegisterResponse:
+        """
+        Register many participants at once. The emails are inserted in chunks
+        in one transaction, skipping the already registered ones.
+        """
+        result = await self.register_emails(event_id, emails)
+        if result == 404:
+            return 404
+
+        emails, registered, waitlisted = result
+        return BulkRegisterResponse(
+            detail="Registered successful",
+            event=event_id,
+            received=len(emails),
+            registered=len(registered),
+            waitlisted=len(waitlisted),
+        )
+
+    async def register_emails(
+        self, event_id: str, emails: Iterable[str]
+    ) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Register the emails. If the event has capacity, the seats are reserved
+        first (seats.reserve_seats) and the overflow goes to the waitlist.
+        If the seats counter was reset meanwhile, the registration is rolled
+        back and retried.
+
+        Return:
+        ------
+        - (emails, registered, waitlisted): The normalized emails, the new
+        participants and the new waitlisted emails.
+        """
+        emails = self.normalize_emails(emails)
+        for attempt in range(1, SEATS_ATTEMPTS + 1):
+            directory = await self.model.get_or_none(event=event_id)
+            if not directory:
+                return 404
+
+            if directory.capacity is None:
+                async with in_transaction() as connection:
+                    registered = await self._add_participants(
+                        event_id, emails, connection
+                    )
+                return emails, registered, []
+
+            new_emails = await self._new_emails(event_id, emails)
+            granted, version = await self._reserve_seats(
+                event_id, directory.capacity, len(new_emails)
+            )
+
+            used_seats = 0
+            try:
+                async with in_transaction() as connection:
+                    registered = await self._add_participants(
+                        event_id, new_emails[:granted], connection
+                    )
+                    waitlisted = await self._insert_chunks(
+                        self.waitlist.bulk_enqueue,
+                        event_id,
+                        new_emails[granted:],
+                        connection,
+                    )
+                    if registered:
+                        await self._check_seats_version(event_id, version)
+                used_seats = len(registered)
+            except SeatsReset:
+                if attempt == SEATS_ATTEMPTS:
+                    raise
+                continue
+            finally:
+                await release_seats(event_id, granted - used_seats, version)
+
+            return emails, registered, waitlisted
+
+    async def unregister(self, event_id: str, email: str) -> int:
+        """
+        Remove a participant (or a waitlisted email) from the event. The freed
+        seat goes to the first email of the waitlist.
+        Return 0 if the email was not registered.
+        """
+        directory = await self.model.get_or_none(event=event_id)
+        if not directory:
+            return 404
+
+        email = self.normalize_emails([email])[0]
+        waiting = await self.waitlist.filter(event=event_id, email=email).delete()
+        if waiting:
+            return waiting
+
+        promoted, seeded, version = [], False, None
+        async with in_transaction() as connection:
+            # The fresh count. A seed of the counter waits for this commit.
+            directory = await self._lock_directory(event_id, connection)
+            deleted = await self.participants.filter(
+                event=event_id, email=email
+            ).delete()
+            if deleted and directory.capacity is not None:
+                # Don't promote while the event is over a reduced capacity.
+                free = directory.capacity - (directory.count - deleted)
+                promoted = await self._promote(event_id, min(deleted, free), connection)
+                # A counter seeded after this commit already counts the delete.
+                version, seeded = await seats_state(event_id)
+            if deleted:
+                await self.model.filter(event=event_id).update(
+                    count=F("count") + len(promoted) - deleted
+                )
+
+        if seeded:
+            await release_seats(event_id, deleted - len(promoted), version)
+
+        return deleted
+
+    async def set_capacity(
+        self, event_id: str, capacity: Optional[int], user: dict
+    ) -> ParticipantsCount:
+        """
+        Change the capacity of the event (None for no limit). The waitlist
+        is promoted to the new free seats.
+        """
+        directory = await self.model.get_or_none(event=event_id)
+
+        if not directory:
+            return 404
+        if not check_authorization_on_event(user, event_id):
+            return 403
+
+        await self.model.filter(event=event_id).update(capacity=capacity)
+        await reset_seats(event_id)
+
+        for attempt in range(1, SEATS_ATTEMPTS + 1):
+            waiting = await self.waitlist.filter(event=event_id).count()
+            version = None
+            if capacity is None:
+                granted = waiting
+            else:
+                granted, version = await self._reserve_seats(
+                    event_id, capacity, waiting
+                )
+
+            used_seats = 0
+            try:
+                async with in_transaction() as connection:
+                    promoted = await self._promote(event_id, granted, connection)
+                    if promoted:
+                        await self.model.filter(event=event_id).update(
+                            count=F("count") + len(promoted)
+                        )
+                        if capacity is not None:
+                            await self._check_seats_version(event_id, version)
+                used_seats = len(promoted)
+            except SeatsReset:
+                if attempt == SEATS_ATTEMPTS:
+                    raise
+                continue
+            finally:
+                if capacity is not None:
+                    await release_seats(event_id, granted - used_seats, version)
+            break
+
+        return await self.count(event_id, user)
 
-        return new_directory
+    async def reschedule(self, event_id: str, start_date: str, utc: str) -> int:
+        """
+        Save the new start of the event. If it changed, the day-before
+        reminder is sent again for the new date.
+        """
+        starts_at = to_utc(start_date, utc)
+        directory = await self.model.get_or_none(event=event_id)
+        if not directory or directory.starts_at == starts_at:
+            return 0
+
+        updated = await self.model.filter(event=event_id).update(
+            starts_at=starts_at, reminded_at=None, reminder_campaign=None
+        )
+        await run_in_threadpool(schedule_reminder, event_id, starts_at)
+        return updated
 
-    async def register(self, event_id: str, email: str) -> int:
+    async def count(self, event_id: str, user: dict) -> ParticipantsCount:
         """
-        Register a new participant: Add the email to the emils list
-        in the directory.
+        Return the number of participants of the event (without reading them).
         """
-        query = {"event": event_id}
-        directory = await self.model.find(query)
+        directory = await self.model.filter(event=event_id).values("count", "capacity")
 
         if not directory:
             return 404
+        if not check_authorization_on_event(user, event_id):
+            return 403
 
-        register = await self.model.add_to_set(query, "emails", email)
-        return register
+        waitlisted = await self.waitlist.filter(event=event_id).count()
+        return ParticipantsCount(event=event_id, **directory[0], waitlisted=waitlisted)
 
     async def read(self, event_id: str, user: dict) -> PariticipantsDirOut:
         """
         Return the participants directory of some specific event.
         """
-        directory = await self.model.find({"event": event_id})
+        directory = await self.model.get_or_none(event=event_id)
 
         if not directory:
             return 404
         if not check_authorization_on_event(user, event_id):
             return 403
 
-        count = len(directory["emails"])
-        return PariticipantsDirOut(**directory, count=count)
+        emails = await self.participants.filter(event=event_id).values_list(
+            "email", flat=True
+        )
+        return PariticipantsDirOut(
+            **self._directory_to_dict(directory), emails=emails, count=directory.count
+        )
+
+    async def stream_emails(self, event_id: str) -> AsyncIterator[List[str]]:
+        """
+        Yield the emails of one event in pages, sorted by email.
+        Each page continues after the last email of the previous one (keyset
+        pagination on the (event, email) index), then every page is a index
+        range scan and no connection is held between pages.
+        """
+        last_email = ""
+        while True:
+            emails = (
+                await self.participants.filter(event=event_id, email__gt=last_email)
+                .order_by("email")
+                .limit(EXPORT_PAGE_SIZE)
+                .values_list("email", flat=True)
+            )
+            if not emails:
+                return
+
+            yield emails
+            if len(emails) < EXPORT_PAGE_SIZE:
+                return
+            last_email = emails[-1]
 
     async def delete(self, event_id) -> int:
         """
         Delete a participants dorectory
         """
-        directory = await self.model.find({"event": event_id})
+        directory = await self.model.filter(event=event_id).exists()
 
         if not directory:
             return 404
 
-        deleted = await self.model.delete({"event": event_id})
+        async with in_transaction():
+            await self.participants.filter(event=event_id).delete()
+            await self.waitlist.filter(event=event_id).delete()
+            deleted = await self.model.filter(event=event_id).delete()
+
+        await reset_seats(event_id)
+        await run_in_threadpool(schedule_reminder, event_id, None)
         return deleted
 
+    async def _new_emails(self, event_id: str, emails: List[str]) -> List[str]:
+        """
+        Return the emails not registered nor waitlisted yet. Only the new
+        emails reserve seats.
+        """
+        known = set()
+        for model in (self.participants, self.waitlist):
+            known.update(
+                await model.filter(event=event_id, email__in=emails).values_list(
+                    "email", flat=True
+                )
+            )
+        return [email for email in emails if email not in known]
+
+    async def _lock_directory(
+        self, event_id: str, connection: BaseDBAsyncClient
+    ) -> ParticipantsDirectoriesModel:
+        """
+        Read the directory with its row locked until the end of the transaction.
+        """
+        return (
+            await self.model.filter(event=event_id)
+            .select_for_update()
+            .using_db(connection)
+            .first()
+        )
+
+    async def _reserve_seats(
+        self, event_id: str, capacity: int, requested: int
+    ) -> Tuple[int, Optional[int]]:
+        """
+        Reserve seats (seats.reserve_seats). A counter not seeded yet is
+        seeded from the count read with the directory row locked, then the
+        registrations in flight are committed before the seed.
+        """
+        granted, version = await reserve_seats(event_id, capacity, requested)
+        while granted is None:
+            async with in_transaction() as connection:
+                directory = await self._lock_directory(event_id, connection)
+                await seed_seats(event_id, directory.count)
+            granted, version = await reserve_seats(event_id, capacity, requested)
+        return granted, version
+
+    @staticmethod
+    async def _check_seats_version(event_id: str, version: int) -> None:
+        """
+        Raise SeatsReset if the counter was reset after the reservation.
+        Call it after the count update (the directory row is locked).
+        """
+        current_version, _ = await seats_state(event_id)
+        if current_version != version:
+            raise SeatsReset()
+
+    async def _add_participants(
+        self, event_id: str, emails: List[str], connection: BaseDBAsyncClient
+    ) -> List[str]:
+        """
+        Insert the participants and update the count of the directory.
+        Call it inside a transaction.
+        """
+        registered = await self._insert_chunks(
+            self.participants.bulk_register, event_id, emails, connection
+        )
+        if registered:
+            await self.model.filter(event=event_id).update(
+                count=F("count") + len(registered)
+            )
+        return registered
+
+    async def _promote(
+        self, event_id: str, seats: int, connection: BaseDBAsyncClient
+    ) -> List[str]:
+        """
+        Move the first emails of the waitlist to the participants (without
+        updating the count). Call it inside a transaction.
+        """
+        emails = await self.waitlist.pop(event_id, seats, using_db=connection)
+        return await self._insert_chunks(
+            self.participants.bulk_register, event_id, emails, connection
+        )
+
+    @staticmethod
+    async def _insert_chunks(
+        insert: Callable,
+        event_id: str,
+        emails: List[str],
+        connection: BaseDBAsyncClient,
+    ) -> List[str]:
+        """
+        Run a bulk insert (Eg: ParticipantsModel.bulk_register) in chunks.
+        """
+        inserted = []
+        for start in range(0, len(emails), BULK_CHUNK_SIZE):
+            chunk = emails[start : start + BULK_CHUNK_SIZE]
+            inserted += await insert(event_id, chunk, using_db=connection)
+        return inserted
+
+    @staticmethod
+    def normalize_emails(emails: Iterable[str]) -> List[str]:
+        """
+        Return the emails stripped, in lower case and without duplicates
+        (keeping the original order).
+        """
+        normalized = (email.strip().lower() for email in emails)
+        return list(dict.fromkeys(email for email in normalized if email))
+
+    @staticmethod
+    def _directory_to_dict(directory: ParticipantsDirectoriesModel) -> dict:
+        """
+        Map a directory row to the directory schema fields.
+        """
+        return {
+            "uuid": str(directory.id),
+            "event": directory.event,
+            "eventName": directory.event_name,
+            "organization": directory.organization,
+        }
+
 
 ParticipantsController = ParticipantsControllerModel()
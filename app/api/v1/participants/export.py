@@ -0,0 +1,90 @@
+"""
+Participants - Export (CSV and NDJSON).
+
+The participants are streamed in pages, then the memory used by an export
+doesn't depend on the size of the event.
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator, List
+
+
+###################
+# Export Settings #
+###################
+
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# gzip container (wbits 16 + 15). Level 6 is the gzip default.
+GZIP_WBITS = 31
+GZIP_LEVEL = 6
+
+
+#############
+# Renderers #
+#############
+
+
+async def render_csv(
+    event_id: str, pages: AsyncIterator[List[str]]
+) -> AsyncIterator[bytes]:
+    """
+    Render the participants as a CSV file (event, email), one chunk per page.
+    """
+    yield b"event,email\r\n"
+
+    async for emails in pages:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows((event_id, email) for email in emails)
+        yield buffer.getvalue().encode()
+
+
+async def render_ndjson(
+    event_id: str, pages: AsyncIterator[List[str]]
+) -> AsyncIterator[bytes]:
+    """
+    Render the participants as newline delimited json, one participant per line.
+    """
+    async for emails in pages:
+        lines = (json.dumps({"event": event_id, "email": email}) for email in emails)
+        yield ("\n".join(lines) + "\n").encode()
+
+
+EXPORT_FORMATS = {
+    "csv": (CSV_MEDIA_TYPE, render_csv),
+    "ndjson": (NDJSON_MEDIA_TYPE, render_ndjson),
+}
+
+
+###############
+# Compression #
+###############
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Check if the client accepts a gzip response (Accept-Encoding header).
+    """
+    for encoding in (accept_encoding or "").split(","):
+        name, _, params = encoding.strip().partition(";")
+        if name.strip().lower() == "gzip":
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Compress a stream chunk by chunk. Each chunk is flushed, then the client
+    receives the data while the export is running.
+    """
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
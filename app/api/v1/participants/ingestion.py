@@ -0,0 +1,332 @@
+"""
+Participants - Registration ingestion.
+
+The registrations are validated, pushed to a redis stream and acknowledged
+without touching the db. A consumer (worker/ingestion.py) commits them in
+batches, then the db writes don't grow with the requests rate.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import redis
+from fastapi.concurrency import run_in_threadpool
+
+from worker.connection import redis_connection
+from .controller import ParticipantsController
+from .models import (
+    ParticipantsDirectoriesModel,
+    ParticipantsModel,
+    ParticipantsWaitlistModel,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+######################
+# Ingestion Settings #
+######################
+
+STREAM_KEY = "participants:registrations"
+DEAD_STREAM_KEY = "participants:registrations:dead"
+CONSUMER_GROUP = "participants-registry"
+DIRECTORIES_KEY = "participants:directories"
+
+# Approximated max length of the stream (trims the old acknowledged entries).
+STREAM_MAX_LEN = 1_000_000
+# A batch is committed when it has BATCH_SIZE items or BATCH_WINDOW ms passed.
+BATCH_SIZE = 1000
+BATCH_WINDOW = 50
+# Max wait for new registrations when the stream is empty (ms).
+IDLE_BLOCK = 1000
+# Seconds to wait before reading again the pending entries of a failed commit
+# (doubled on each consecutive failure, up to RETRY_MAX_DELAY).
+RETRY_DELAY = 5
+RETRY_MAX_DELAY = 60 * 5
+# Deliveries of a entry before it's moved to the dead stream, then a
+# registration that always fails doesn't block the next ones. With the
+# retry delays, a db outage of ~20 minutes is retried before.
+MAX_DELIVERIES = 10
+
+STATUS_TTL = 60 * 60 * 24  # One day
+QUEUED = "queued"
+REGISTERED = "registered"
+WAITLISTED = "waitlisted"
+REJECTED = "rejected"
+FAILED = "failed"
+
+EMAIL_REGEX = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def _status_key(event_id: str, email: str) -> str:
+    return f"participants:status:{event_id}:{email}"
+
+
+def normalize_email(email: str) -> Optional[str]:
+    """
+    Return the email stripped and in lower case. None if it isn't valid.
+    """
+    email = email.strip().lower()
+    if len(email) > 254 or not EMAIL_REGEX.match(email):
+        return None
+    return email
+
+
+############
+# Producer #
+############
+
+
+async def is_known_directory(event_id: str) -> bool:
+    """
+    Check if the event has a participants directory. The known events are
+    cached in a redis set, then the validation doesn't use the db.
+    """
+    known = await run_in_threadpool(
+        redis_connection.sismember, DIRECTORIES_KEY, event_id
+    )
+    if known:
+        return True
+
+    exists = await ParticipantsDirectoriesModel.filter(event=event_id).exists()
+    if exists:
+        await run_in_threadpool(redis_connection.sadd, DIRECTORIES_KEY, event_id)
+    return exists
+
+
+async def forget_directory(event_id: str) -> None:
+    """
+    Remove the event from the known directories (on directory delete).
+    """
+    await run_in_threadpool(redis_connection.srem, DIRECTORIES_KEY, event_id)
+
+
+def _queue_entry(pipeline, event_id: str, email: str) -> None:
+    pipeline.set(_status_key(event_id, email), QUEUED, ex=STATUS_TTL)
+    pipeline.xadd(
+        STREAM_KEY,
+        {"event": event_id, "email": email},
+        maxlen=STREAM_MAX_LEN,
+        approximate=True,
+    )
+
+
+def _enqueue(event_id: str, email: str) -> None:
+    pipeline = redis_connection.pipeline()
+    _queue_entry(pipeline, event_id, email)
+    pipeline.execute()
+
+
+async def enqueue_registration(event_id: str, email: str) -> None:
+    """
+    Push a (validated) registration to the ingestion stream.
+    """
+    await run_in_threadpool(_enqueue, event_id, email)
+
+
+async def registration_status(event_id: str, email: str) -> Optional[str]:
+    """
+    Return the status of a registration. The statuses expire, then an old
+    registration is confirmed from the db. None if it doesn't exist.
+    """
+    status = await run_in_threadpool(redis_connection.get, _status_key(event_id, email))
+    if status:
+        return status.decode()
+
+    registered = await ParticipantsModel.filter(event=event_id, email=email).exists()
+    if registered:
+        return REGISTERED
+
+    waitlisted = await ParticipantsWaitlistModel.filter(
+        event=event_id, email=email
+    ).exists()
+    return WAITLISTED if waitlisted else None
+
+
+############
+# Consumer #
+############
+
+
+def _ensure_group() -> None:
+    try:
+        redis_connection.xgroup_create(
+            STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True
+        )
+    except redis.ResponseError as error:
+        if "BUSYGROUP" not in str(error):
+            raise
+
+
+def _read_batch(consumer: str, pending: bool) -> List[Tuple[bytes, dict]]:
+    """
+    Read up to BATCH_SIZE entries. After the first entry, wait at most
+    BATCH_WINDOW ms for the batch to fill.
+    The pending entries (delivered but not acknowledged, Eg: after a crash)
+    are read first.
+    """
+    stream_id = "0" if pending else ">"
+    batch = []
+    deadline = None
+    while len(batch) < BATCH_SIZE:
+        if deadline is None:
+            block = None if pending else IDLE_BLOCK
+        else:
+            block = int((deadline - time.monotonic()) * 1000)
+            if block <= 0:
+                break
+
+        response = redis_connection.xreadgroup(
+            CONSUMER_GROUP,
+            consumer,
+            {STREAM_KEY: stream_id},
+            count=BATCH_SIZE - len(batch),
+            block=block,
+        )
+        entries = response[0][1] if response else []
+        if not entries or pending:
+            batch += entries
+            break
+
+        batch += entries
+        if deadline is None:
+            deadline = time.monotonic() + BATCH_WINDOW / 1000
+
+    return batch
+
+
+def _dead_letter_exhausted(
+    consumer: str, batch: List[Tuple[bytes, dict]]
+) -> List[Tuple[bytes, dict]]:
+    """
+    Move the pending entries delivered more than MAX_DELIVERIES times (the
+    XPENDING delivery counts) to the dead stream and acknowledge them.
+    Return the rest of the batch.
+    """
+    pending = redis_connection.xpending_range(
+        STREAM_KEY, CONSUMER_GROUP, batch[0][0], batch[-1][0], len(batch), consumer
+    )
+    exhausted = {
+        entry["message_id"]
+        for entry in pending
+        if entry["times_delivered"] > MAX_DELIVERIES
+    }
+    if not exhausted:
+        return batch
+
+    pipeline = redis_connection.pipeline()
+    for entry_id, fields in batch:
+        if entry_id in exhausted:
+            pipeline.xadd(DEAD_STREAM_KEY, {**fields, b"entry": entry_id})
+            event_id, email = fields[b"event"].decode(), fields[b"email"].decode()
+            pipeline.set(_status_key(event_id, email), FAILED, ex=STATUS_TTL)
+    pipeline.xack(STREAM_KEY, CONSUMER_GROUP, *exhausted)
+    pipeline.execute()
+
+    logger.error("Registrations moved to %s: %s", DEAD_STREAM_KEY, len(exhausted))
+    return [entry for entry in batch if entry[0] not in exhausted]
+
+
+def replay_dead_registrations() -> int:
+    """
+    Push the dead registrations back to the ingestion stream (Eg: after
+    fixing the cause of the failures). Return the replayed count.
+    """
+    replayed = 0
+    while True:
+        entries = redis_connection.xrange(DEAD_STREAM_KEY, count=BATCH_SIZE)
+        if not entries:
+            return replayed
+
+        pipeline = redis_connection.pipeline()
+        for _, fields in entries:
+            _queue_entry(pipeline, fields[b"event"].decode(), fields[b"email"].decode())
+        pipeline.xdel(DEAD_STREAM_KEY, *[entry_id for entry_id, _ in entries])
+        pipeline.execute()
+        replayed += len(entries)
+
+
+async def _commit_batch(batch: List[Tuple[bytes, dict]]) -> Dict[str, int]:
+    """
+    Register the batch grouped by event (one registration per event) and
+    publish the statuses. The entries are acknowledged after the commit.
+    """
+    emails_by_event = defaultdict(list)
+    for _, fields in batch:
+        emails_by_event[fields[b"event"].decode()].append(fields[b"email"].decode())
+
+    statuses = {}
+    for event_id, emails in emails_by_event.items():
+        result = await ParticipantsController.register_emails(event_id, emails)
+        if result == 404:
+            statuses.update(
+                {_status_key(event_id, email): REJECTED for email in emails}
+            )
+            continue
+
+        # The emails already known (None) are resolved from the db on read.
+        _, registered, waitlisted = result
+        statuses.update({_status_key(event_id, email): None for email in emails})
+        statuses.update(
+            {_status_key(event_id, email): REGISTERED for email in registered}
+        )
+        statuses.update(
+            {_status_key(event_id, email): WAITLISTED for email in waitlisted}
+        )
+
+    pipeline = redis_connection.pipeline()
+    for key, status in statuses.items():
+        if status:
+            pipeline.set(key, status, ex=STATUS_TTL)
+        else:
+            pipeline.delete(key)
+    pipeline.xack(STREAM_KEY, CONSUMER_GROUP, *[entry_id for entry_id, _ in batch])
+    pipeline.execute()
+
+    return dict(Counter(statuses.values()))
+
+
+async def consume_registrations(consumer: str = "ingestion-1") -> None:
+    """
+    Commit the queued registrations forever. The consumer runs in its own
+    process, then the redis calls block it directly. A failed commit (Eg: a
+    db error) leaves its entries pending, then they are read again later,
+    up to MAX_DELIVERIES times (then they go to the dead stream).
+
+    Params:
+    ------
+    - consumer: str - The consumer name in the group (unique per process).
+    """
+    _ensure_group()
+
+    pending = True
+    failures = 0
+    while True:
+        batch = _read_batch(consumer, pending)
+        if pending and batch:
+            batch = _dead_letter_exhausted(consumer, batch)
+            if not batch:
+                continue
+        if pending and not batch:
+            pending = False
+            continue
+        if not batch:
+            continue
+
+        try:
+            committed = await _commit_batch(batch)
+        except Exception as error:  # pylint: disable=broad-except
+            logger.warning(
+                "Registrations not committed: %s", len(batch), exc_info=error
+            )
+            await asyncio.sleep(min(RETRY_DELAY * 2 ** failures, RETRY_MAX_DELAY))
+            failures += 1
+            pending = True
+            continue
+        failures = 0
+        logger.info("Registrations committed: %s - %s", len(batch), committed)
@@ -0,0 +1,54 @@
+"""
+Participants - Background jobs.
+"""
+
+import logging
+
+from tortoise.transactions import in_transaction
+
+from db.jobs import run_db_job
+from .models import ParticipantsDirectoriesModel, ParticipantsModel
+from .seats import reset_seats
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _reconcile_counts() -> None:
+    """
+    Recount the participants of each directory and fix the drifted counters.
+    The directory row is locked while counting, then the concurrent
+    registrations wait and are never lost.
+    """
+    events = await ParticipantsDirectoriesModel.all().values_list("event", flat=True)
+
+    fixed = 0
+    for event in events:
+        async with in_transaction():
+            directory = (
+                await ParticipantsDirectoriesModel.filter(event=event)
+                .select_for_update()
+                .first()
+            )
+            if not directory:
+                continue
+
+            count = await ParticipantsModel.filter(event=event).count()
+            if directory.count != count:
+                await ParticipantsDirectoriesModel.filter(event=event).update(
+                    count=count
+                )
+                fixed += 1
+
+        # The seats counter was seeded from the wrong count.
+        if directory.count != count and directory.capacity is not None:
+            await reset_seats(event)
+
+    logger.info("Participants counts reconciled: %s - fixed: %s", len(events), fixed)
+
+
+def reconcile_counts() -> None:
+    """
+    Job: reconcile the participants counters (see worker.periodic).
+    """
+    run_db_job(_reconcile_counts)
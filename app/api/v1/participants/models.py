@@ -1,13 +1,179 @@
 """
-Participants db - Model
+Participants db - Models
 """
 
-from db.crud import CRUD
+import time
+from datetime import datetime
+from typing import List
+from uuid import uuid4
 
+from tortoise import fields
+from tortoise.backends.base.client import BaseDBAsyncClient
+from utils.abstrac_model import UnuBaseModel
 
-###########################################
-##           Events CRUD ORM             ##
-###########################################
 
-COLLECTION_NAME = "participants"
-ParticipantsModel = CRUD(COLLECTION_NAME)
+class ParticipantsDirectoriesModel(UnuBaseModel):
+    """
+    Participants directory entitie. One per event.
+    """
+
+    # The event uuid the directory belongs.
+    event = fields.CharField(max_length=36, unique=True)
+    event_name = fields.CharField(max_length=120)
+    organization = fields.CharField(max_length=120)
+    # Registered participants. Updated in the same transaction of each
+    # register/unregister and reconciled periodically (jobs.reconcile_counts).
+    count = fields.IntField(default=0)
+    # Max participants. None for events without limit.
+    capacity = fields.IntField(null=True)
+    # The event start in UTC (swept by the reminders job), the time the
+    # day-before reminder was marked and the id of its campaign. None until
+    # it's sent. A mark without campaign is a send in progress (or crashed).
+    starts_at = fields.DatetimeField(null=True, index=True)
+    reminded_at = fields.DatetimeField(null=True)
+    reminder_campaign = fields.CharField(max_length=32, null=True)
+
+    class Meta:
+        """
+        Meta properties.
+        """
+
+        table = "participants_directories"
+
+
+class ParticipantsModel(UnuBaseModel):
+    """
+    Participant entitie. A registered email in one event.
+    """
+
+    # The event uuid the participant is registered.
+    event = fields.CharField(max_length=36)
+    email = fields.CharField(max_length=254)
+
+    class Meta:
+        """
+        Meta properties.
+        """
+
+        table = "participants"
+        # Also serves the lookups of all participants of one event.
+        unique_together = (("event", "email"),)
+
+    @classmethod
+    async def bulk_register(
+        cls, event: str, emails: List[str], using_db: BaseDBAsyncClient
+    ) -> List[str]:
+        """
+        Insert the emails of one event in a single statement. The already
+        registered emails are skipped by the unique index (ON CONFLICT DO NOTHING).
+
+        Params:
+        ------
+        - event: str - The event uuid.
+        - emails: List[str] - The normalized emails (without duplicates).
+        - using_db: BaseDBAsyncClient - The connection (transaction) to use.
+
+        Return:
+        ------
+        - registered: List[str] - The emails inserted by this call.
+        """
+        if not emails:
+            return []
+
+        now = datetime.utcnow()
+        ids = [uuid4() for _ in emails]
+        _, rows = await using_db.execute_query(
+            BULK_REGISTER_SQL, [ids, emails, event, now]
+        )
+        return [row["email"] for row in rows]
+
+
+class ParticipantsWaitlistModel(UnuBaseModel):
+    """
+    Waitlist entitie. A email waiting for a seat in one event.
+    """
+
+    event = fields.CharField(max_length=36)
+    email = fields.CharField(max_length=254)
+    # Order in the waitlist (a timestamp in ns, see bulk_enqueue).
+    position = fields.BigIntField()
+
+    class Meta:
+        """
+        Meta properties.
+        """
+
+        table = "participants_waitlist"
+        unique_together = (("event", "email"),)
+        indexes = (("event", "position"),)
+
+    @classmethod
+    async def bulk_enqueue(
+        cls, event: str, emails: List[str], using_db: BaseDBAsyncClient
+    ) -> List[str]:
+        """
+        Append the emails to the waitlist of one event, in the passed order.
+        The emails already waiting keep their position.
+
+        Return:
+        ------
+        - waitlisted: List[str] - The emails inserted by this call.
+        """
+        if not emails:
+            return []
+
+        now = datetime.utcnow()
+        first_position = time.time_ns()
+        ids = [uuid4() for _ in emails]
+        positions = [first_position + index for index, _ in enumerate(emails)]
+        _, rows = await using_db.execute_query(
+            BULK_ENQUEUE_SQL, [ids, emails, positions, event, now]
+        )
+        return [row["email"] for row in rows]
+
+    @classmethod
+    async def pop(
+        cls, event: str, limit: int, using_db: BaseDBAsyncClient
+    ) -> List[str]:
+        """
+        Remove and return the first emails of the waitlist. The rows locked by
+        other transactions are skipped, then concurrent promotions take
+        different emails instead of waiting each other.
+        """
+        if limit <= 0:
+            return []
+
+        _, rows = await using_db.execute_query(WAITLIST_POP_SQL, [event, limit])
+        return [row["email"] for row in sorted(rows, key=lambda row: row["position"])]
+
+
+BULK_REGISTER_SQL = """
+INSERT INTO "participants" ("id", "email", "event", "created_at", "updated_at")
+SELECT "new"."id", "new"."email", $3::varchar, $4::timestamp, $4::timestamp
+FROM unnest($1::uuid[], $2::varchar[]) AS "new" ("id", "email")
+ON CONFLICT ("event", "email") DO NOTHING
+RETURNING "email"
+"""
+
+BULK_ENQUEUE_SQL = """
+INSERT INTO "participants_waitlist"
+    ("id", "email", "position", "event", "created_at", "updated_at")
+SELECT "new"."id", "new"."email", "new"."position", $4::varchar,
+    $5::timestamp, $5::timestamp
+FROM unnest($1::uuid[], $2::varchar[], $3::bigint[])
+    AS "new" ("id", "email", "position")
+ON CONFLICT ("event", "email") DO NOTHING
+RETURNING "email"
+"""
+
+WAITLIST_POP_SQL = """
+DELETE FROM "participants_waitlist"
+WHERE "id" IN (
+    SELECT "id" FROM "participants_waitlist"
+    WHERE "event" = $1
+    ORDER BY "position"
+    LIMIT $2
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING "email", "position"
+"""
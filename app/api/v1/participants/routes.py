@@ -3,14 +3,31 @@ Participants - Routes.
 """
 
 # external imports
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 
 # module
-from auth.service import get_current_user
+from auth.service import get_current_user, check_authorization_on_event
 from utils import exceptions, responses
-from .schemas import PariticipantsDir, PariticipantsDirOut, RegisterResponse
+from .schemas import (
+    PariticipantsDir,
+    PariticipantsDirOut,
+    RegisterResponse,
+    BulkRegisterIn,
+    BulkRegisterResponse,
+    ParticipantsCount,
+    RegistrationStatus,
+    CapacityIn,
+)
 from .controller import ParticipantsController
-
+from .export import EXPORT_FORMATS, accepts_gzip, gzip_stream
+from .ingestion import (
+    enqueue_registration,
+    forget_directory,
+    is_known_directory,
+    normalize_email,
+    registration_status,
+)
 
 router = APIRouter()
 
@@ -66,14 +83,124 @@ async def register_a_participant(event_id: str, email: str):
 
     if registered == 404:
         exceptions.not_fount_404("Event not found")
-    if registered is None:
-        exceptions.server_error_500("Server Error")
-    if registered == 0:
+    if registered.waitlisted:
+        return {"detail": "The event is full. Added to the waitlist", "event": event_id}
+    if registered.registered == 0:
         return {"detail": "Email already registered", "event": event_id}
 
     return {"detail": "Registered successful", "event": event_id}
 
 
+@router.post(
+    "/register/queue",
+    status_code=202,
+    response_model=RegisterResponse,
+    responses={
+        "400": {"model": exceptions.BadRequest},
+        "404": {"model": exceptions.NotFound},
+        "500": {"model": exceptions.ServerError},
+    },
+)
+async def queue_a_participant_registration(event_id: str, email: str):
+    """
+    Register a new participant asynchronously (Eg: on launches with high
+    traffic). The registration is validated and queued, then committed in a
+    batch in a few milliseconds. Confirm it with GET /register/status.
+    """
+    normalized_email = normalize_email(email)
+
+    if not normalized_email:
+        exceptions.bad_request_400("Invalid email")
+    if not await is_known_directory(event_id):
+        exceptions.not_fount_404("Event not found")
+
+    await enqueue_registration(event_id, normalized_email)
+
+    return {"detail": "Registration queued", "event": event_id}
+
+
+@router.get(
+    "/register/status",
+    status_code=200,
+    response_model=RegistrationStatus,
+    responses={
+        "404": {"model": exceptions.NotFound},
+        "500": {"model": exceptions.ServerError},
+    },
+)
+async def get_registration_status(event_id: str, email: str):
+    """
+    Return the status of a registration: queued, registered, waitlisted,
+    rejected or failed.
+    """
+    normalized_email = normalize_email(email) or email
+    status = await registration_status(event_id, normalized_email)
+
+    if not status:
+        exceptions.not_fount_404("Registration not found")
+
+    return {"event": event_id, "email": normalized_email, "status": status}
+
+
+@router.post(
+    "/register/bulk",
+    status_code=201,
+    response_model=BulkRegisterResponse,
+    responses={
+        "401": {"model": exceptions.Unauthorized},
+        "403": {"model": exceptions.Forbidden},
+        "404": {"model": exceptions.NotFound},
+        "500": {"model": exceptions.ServerError},
+    },
+)
+async def register_many_participants(
+    body: BulkRegisterIn, user: dict = Depends(get_current_user)
+):
+    """
+    Register many participants at once (Eg: an imported list).
+    The already registered emails are skipped.
+    """
+    if not check_authorization_on_event(user, body.event):
+        exceptions.forbidden_403("Operation Forbidden")
+
+    registered = await ParticipantsController.register_many(body.event, body.emails)
+
+    if registered == 404:
+        exceptions.not_fount_404("Event not found")
+
+    return registered
+
+
+@router.delete(
+    "/register",
+    status_code=200,
+    response_model=RegisterResponse,
+    responses={
+        "401": {"model": exceptions.Unauthorized},
+        "403": {"model": exceptions.Forbidden},
+        "404": {"model": exceptions.NotFound},
+        "500": {"model": exceptions.ServerError},
+    },
+)
+async def unregister_a_participant(
+    event_id: str, email: str, user: dict = Depends(get_current_user)
+):
+    """
+    Remove a participant from one event (only the event organizers).
+    """
+    if not check_authorization_on_event(user, event_id):
+        exceptions.forbidden_403("Operation Forbidden")
+
+    deleted = await ParticipantsController.unregister(event_id, email)
+
+    if deleted == 404:
+        exceptions.not_fount_404("Event not found")
+    if deleted == 0:
+        exceptions.not_fount_404("Email not registered")
+
+    return {"detail": "Unregistered successful", "event": event_id}
+
+
 ###########################################
 ##      Get  Participants Directory      ##
 ###########################################
@@ -103,6 +230,134 @@ async def get_participants_dir(event_id: str, user: dict = Depends(get_current_u
     return participants_dir
 
 
+@router.get(
+    "/{event_id}/count",
+    status_code=200,
+    response_model=ParticipantsCount,
+    responses={
+        "404": {"model": exceptions.NotFound},
+        "403": {"model": exceptions.Forbidden},
+        "500": {"model": exceptions.ServerError},
+    },
+)
+async def get_participants_count(event_id: str, user: dict = Depends(get_current_user)):
+    """
+    Return the number of participants of a specific event.
+    """
+    count = await ParticipantsController.count(event_id, user)
+
+    if count == 403:
+        exceptions.forbidden_403("Resource forbidden")
+    if count == 404:
+        exceptions.not_fount_404("Directory for event not found")
+
+    return count
+
+
+@router.put(
+    "/{event_id}/capacity",
+    status_code=200,
+    response_model=ParticipantsCount,
+    responses={
+        "401": {"model": exceptions.Unauthorized},
+        "403": {"model": exceptions.Forbidden},
+        "404": {"model": exceptions.NotFound},
+        "500": {"model": exceptions.ServerError},
+    },
+)
+async def set_participants_capacity(
+    event_id: str, body: CapacityIn, user: dict = Depends(get_current_user)
+):
+    """
+    Change the max participants of the event (null for no limit).
+    The waitlisted emails are registered if there are new free seats.
+    """
+    count = await ParticipantsController.set_capacity(event_id, body.capacity, user)
+
+    if count == 403:
+        exceptions.forbidden_403("Operation Forbidden")
+    if count == 404:
+        exceptions.not_fount_404("Directory for event not found")
+
+    return count
+
+
+###########################################
+##       Export Participants Directory   ##
+###########################################
+
+
+@router.get(
+    "/{event_id}.csv",
+    status_code=200,
+    response_class=StreamingResponse,
+    responses={
+        "200": {"content": {"text/csv": {}}},
+        "403": {"model": exceptions.Forbidden},
+        "404": {"model": exceptions.NotFound},
+        "500": {"model": exceptions.ServerError},
+    },
+)
+async def export_participants_as_csv(
+    event_id: str, request: Request, user: dict = Depends(get_current_user)
+):
+    """
+    Download the participants of one event as a CSV file.
+    Compressed with gzip if the client accepts it.
+    """
+    return await _export_participants(event_id, "csv", request, user)
+
+
+@router.get(
+    "/{event_id}.ndjson",
+    status_code=200,
+    response_class=StreamingResponse,
+    responses={
+        "200": {"content": {"application/x-ndjson": {}}},
+        "403": {"model": exceptions.Forbidden},
+        "404": {"model": exceptions.NotFound},
+        "500": {"model": exceptions.ServerError},
+    },
+)
+async def export_participants_as_ndjson(
+    event_id: str, request: Request, user: dict = Depends(get_current_user)
+):
+    """
+    Stream the participants of one event as newline delimited json.
+    Compressed with gzip if the client accepts it.
+    """
+    return await _export_participants(event_id, "ndjson", request, user)
+
+
+async def _export_participants(
+    event_id: str, export_format: str, request: Request, user: dict
+):
+    """
+    Check the directory and stream the export. The errors are raised before
+    the first chunk, after it the status code can't change.
+    """
+    count = await ParticipantsController.count(event_id, user)
+
+    if count == 403:
+        exceptions.forbidden_403("Resource forbidden")
+    if count == 404:
+        exceptions.not_fount_404("Directory for event not found")
+
+    media_type, render = EXPORT_FORMATS[export_format]
+    content = render(event_id, ParticipantsController.stream_emails(event_id))
+    headers = {
+        "Content-Disposition": f'attachment; filename="{event_id}.{export_format}"',
+        "X-Total-Count": str(count.count),
+        "Vary": "Accept-Encoding",
+    }
+
+    if accepts_gzip(request.headers.get("accept-encoding")):
+        content = gzip_stream(content)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(content, media_type=media_type, headers=headers)
+
+
 ###########################################
 ##    Delete a Participants Directory    ##
 ###########################################
@@ -126,4 +381,6 @@ async def delete_a_participants_directory(event_id: str):
     if deleted == 404:
         return exceptions.not_fount_404("Directory for passed event not found")
 
+    await forget_directory(event_id)
+
     return {"detail": f"deleted count: {deleted}"}
@@ -2,10 +2,14 @@
 Speakers - Schemas
 """
 
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field  # pylint: disable-msg=E0611
 
 
+# Max emails per bulk registration request.
+BULK_REGISTER_LIMIT = 20000
+
+
 class PariticipantsDir(BaseModel):
     """
     Body for create a new participants directory.
@@ -33,3 +37,54 @@ class RegisterResponse(BaseModel):
 
     detail: str = Field(example="Resgister Successfull")
     event: str
+
+
+class BulkRegisterIn(BaseModel):
+    """
+    Body for register many participants at once.
+    """
+
+    event: str = Field(..., description="The event uuid - Foreigyn Key")
+    emails: List[str] = Field(..., min_items=1, max_items=BULK_REGISTER_LIMIT)
+
+
+class BulkRegisterResponse(RegisterResponse):
+    """
+    Response on register many participants.
+    """
+
+    received: int = Field(description="Distinct emails received")
+    registered: int = Field(description="New participants (not registered yet)")
+    waitlisted: int = Field(0, description="New emails in the waitlist (event full)")
+
+
+class ParticipantsCount(BaseModel):
+    """
+    Participants count of one event.
+    """
+
+    event: str
+    count: int = Field(example=120)
+    capacity: Optional[int] = Field(None, description="None for no limit")
+    waitlisted: int = 0
+
+
+class CapacityIn(BaseModel):
+    """
+    Body for change the capacity of an event.
+    """
+
+    capacity: Optional[int] = Field(..., ge=0, description="None for no limit")
+
+
+class RegistrationStatus(BaseModel):
+    """
+    Status of a queued registration.
+    """
+
+    event: str
+    email: str
+    status: str = Field(
+        example="registered",
+        description="queued | registered | waitlisted | rejected | failed",
+    )
@@ -0,0 +1,154 @@
+"""
+Participants - Seats allocator.
+
+The allocated seats of the events with capacity are counted in redis. A
+reservation is a single atomic script, then thousands of concurrent
+registrations never oversell and never wait for a db lock.
+The db count is the source of truth: the counter is seeded from it and
+reset when it can't be trusted (capacity changes, reconciliation).
+"""
+
+from typing import Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from worker.connection import redis_connection
+
+
+# The counter is a hash: "used" (the allocated seats) and "version" (the
+# generation). A reset starts a new generation, then the releases of the
+# reservations made before it are ignored instead of lowering the new count.
+#
+# The counter is seeded (seed_seats) with the directory row locked, and the
+# registrations check the generation (seats_state) with the same row locked
+# before they commit. Then a seed never misses a committed registration, and
+# a reservation made before a reset is never committed after the seed.
+
+# KEYS[1]: seats key - ARGV: capacity, requested seats.
+# Return [granted seats, version]. Granted is -1 if the counter isn't seeded.
+RESERVE_SCRIPT = redis_connection.register_script(
+    """
+    local version = tonumber(redis.call("HGET", KEYS[1], "version") or 0)
+    local used = tonumber(redis.call("HGET", KEYS[1], "used"))
+    if not used then
+        return {-1, version}
+    end
+    local free = math.max(tonumber(ARGV[1]) - used, 0)
+    local granted = math.min(free, tonumber(ARGV[2]))
+    if granted > 0 then
+        redis.call("HINCRBY", KEYS[1], "used", granted)
+    end
+    return {granted, version}
+    """
+)
+
+# KEYS[1]: seats key - ARGV: seats, version ("" for the current one).
+# Decrement only a seeded counter of the same generation, never below 0.
+RELEASE_SCRIPT = redis_connection.register_script(
+    """
+    local version = tonumber(redis.call("HGET", KEYS[1], "version") or 0)
+    if ARGV[2] ~= "" and tonumber(ARGV[2]) ~= version then
+        return 0
+    end
+    local used = tonumber(redis.call("HGET", KEYS[1], "used"))
+    if not used then
+        return 0
+    end
+    redis.call("HSET", KEYS[1], "used", math.max(used - tonumber(ARGV[1]), 0))
+    return 1
+    """
+)
+
+# KEYS[1]: seats key. Start a new generation, seeded by the next reservation.
+RESET_SCRIPT = redis_connection.register_script(
+    """
+    redis.call("HINCRBY", KEYS[1], "version", 1)
+    redis.call("HDEL", KEYS[1], "used")
+    """
+)
+
+
+class SeatsReset(Exception):
+    """
+    The counter was reset after the reservation: the registration must be
+    rolled back and retried in the new generation.
+    """
+
+
+def _seats_key(event_id: str) -> str:
+    return f"participants:seats:{event_id}"
+
+
+async def reserve_seats(
+    event_id: str, capacity: int, requested: int
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Reserve up to requested seats. Release the seats not used after the
+    registration (Eg: failed transaction or duplicated emails), with the
+    returned version.
+
+    Params:
+    ------
+    - event_id: str - The event uuid.
+    - capacity: int - The event capacity.
+    - requested: int - The seats to reserve.
+
+    Return:
+    ------
+    - (granted, version): The reserved seats (0 if the event is full, None
+    if the counter must be seeded first) and the generation of the counter.
+    """
+    if requested <= 0:
+        return 0, None
+
+    granted, version = await run_in_threadpool(
+        RESERVE_SCRIPT, keys=[_seats_key(event_id)], args=[capacity, requested]
+    )
+    return (None if granted < 0 else granted), version
+
+
+async def seed_seats(event_id: str, db_count: int) -> None:
+    """
+    Seed the counter with the registered participants, if it isn't seeded.
+    Call it with the directory row locked (select_for_update).
+    """
+    await run_in_threadpool(
+        redis_connection.hsetnx, _seats_key(event_id), "used", db_count
+    )
+
+
+async def seats_state(event_id: str) -> Tuple[int, bool]:
+    """
+    Return the generation of the counter and if it's seeded.
+    Call it with the directory row locked, before the commit.
+    """
+    version, used = await run_in_threadpool(
+        redis_connection.hmget, _seats_key(event_id), "version", "used"
+    )
+    return int(version or 0), used is not None
+
+
+async def release_seats(event_id: str, seats: int, version: int = None) -> None:
+    """
+    Return seats to the event (cancellations and unused reservations).
+    The seats of a reservation are released only in its generation, and a
+    counter not seeded yet is left as is (the seed is the db count).
+
+    Params:
+    ------
+    - version: int - The generation of the reservation. None: the current.
+    """
+    if seats > 0:
+        await run_in_threadpool(
+            RELEASE_SCRIPT,
+            keys=[_seats_key(event_id)],
+            args=[seats, "" if version is None else version],
+        )
+
+
+async def reset_seats(event_id: str) -> None:
+    """
+    Forget the counter. The next reservation seeds it from the db count, and
+    the reservations in flight don't change it.
+    """
+    await run_in_threadpool(RESET_SCRIPT, keys=[_seats_key(event_id)])
@@ -1,15 +1,18 @@
 """
-Organizations - Controller
+Speakers - Controller
 """
 
 # build-in imports
-from uuid import uuid4
 from typing import List
+from uuid import UUID
+
+# external imports
+from fastapi.concurrency import run_in_threadpool
 
 # module imports
 from auth.service import check_authorization_on_event
-from utils.general import store_file
-from .models import SpeakerModel
+from storage.service import get_or_update_logo
+from .models import SpeakersModel
 from .schemas import SpeakerIn, SpeakerOut
 
 
@@ -19,55 +22,64 @@ class SpeakerControllerModel:
     """
 
     def __init__(self):
-        self.model = SpeakerModel
+        self.model = SpeakersModel
 
     async def create(self, speaker: SpeakerIn, user: dict) -> SpeakerOut:
         """
         Create a new speaker.
         """
-        authorized = check_authorization_on_event(user, speaker.event)
-        if not authorized:
+        if not check_authorization_on_event(user, speaker.event):
             return 403
 
-        query = {"event": speaker.event, "name": speaker.name}
-        existing_name = await self.model.find(query)
+        existing_name = await self.model.filter(
+            event=speaker.event, name=speaker.name
+        ).exists()
         if existing_name:
             return 409
 
         speaker_data: dict = speaker.dict()
-        speaker_data.update({"uuid": str(uuid4())})
-
-        photo: str = store_file(file_b64=speaker_data["photo"])
-        speaker_data.update({"photo": photo})
+        speaker_data.update({"photo": await self._store_photo(speaker_data["photo"])})
 
-        new_speaker = SpeakerOut(**speaker_data)
-
-        inserted_id = await self.model.create(new_speaker.dict())
-        if not inserted_id:
+        new_speaker = await self.model.create(**speaker_data)
+        if not new_speaker:
             return False
 
-        return new_speaker
+        return SpeakerOut(**self.to_dict(new_speaker))
 
     async def read(self, speaker_id: str) -> SpeakerOut:
         """
         Retrieve a existing speaker
         """
-        query = {"uuid": speaker_id}
-        speaker = await self.model.find(query)
+        speaker = await self.model.get_or_none(id=speaker_id)
         if not speaker:
             return False
 
-        return SpeakerOut(**speaker)
+        return SpeakerOut(**self.to_dict(speaker))
 
     async def read_many(self, event_id: str) -> List[SpeakerOut]:
         """
         Retrieve a list of speakers thath belongs to an event.
         """
-        query = {"event": event_id}
-        speakers = await self.model.find(query, only_one=False)
-        if not speakers:
+        speakers = await self.model.filter(event=event_id).order_by("name")
+        return [SpeakerOut(**self.to_dict(speaker)) for speaker in speakers]
+
+    async def find_many(self, speakers_ids: List[str]) -> List[dict]:
+        """
+        Return the speakers of the passed uuids in one query (batch loaders).
+        Malformed uuids (Eg: conferences without speaker) are not found.
+        """
+        valid_ids = []
+        for speaker_id in speakers_ids:
+            try:
+                valid_ids.append(UUID(str(speaker_id)))
+            except ValueError:
+                continue
+
+        if not valid_ids:
             return []
-        return speakers
+
+        speakers = await self.model.filter(id__in=valid_ids)
+        return [self.to_dict(speaker) for speaker in speakers]
 
     async def update(
         self, speaker_id: str, new_speaker_data: SpeakerIn, user: dict
@@ -75,38 +87,55 @@ class SpeakerControllerModel:
         """
         Update a existing speaker
         """
-        speaker = await self.read(speaker_id)
+        speaker = await self.model.get_or_none(id=speaker_id)
         if not speaker:
             return 404
 
-        authorized = check_authorization_on_event(user, speaker.event)
-        if not authorized:
+        if not check_authorization_on_event(user, speaker.event):
             return 403
 
         new_data = new_speaker_data.dict()
+        new_data.update({"photo": await self._store_photo(new_data["photo"])})
 
-        photo = store_file(file_b64=new_data["photo"])
-        new_data.update({"photo": photo})
-
-        query = {"uuid": speaker_id}
-        updated = await self.model.update(query, new_data)
-
+        updated = await self.model.filter(id=speaker_id).update(**new_data)
         return updated
 
     async def delete(self, speaker_id: str, user: dict) -> int:
         """
         Delete a existing speaker
         """
-        speaker = await self.model.find({"uuid": speaker_id})
+        speaker = await self.model.get_or_none(id=speaker_id)
         if not speaker:
             return 404, None
 
-        authorized = check_authorization_on_event(user, speaker["event"])
-        if not authorized:
-            return 403
+        if not check_authorization_on_event(user, speaker.event):
+            return 403, None
+
+        deleted_count = await self.model.filter(id=speaker_id).delete()
+        return deleted_count, speaker.event
+
+    @staticmethod
+    async def _store_photo(photo: str) -> str:
+        """
+        Upload the photo if it is base64 encoded and return its url.
+        """
+        if not photo:
+            return ""
+        return await run_in_threadpool(get_or_update_logo, photo) or ""
 
-        deleted_count = await self.model.delete({"uuid": speaker_id})
-        return deleted_count, speaker["event"]
+    @staticmethod
+    def to_dict(speaker: SpeakersModel) -> dict:
+        """
+        Map a speaker row to the speaker schema fields.
+        """
+        return {
+            "uuid": str(speaker.id),
+            "name": speaker.name,
+            "biography": speaker.biography,
+            "twitter_url": speaker.twitter_url,
+            "photo": speaker.photo,
+            "event": speaker.event,
+        }
 
 
 SpeakerController = SpeakerControllerModel()
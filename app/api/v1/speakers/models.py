@@ -1,13 +1,28 @@
 """
-Speaker db - Model
+Speakers db - Models
 """
 
-from db.crud import CRUD
+from tortoise import fields
+from utils.abstrac_model import UnuBaseModel
 
 
-###########################################
-##           Speakers CRUD ORM           ##
-###########################################
+class SpeakersModel(UnuBaseModel):
+    """
+    Speaker entitie.
+    """
 
-COLLECTION_NAME = "speakers"
-SpeakerModel = CRUD(COLLECTION_NAME)
+    name = fields.CharField(max_length=120)
+    biography = fields.TextField()
+    twitter_url = fields.CharField(max_length=255, default="")
+    # The stored photo url.
+    photo = fields.CharField(max_length=255, default="")
+    # The event uuid the speaker belongs.
+    event = fields.CharField(max_length=36, index=True)
+
+    class Meta:
+        """
+        Meta properties.
+        """
+
+        table = "speakers"
+        unique_together = (("event", "name"),)
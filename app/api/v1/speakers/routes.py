@@ -30,10 +30,10 @@ router = APIRouter()
     status_code=201,
     response_model=SpeakerOut,
     responses={
-        "401": {"model": exceptions.Unauthorized},
-        "403": {"model": exceptions.Forbidden},
-        "409": {"model": exceptions.Conflict},
-        "500": {"model": exceptions.ServerError},
+        "401": {"model": responses.Unauthorized},
+        "403": {"model": responses.Forbidden},
+        "409": {"model": responses.Conflict},
+        "500": {"model": responses.ServerError},
     },
 )
 async def create_a_new_speaker(
@@ -68,7 +68,7 @@ async def create_a_new_speaker(
     "",
     status_code=200,
     response_model=List[SpeakerOut],
-    responses={"500": {"model": exceptions.ServerError}},
+    responses={"500": {"model": responses.ServerError}},
 )
 async def get_speakers_list(event_id: str):
     """
@@ -83,9 +83,9 @@ async def get_speakers_list(event_id: str):
     status_code=200,
     response_model=SpeakerOut,
     responses={
-        "401": {"model": exceptions.Unauthorized},
-        "404": {"model": exceptions.NotFound},
-        "500": {"model": exceptions.ServerError},
+        "401": {"model": responses.Unauthorized},
+        "404": {"model": responses.NotFound},
+        "500": {"model": responses.ServerError},
     },
 )
 async def get_a_speaker(speaker_id: str, _=Depends(get_current_user)):
@@ -109,10 +109,10 @@ async def get_a_speaker(speaker_id: str, _=Depends(get_current_user)):
     status_code=200,
     response_model=responses.Updated,
     responses={
-        "401": {"model": exceptions.Unauthorized},
-        "403": {"model": exceptions.Forbidden},
-        "404": {"model": exceptions.NotFound},
-        "500": {"model": exceptions.ServerError},
+        "401": {"model": responses.Unauthorized},
+        "403": {"model": responses.Forbidden},
+        "404": {"model": responses.NotFound},
+        "500": {"model": responses.ServerError},
     },
 )
 async def update_a_existing_speaker(
@@ -141,10 +141,10 @@ async def update_a_existing_speaker(
     status_code=200,
     response_model=responses.Deleted,
     responses={
-        "401": {"model": exceptions.Unauthorized},
-        "403": {"model": exceptions.Forbidden},
-        "404": {"model": exceptions.NotFound},
-        "500": {"model": exceptions.NotFound},
+        "401": {"model": responses.Unauthorized},
+        "403": {"model": responses.Forbidden},
+        "404": {"model": responses.NotFound},
+        "500": {"model": responses.ServerError},
     },
 )
 async def delete_a_existing_speaker(
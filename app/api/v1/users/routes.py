@@ -2,12 +2,16 @@
 Users - Routes.
 """
 
-from fastapi import APIRouter, Response, Body, Depends, BackgroundTasks
+from uuid import uuid4
+
+from fastapi import APIRouter, Response, Body, Depends
+from tortoise.transactions import in_transaction
 
 from config import settings
 from db import CRUD, IntegrityError
-from mails import send_welcome_email, send_recovery_password_email
+from mails.outbox import add_to_outbox
 from utils import responses, exceptions
+from utils.conditional import ConditionalGet
 from auth import (
     get_auth_user,
     create_access_token,
@@ -44,15 +48,22 @@ users_crud = CRUD(UsersModel, User)
         "500": {"model": responses.ServerError},
     },
 )
-async def register_a_new_user(
-    user_info: UserCreate, response: Response, background_task: BackgroundTasks
-) -> User:
+async def register_a_new_user(user_info: UserCreate, response: Response) -> User:
     """
     Register a new user and set the session cookie.
+    The welcome email is added to the outbox with the user.
     """
     try:
         user_info.password = hash_password(user_info.password)
-        user = await users_crud.create(user_info.dict())
+        async with in_transaction() as connection:
+            user = await users_crud.create(user_info.dict())
+            await add_to_outbox(
+                "mails.service.send_welcome_email",
+                idempotency_key=f"welcome:{user.id}",
+                using_db=connection,
+                username=user.name,
+                email=user.email,
+            )
     except IntegrityError:
         exceptions.conflict_409("Email already exists")
 
@@ -65,8 +76,6 @@ async def register_a_new_user(
         secure=not settings.DEBUG_MODE,
         httponly=not settings.DEBUG_MODE,
     )
-
-    background_task.add_task(send_welcome_email, username=user.name, email=user.email)
     return user
 
 
@@ -125,8 +134,12 @@ async def send_recovery_password_email(email: str) -> responses.EmailMsg:
     if not user:
         exceptions.not_fount_404("Email not found")
 
-    token = create_access_token(email, for_recovery_password=True)
-    send_welcome_email(email=email, token=token)
+    # The token is created by the send function (not stored in the outbox).
+    await add_to_outbox(
+        "mails.service.send_recovery_password_email",
+        idempotency_key=f"recovery-password:{uuid4().hex}",
+        email=email,
+    )
     return responses.EmailMsg()
 
 
@@ -168,14 +181,20 @@ async def reset_password(
     status_code=200,
     responses={
         "200": {"model": User},
+        "304": {"description": "Not Modified"},
         "401": {"model": responses.Unauthorized},
         "500": {"model": responses.ServerError},
     },
 )
-async def get_current_user(user: User = Depends(get_auth_user)) -> User:
+async def get_current_user(
+    user: User = Depends(get_auth_user), conditional: ConditionalGet = Depends()
+) -> User:
     """
     Retrieve the info of the logen current user.
     """
+    not_modified = conditional.evaluate(user)
+    if not_modified:
+        return not_modified
     return await User.from_tortoise_orm(user)
 
 
@@ -2,7 +2,7 @@
 Unu API - Application settings.
 """
 
-from typing import List
+from typing import Dict, List
 from pydantic import BaseSettings, Field
 
 
@@ -68,6 +68,11 @@ class Settings(BaseSettings):
     DB_MODELS: List[str] = [
         "api.v1.users.models",
         "api.v1.organizations.models",
+        "api.v1.agenda.models",
+        "api.v1.speakers.models",
+        "api.v1.participants.models",
+        "mails.models",
+        "logger.models",
         "aerich.models",
     ]
 
@@ -77,6 +82,18 @@ class Settings(BaseSettings):
 
     SENDGRID_API_KEY: str
     EMAIL_SENDER: str
+    # sendgrid | smtp | file | memory
+    MAIL_TRANSPORT: str = "sendgrid"
+    MAIL_POOL_SIZE: int = 10
+    MAIL_FILE_PATH: str = "sent_emails.ndjson"
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 1025
+    SMTP_USER: str = ""
+    SMTP_PASSWORD: str = ""
+    SMTP_USE_TLS: bool = False
+    # Outbox dispatcher rate limit (emails per second, shared by all workers).
+    MAIL_RATE_LIMIT: int = 10
+    MAIL_RATE_BURST: int = 50
 
     ##############
     # Task Queue #
@@ -84,6 +101,18 @@ class Settings(BaseSettings):
 
     REDIS_URL: str
     QUEUES: List[str]
+    # Worker mode: "fork" (one process per job) or "threads" (concurrent
+    # jobs in each process, for the I/O bound jobs).
+    WORKER_MODE: str = "fork"
+    WORKER_NAME: str = "unu-worker"
+    WORKER_PROCESSES: int = 1
+    WORKER_CONCURRENCY: int = 10
+    # Max jobs running at once per queue in threads mode. Eg: {"email": 5}
+    WORKER_QUEUE_LIMITS: Dict[str, int] = {}
+    # Weight per priority class (worker.priorities). Empty: strict priority.
+    WORKER_PRIORITY_WEIGHTS: Dict[str, int] = {}
+    # Bearer token of the Prometheus scrapes (/jobs/metrics). Empty: disabled.
+    METRICS_TOKEN: str = ""
 
     ################
     # File Storage #
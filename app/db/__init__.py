@@ -1,2 +1,3 @@
 from tortoise.exceptions import IntegrityError
 from .crud import *
+from .loader import *
@@ -0,0 +1,52 @@
+"""
+Db - Helpers for background jobs.
+"""
+
+import asyncio
+import threading
+from typing import Callable, Coroutine
+
+from tortoise import Tortoise, run_async
+
+from .db_config import TORTOISE_ORM_CONFIG
+
+
+# Loop shared by the jobs of a concurrent worker (see start_job_loop).
+_job_loop: asyncio.AbstractEventLoop = None
+
+
+def start_job_loop() -> None:
+    """
+    Start a event loop thread with the ORM initialized once. Then the db jobs
+    of the process (Eg: the threads of a concurrent worker) run on it and
+    share the connection pool, instead of opening their own connections.
+    """
+    global _job_loop
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="db-job-loop", daemon=True).start()
+    asyncio.run_coroutine_threadsafe(
+        Tortoise.init(config=TORTOISE_ORM_CONFIG), loop
+    ).result()
+    _job_loop = loop
+
+
+def run_db_job(job: Callable[..., Coroutine], *args, **kwargs) -> None:
+    """
+    Run a async job that uses the ORM from a (sync) rq worker.
+    The connections are opened and closed on each run, unless the process
+    has a job loop (start_job_loop).
+
+    Params:
+    ------
+    - job: callable - The async function to run.
+    """
+    if _job_loop:
+        asyncio.run_coroutine_threadsafe(job(*args, **kwargs), _job_loop).result()
+        return
+
+    async def _run():
+        await Tortoise.init(config=TORTOISE_ORM_CONFIG)
+        await job(*args, **kwargs)
+
+    run_async(_run())
@@ -0,0 +1,72 @@
+"""
+Db - Batch loader.
+"""
+
+from typing import Awaitable, Callable, Dict, Iterable, List
+
+
+################
+# Batch Loader #
+################
+class BatchLoader:
+    """
+    Request scoped data loader. Collect all the keys needed to build a
+    response and resolve them with a single query (IN / $in).
+
+    Params:
+    ------
+    - batch_function: callable - Async function that receives a list of keys
+      and returns the list of entities found (in any order).
+    - key: str - The entitie field that matches the requested keys.
+
+    * Create one instance per request. The cache is never shared.
+    """
+
+    def __init__(
+        self,
+        batch_function: Callable[[List[str]], Awaitable[List[dict]]],
+        key: str = "uuid",
+    ):
+        self.batch_function = batch_function
+        self.key = key
+        self._cache: Dict[str, dict] = {}
+        self._pending: set = set()
+
+    def add(self, keys: Iterable[str]) -> None:
+        """
+        Queue the keys that are not resolved yet.
+        """
+        self._pending.update(key for key in keys if key not in self._cache)
+
+    async def dispatch(self) -> None:
+        """
+        Resolve all the pending keys in one call to the batch function.
+        """
+        if not self._pending:
+            return
+
+        keys = list(self._pending)
+        self._pending.clear()
+
+        entities = await self.batch_function(keys)
+        # Not found keys are cached too, to not query them again.
+        self._cache.update(dict.fromkeys(keys))
+        for entitie in entities:
+            self._cache[str(entitie[self.key])] = entitie
+
+    async def load_many(self, keys: Iterable[str]) -> List[dict]:
+        """
+        Return the entities for the keys in the same order.
+        Not found keys are returned as None.
+        """
+        keys = list(keys)
+        self.add(keys)
+        await self.dispatch()
+        return [self._cache.get(key) for key in keys]
+
+    async def load(self, key: str) -> dict:
+        """
+        Return the entitie of one key.
+        """
+        entities = await self.load_many([key])
+        return entities[0]
@@ -0,0 +1,83 @@
+"""
+Data migration - Agenda days with embedded conferences to the
+agenda_days and conferences tables.
+
+The day and conference uuids are kept as primary keys, then the
+references stored in other documents (event.agenda) remain valid.
+
+Usage:
+-----
+mongoexport --collection agenda --out agenda.json
+python -m db.migrations.agenda_conferences agenda.json
+"""
+
+import sys
+from uuid import UUID
+
+from tortoise.transactions import in_transaction
+
+from api.v1.agenda.intervals import parse_hour
+from api.v1.agenda.models import AgendaDaysModel, ConferencesModel
+from .base import read_documents, run_migration
+
+
+async def upgrade(path: str) -> None:
+    """
+    Insert all days and conferences of the export in one transaction.
+    Days already migrated are skipped, then the migration can be re-run.
+    Conferences with invalid hours are skipped and reported.
+    """
+    migrated = {
+        str(day_id)
+        for day_id in await AgendaDaysModel.all().values_list("id", flat=True)
+    }
+
+    days, conferences, skipped = [], [], []
+    for document in read_documents(path):
+        if document["uuid"] in migrated:
+            continue
+
+        day = AgendaDaysModel(
+            id=UUID(document["uuid"]),
+            event=document["event"],
+            date=document["date"],
+            title=document["title"],
+        )
+        days.append(day)
+
+        for conference in document.get("conferences", []):
+            try:
+                # Zero padded (Eg: "9:30" -> "09:30"), then they sort as times.
+                start_hour = parse_hour(conference["startHour"])
+                end_hour = parse_hour(conference["endHour"])
+            except ValueError:
+                # Invalid legacy hours are reported to fix them by hand.
+                skipped.append(conference)
+                continue
+
+            conferences.append(
+                ConferencesModel(
+                    id=UUID(conference["uuid"]),
+                    name=conference["name"],
+                    start_hour=start_hour,
+                    end_hour=end_hour,
+                    description=conference["description"],
+                    speaker=conference["speaker"],
+                    day_id=day.id,
+                )
+            )
+
+    async with in_transaction() as connection:
+        await AgendaDaysModel.bulk_create(days, using_db=connection)
+        await ConferencesModel.bulk_create(conferences, using_db=connection)
+
+    print(f"Migrated days: {len(days)} - conferences: {len(conferences)}")
+    for conference in skipped:
+        print(
+            f"Skipped conference {conference['uuid']} - invalid hours: "
+            f"{conference['startHour']!r} - {conference['endHour']!r}"
+        )
+
+
+if __name__ == "__main__":
+    run_migration(upgrade, sys.argv[1])
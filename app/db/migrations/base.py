@@ -0,0 +1,54 @@
+"""
+Data migrations - Common helpers.
+
+The data migrations move the documents of the old collections
+(exported with `mongoexport`) to the relational tables.
+"""
+
+import json
+from typing import Callable, Coroutine, Iterator
+
+from tortoise import Tortoise, run_async
+
+from db.db_config import TORTOISE_ORM_CONFIG
+
+
+def read_documents(path: str) -> Iterator[dict]:
+    """
+    Read a collection export. Supports JSON lines (mongoexport default)
+    and a JSON array (mongoexport --jsonArray).
+
+    Params:
+    ------
+    - path: str - The export file path.
+
+    Return:
+    ------
+    - documents: Iterator[dict] - The documents without the mongo _id.
+    """
+    with open(path) as export_file:
+        first_char = export_file.read(1)
+        export_file.seek(0)
+
+        if first_char == "[":
+            documents = json.load(export_file)
+        else:
+            documents = (json.loads(line) for line in export_file if line.strip())
+
+        for document in documents:
+            document.pop("_id", None)
+            yield document
+
+
+def run_migration(migration: Callable[..., Coroutine], *args) -> None:
+    """
+    Init the ORM (creating the new tables if missing) and run the migration.
+    """
+
+    async def _run():
+        await Tortoise.init(config=TORTOISE_ORM_CONFIG)
+        await Tortoise.generate_schemas(safe=True)
+        await migration(*args)
+
+    # run_async closes the connections at the end.
+    run_async(_run())
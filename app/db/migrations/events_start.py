@@ -0,0 +1,37 @@
+"""
+Data migration - The start date of the events (in UTC) to the
+participants_directories, used by the reminders sweep.
+
+Usage:
+-----
+mongoexport --collection events --out events.json
+python -m db.migrations.events_start events.json
+"""
+
+import sys
+
+from api.v1.participants.models import ParticipantsDirectoriesModel
+from utils.dates import to_utc
+from .base import read_documents, run_migration
+
+
+async def upgrade(path: str) -> None:
+    """
+    Set the start of each event directory. The directories that have it
+    already are skipped, then the migration can be re-run.
+    """
+    updated = 0
+    for document in read_documents(path):
+        starts_at = to_utc(document.get("startDate"), document.get("utc"))
+        if not starts_at:
+            continue
+
+        updated += await ParticipantsDirectoriesModel.filter(
+            event=document["uuid"], starts_at__isnull=True
+        ).update(starts_at=starts_at)
+
+    print(f"Migrated event dates: {updated}")
+
+
+if __name__ == "__main__":
+    run_migration(upgrade, sys.argv[1])
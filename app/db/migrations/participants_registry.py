@@ -0,0 +1,56 @@
+"""
+Data migration - Participants directories with the emails array to the
+participants_directories and participants tables.
+
+Usage:
+-----
+mongoexport --collection participants --out participants.json
+python -m db.migrations.participants_registry participants.json
+"""
+
+import sys
+from uuid import UUID
+
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+
+from api.v1.participants.models import ParticipantsDirectoriesModel, ParticipantsModel
+from .base import read_documents, run_migration
+
+
+async def upgrade(path: str) -> None:
+    """
+    Insert each directory and its emails in one transaction per directory.
+    The emails already registered are skipped, then the migration can be re-run.
+    """
+    directories, participants = 0, 0
+    for document in read_documents(path):
+        emails = list(
+            dict.fromkeys(email.strip().lower() for email in document["emails"])
+        )
+
+        async with in_transaction() as connection:
+            _, created = await ParticipantsDirectoriesModel.get_or_create(
+                event=document["event"],
+                defaults={
+                    "id": UUID(document["uuid"]),
+                    "event_name": document["eventName"],
+                    "organization": document["organization"],
+                },
+                using_db=connection,
+            )
+            inserted = await ParticipantsModel.bulk_register(
+                document["event"], emails, using_db=connection
+            )
+            await ParticipantsDirectoriesModel.filter(event=document["event"]).update(
+                count=F("count") + len(inserted)
+            )
+
+        directories += int(created)
+        participants += len(inserted)
+
+    print(f"Migrated directories: {directories} - participants: {participants}")
+
+
+if __name__ == "__main__":
+    run_migration(upgrade, sys.argv[1])
@@ -0,0 +1,53 @@
+"""
+Data migration - Speakers collection to the speakers table.
+
+The speaker uuids are kept as primary keys, then the references stored
+in other rows and documents (conference.speaker, event.speakers)
+remain valid.
+
+Usage:
+-----
+mongoexport --collection speakers --out speakers.json
+python -m db.migrations.speakers speakers.json
+"""
+
+import sys
+from uuid import UUID
+
+from tortoise.transactions import in_transaction
+
+from api.v1.speakers.models import SpeakersModel
+from .base import read_documents, run_migration
+
+
+async def upgrade(path: str) -> None:
+    """
+    Insert all speakers of the export in one transaction.
+    Speakers already migrated are skipped, then the migration can be re-run.
+    """
+    migrated = {
+        str(speaker_id)
+        for speaker_id in await SpeakersModel.all().values_list("id", flat=True)
+    }
+
+    speakers = [
+        SpeakersModel(
+            id=UUID(document["uuid"]),
+            name=document["name"],
+            biography=document.get("biography", ""),
+            twitter_url=document.get("twitter_url", ""),
+            photo=document.get("photo", ""),
+            event=document["event"],
+        )
+        for document in read_documents(path)
+        if document["uuid"] not in migrated
+    ]
+
+    async with in_transaction() as connection:
+        await SpeakersModel.bulk_create(speakers, using_db=connection)
+
+    print(f"Migrated speakers: {len(speakers)}")
+
+
+if __name__ == "__main__":
+    run_migration(upgrade, sys.argv[1])
@@ -1,14 +1,53 @@
 """
 Error Logger Module
+
+The app exception handler only puts the exception in a queue (no
+formatting, no I/O) and answers the ServerError response. Background
+tasks group the errors by fingerprint (exception type and top frames),
+count them in memory and flush them every DIGEST_INTERVAL: one batch
+upsert in the errors table and, at most once per ALERT_INTERVAL for all
+the API processes, one digest email to the admin. Then a failure storm
+is never a email storm, nor a slower API.
 """
 
+import asyncio
+import logging
 import traceback
 from datetime import datetime
+from html import escape
+from typing import Dict, List
 
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 
 from mails.sender import EmailSender
 from config import settings
+from utils.fingerprints import fingerprint
+from utils.responses import ServerError
+from worker.connection import redis_connection
+from .models import ErrorsModel
+
+
+logger = logging.getLogger(__name__)
+
+
+#########################
+# Error Logger Settings #
+#########################
+
+DIGEST_INTERVAL = 60
+ALERT_INTERVAL = 60 * 15
+ALERT_LOCK_KEY = "errors:alert"
+# Frames of the traceback (from the raise) that identify a error.
+TOP_FRAMES = 5
+# Errors waiting to be grouped and distinct errors kept in memory between
+# flushes (the rest are only counted).
+QUEUE_SIZE = 10000
+MAX_GROUPS = 500
+# Errors listed in a digest email.
+DIGEST_SIZE = 20
+TRACEBACK_SIZE = 4000
 
 
 ######################
@@ -23,62 +62,235 @@ class ErrorLogger:
 
     def __init__(self):
         self.sender = EmailSender()
+        # fingerprint: group - Waiting to be saved.
+        self.pending: Dict[str, dict] = {}
+        # fingerprint: group - Saved, waiting for the next digest.
+        self.unalerted: Dict[str, dict] = {}
+        self.dropped = 0
+        # (exception, context, date) - Waiting to be grouped (see start).
+        self.queue: asyncio.Queue = None
+        self._tasks: List[asyncio.Task] = []
 
     async def register(self, _exception):
         """
-        Create a complete report for exception.
+        Count the exception (reported in the next digest).
         """
-        # Transfor exception to string
-        error_dict = self._format_db(_exception)
-        # Notify the admin
-        self._send_email_to_admin(error_dict)
-        # Save on db
-        await self.collection.insert_one(error_dict)
+        self.capture(_exception)
         # Notify the client the error
         raise HTTPException(status_code=500, detail="Server Error")
 
-    def _format_db(self, _exception):
+    def capture(self, _exception: BaseException, context: str = "") -> None:
+        """
+        Hand the exception to the background tasks (without formatting it).
+        If the queue is full, the error is only counted.
+
+        Params:
+        ------
+        - context: str - Where it happened. Eg: POST /api/v1/users
+        """
+        error = (_exception, context, datetime.utcnow())
+        if not self.queue:
+            self.add(*error)
+            return
+
+        try:
+            self.queue.put_nowait(error)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def add(self, _exception: BaseException, context: str, seen_at: datetime) -> str:
+        """
+        Count the exception in its group.
+
+        Return:
+        ------
+        - fingerprint: str - The id of the error group.
+        """
+        error_type = type(_exception).__name__
+        location = " < ".join(self._top_frames(_exception))
+        key = fingerprint(error_type, "", location)
+
+        group = self.pending.get(key)
+        if group:
+            group["count"] += 1
+            group["last_seen"] = seen_at
+            return key
+        if len(self.pending) >= MAX_GROUPS:
+            self.dropped += 1
+            return key
+
+        trace = self._exception_to_string(_exception)
+        self.pending[key] = {
+            "fingerprint": key,
+            "error_type": error_type,
+            "location": location,
+            "message": str(_exception)[:1000],
+            "traceback": f"{context}\n{trace}"[-TRACEBACK_SIZE:],
+            "count": 1,
+            "first_seen": seen_at,
+            "last_seen": seen_at,
+        }
+        return key
+
+    ###########
+    # Flushes #
+    ###########
+
+    async def start(self) -> None:
+        """
+        Start the error queue and the periodic flushes (app startup).
+        """
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self._tasks = [
+            asyncio.ensure_future(self._consume()),
+            asyncio.ensure_future(self._run()),
+        ]
+
+    async def stop(self) -> None:
+        """
+        Stop the background tasks and flush the last errors (app shutdown).
+        """
+        for task in self._tasks:
+            task.cancel()
+        while self.queue and not self.queue.empty():
+            self.add(*self.queue.get_nowait())
+        await self._safe_flush()
+
+    async def _consume(self) -> None:
+        while True:
+            error = await self.queue.get()
+            try:
+                self.add(*error)
+            except Exception as failure:  # pylint: disable=broad-except
+                logger.warning("Error logger failed to group a error", exc_info=failure)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(DIGEST_INTERVAL)
+            await self._safe_flush()
+
+    async def _safe_flush(self) -> None:
+        # The error reporting never raises (Eg: during a db outage).
+        try:
+            await self.flush()
+        except Exception as error:  # pylint: disable=broad-except
+            logger.warning("Error logger flush failed", exc_info=error)
+
+    async def flush(self) -> None:
         """
-        Add the error on db
+        Save the pending groups in one batch and send the digest if the
+        alert interval ended.
         """
-        date = datetime.now()
-        filename = __name__
-        error_to_str = self._exception_to_string(_exception)
-        error = {"date": date, "filename": filename, "exception": error_to_str}
-        return error
+        groups, self.pending = self.pending, {}
+        dropped, self.dropped = self.dropped, 0
+
+        new = set()
+        try:
+            new = await ErrorsModel.upsert(list(groups.values()))
+        except Exception as error:  # pylint: disable=broad-except
+            logger.warning("Errors not saved (%s groups)", len(groups), exc_info=error)
 
-    def _send_email_to_admin(self, dict_error: dict) -> None:
+        for key, group in groups.items():
+            alerted = self.unalerted.setdefault(key, {**group, "count": 0})
+            alerted["count"] += group["count"]
+            alerted["last_seen"] = group["last_seen"]
+            alerted["new"] = alerted.get("new") or key in new
+        if dropped:
+            overflow = self.unalerted.setdefault("overflow", self._overflow_group())
+            overflow["count"] += dropped
+
+        await self._send_digest()
+
+    async def _send_digest(self) -> None:
         """
-        Send a email to admin of the error.
+        Email the errors since the last digest, once per ALERT_INTERVAL
+        (shared by all the processes).
         """
-        message = self._generate_message(dict_error)
-        to_list = [settings.EMAIL_ADMIN]
+        if not self.unalerted:
+            return
 
+        allowed = await run_in_threadpool(
+            redis_connection.set, ALERT_LOCK_KEY, 1, nx=True, ex=ALERT_INTERVAL
+        )
+        if not allowed:
+            return
+
+        groups = sorted(self.unalerted.values(), key=lambda g: -g["count"])
         email = self.sender.create_email(
-            to_list=to_list, subject="UNU API ERROR", html_content=message
+            to_list=[settings.EMAIL_ADMIN],
+            subject=f"UNU API ERRORS - {sum(g['count'] for g in groups)} errors",
+            html_content=self._generate_message(groups),
         )
+        await self.sender.send_email_async(email)
+        self.unalerted = {}
+
+    ###########
+    # Helpers #
+    ###########
 
-        self.sender.send_email(email)
+    @staticmethod
+    def _top_frames(excp: BaseException) -> List[str]:
+        """
+        Return the last frames of the traceback (file:function), from the
+        raise. The line numbers are left out, then a deploy keeps the groups.
+        """
+        frames = traceback.extract_tb(excp.__traceback__)[-TOP_FRAMES:]
+        return [f"{frame.filename}:{frame.name}" for frame in reversed(frames)]
+
+    @staticmethod
+    def _overflow_group() -> dict:
+        now = datetime.utcnow()
+        return {
+            "fingerprint": "overflow",
+            "error_type": "Other errors",
+            "location": "",
+            "message": f"More than {MAX_GROUPS} distinct errors between flushes",
+            "traceback": "",
+            "count": 0,
+            "first_seen": now,
+            "last_seen": now,
+        }
 
     def _exception_to_string(self, excp):
         """
-        Transform a exception to string.
+        Transform a exception to string (its traceback, from the handler).
         """
-        stack = traceback.extract_stack()[:-3] + traceback.extract_tb(
-            excp.__traceback__
-        )
-        pretty = traceback.format_list(stack)
-        return "".join(pretty) + "\n  {} {}".format(excp.__class__, excp)
+        return "".join(traceback.format_exception(type(excp), excp, excp.__traceback__))
 
-    def _generate_message(self, dict_error: dict) -> str:
+    def _generate_message(self, groups: List[dict]) -> str:
         """
-        Generates a message from error dict.
+        Generates the digest message from the error groups.
         """
+        items = "".join(
+            f"""
+          <li>
+            <h4>{"[NEW] " if group.get("new") else ""}{group["error_type"]}
+              x{group["count"]} ({group["fingerprint"]})</h4>
+            <p>{escape(group["location"])}</p>
+            <p>{escape(group["message"])}</p>
+            <p>First: {group["first_seen"]} - Last: {group["last_seen"]}</p>
+          </li>"""
+            for group in groups[:DIGEST_SIZE]
+        )
+        hidden = len(groups) - DIGEST_SIZE
         return f"""
-        <h2>A error was occur in UNU-API.</h2>
-        <ul>
-          <li><h4>File: {dict_error["filename"]}</h4></li>
-          <li><h4>Date: {dict_error["date"]}</h4></li>
-          <li><h4>Error: {dict_error["exception"]}</h4></li>
+        <h2>Errors in UNU-API since the last digest.</h2>
+        <ul>{items}
         </ul>
+        {f"<p>And {hidden} more errors.</p>" if hidden > 0 else ""}
+        <pre>{escape(groups[0]["traceback"])}</pre>
         """
+
+
+error_logger = ErrorLogger()
+
+
+async def server_error_handler(request: Request, exc: Exception) -> JSONResponse:
+    """
+    App handler of the unhandled exceptions: report them in background and
+    answer the ServerError response.
+    """
+    error_logger.capture(exc, f"{request.method} {request.url.path}")
+    return JSONResponse(
+        status_code=500, content=ServerError(detail="Server Error").dict()
+    )
@@ -0,0 +1,88 @@
+"""
+Error Logger db - Models
+"""
+
+from datetime import datetime
+from typing import List, Set
+from uuid import uuid4
+
+from tortoise import fields
+from tortoise.transactions import in_transaction
+from utils.abstrac_model import UnuBaseModel
+
+
+class ErrorsModel(UnuBaseModel):
+    """
+    Errors entitie. One row per error fingerprint, with its occurrences.
+    """
+
+    fingerprint = fields.CharField(max_length=40, unique=True)
+    error_type = fields.CharField(max_length=120)
+    # The top frames of the traceback. Eg: api/v1/users/routes.py:signup
+    location = fields.TextField()
+    message = fields.TextField()
+    traceback = fields.TextField()
+    count = fields.BigIntField(default=0)
+    first_seen = fields.DatetimeField()
+    last_seen = fields.DatetimeField(index=True)
+
+    class Meta:
+        """
+        Meta properties.
+        """
+
+        table = "errors"
+
+    @classmethod
+    async def upsert(cls, groups: List[dict]) -> Set[str]:
+        """
+        Save a batch of error groups in a single statement: the known
+        fingerprints add their count, the rest are inserted.
+
+        Params:
+        ------
+        - groups: List[dict] - fingerprint, error_type, location, message,
+          traceback, count, first_seen and last_seen of each group.
+
+        Return:
+        ------
+        - new: Set[str] - The fingerprints seen for the first time.
+        """
+        if not groups:
+            return set()
+
+        columns = [
+            [group[column] for group in groups]
+            for column in (
+                "fingerprint",
+                "error_type",
+                "location",
+                "message",
+                "traceback",
+                "count",
+                "first_seen",
+                "last_seen",
+            )
+        ]
+        async with in_transaction() as connection:
+            _, rows = await connection.execute_query(
+                ERRORS_UPSERT_SQL,
+                [[uuid4() for _ in groups], *columns, datetime.utcnow()],
+            )
+        return {row["fingerprint"] for row in rows if row["inserted"]}
+
+
+ERRORS_UPSERT_SQL = """
+INSERT INTO "errors" ("id", "fingerprint", "error_type", "location", "message",
+    "traceback", "count", "first_seen", "last_seen", "created_at", "updated_at")
+SELECT "new".*, $10::timestamp, $10::timestamp
+FROM unnest($1::uuid[], $2::varchar[], $3::varchar[], $4::text[], $5::text[],
+    $6::text[], $7::bigint[], $8::timestamp[], $9::timestamp[])
+    AS "new" ("id", "fingerprint", "error_type", "location", "message",
+    "traceback", "count", "first_seen", "last_seen")
+ON CONFLICT ("fingerprint") DO UPDATE
+SET "count" = "errors"."count" + EXCLUDED."count",
+    "last_seen" = EXCLUDED."last_seen", "message" = EXCLUDED."message",
+    "updated_at" = EXCLUDED."updated_at"
+RETURNING "fingerprint", ("xmax" = 0) AS "inserted"
+"""
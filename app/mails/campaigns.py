@@ -0,0 +1,209 @@
+"""
+Campaigns - Fan-out of mass emails.
+
+A campaign splits the recipients in chunks. Each chunk is sent as one
+SendGrid request with a personalization per recipient, in its own rq job
+with retries. The mail content is stored once per campaign and the
+progress is tracked in a redis hash.
+The attachment is uploaded to the storage once and sent as a link in the
+email body (a signed url, valid while the campaign lives), then the file is
+never downloaded nor repeated in the chunk requests.
+"""
+
+import time
+from html import escape
+from typing import List
+from uuid import uuid4
+
+from rq import Retry, get_current_job
+
+from worker import enqueue_many
+from worker.connection import redis_connection
+from worker.priorities import BULK
+from storage.service import signed_url
+from .sender import EmailSender, MAX_PERSONALIZATIONS
+
+
+######################
+# Campaigns Settings #
+######################
+
+# Recipients per job (one SendGrid request).
+CHUNK_SIZE = min(500, MAX_PERSONALIZATIONS)
+
+CAMPAIGN_TTL = 60 * 60 * 24 * 7  # One week
+CAMPAIGN_QUEUE = BULK
+CHUNK_RETRY = Retry(max=3, interval=[10, 30, 60])
+
+SENDING = "sending"
+COMPLETED = "completed"
+FAILED = "failed"
+
+sender = EmailSender()
+
+
+def _progress_key(campaign_id: str) -> str:
+    return f"campaign:{campaign_id}"
+
+
+def _mail_key(campaign_id: str) -> str:
+    return f"campaign:{campaign_id}:mail"
+
+
+def _with_attachment(html_content: str, attachment_url: str) -> str:
+    """
+    Add the attachment link at the end of the email body.
+    """
+    link = (
+        '<p style="text-align:center">'
+        f'<a href="{escape(attachment_url)}" target="_blank" rel="noopener noreferrer">'
+        "Ver archivo adjunto</a></p>"
+    )
+    body, end, rest = html_content.rpartition("</body>")
+    if not end:
+        return html_content + link
+    return body + link + end + rest
+
+
+###########
+# Fan-out #
+###########
+
+
+def start_campaign(
+    event_id: str,
+    subject: str,
+    html_content: str,
+    to_list: List[str],
+    attachment_url: str = None,
+    send_at: int = None,
+) -> str:
+    """
+    Create the campaign and enqueue one job per chunk of recipients.
+
+    Params:
+    ------
+    - event_id: str - The event uuid.
+    - subject: str - The email subject.
+    - html_content: str - The rendered email (shared by all recipients).
+    - to_list: List[str] - The recipients.
+    - attachment_url: str - Optional attachment (uploaded to the storage).
+      It's linked with a signed url that expires with the campaign.
+    - send_at: int - Optional unix timestamp to deliver the email.
+
+    Return:
+    ------
+    - campaign_id: str - The campaign id (see campaign_progress).
+    """
+    campaign_id = uuid4().hex
+    chunks = [
+        to_list[start : start + CHUNK_SIZE]
+        for start in range(0, len(to_list), CHUNK_SIZE)
+    ]
+
+    if attachment_url:
+        html_content = _with_attachment(
+            html_content, signed_url(attachment_url, CAMPAIGN_TTL)
+        )
+
+    mail = {"subject": subject, "html_content": html_content}
+    if send_at:
+        mail.update({"send_at": send_at})
+
+    progress = {
+        "event": event_id,
+        "status": SENDING if chunks else COMPLETED,
+        "recipients": len(to_list),
+        "chunks": len(chunks),
+        "sent_chunks": 0,
+        "failed_chunks": 0,
+        "sent_recipients": 0,
+        "created_at": int(time.time()),
+    }
+
+    pipeline = redis_connection.pipeline()
+    pipeline.hset(_mail_key(campaign_id), mapping=mail)
+    pipeline.hset(_progress_key(campaign_id), mapping=progress)
+    pipeline.expire(_mail_key(campaign_id), CAMPAIGN_TTL)
+    pipeline.expire(_progress_key(campaign_id), CAMPAIGN_TTL)
+    pipeline.execute()
+
+    enqueue_many(
+        send_campaign_chunk,
+        [
+            {"args": (campaign_id, chunk), "job_id": f"campaign:{campaign_id}:{index}"}
+            for index, chunk in enumerate(chunks)
+        ],
+        queue_name=CAMPAIGN_QUEUE,
+        retry=CHUNK_RETRY,
+    )
+
+    return campaign_id
+
+
+def send_campaign_chunk(campaign_id: str, to_list: List[str]) -> None:
+    """
+    Job: send the campaign email to one chunk of recipients.
+    The chunk is counted as failed only when its last retry fails.
+    """
+    mail = {
+        key.decode(): value.decode()
+        for key, value in redis_connection.hgetall(_mail_key(campaign_id)).items()
+    }
+    if not mail:
+        # Expired campaign.
+        return
+
+    try:
+        email = sender.create_bulk_email(
+            to_list=to_list,
+            subject=mail["subject"],
+            html_content=mail["html_content"],
+        )
+        if mail.get("send_at"):
+            email.send_at = int(mail["send_at"])
+        sender.send_email(email)
+    except Exception:
+        job = get_current_job()
+        if not job or not job.retries_left:
+            _record_chunk(campaign_id, sent=False, recipients=0)
+        raise
+
+    _record_chunk(campaign_id, sent=True, recipients=len(to_list))
+
+
+def _record_chunk(campaign_id: str, sent: bool, recipients: int) -> None:
+    """
+    Count a finished chunk and close the campaign after the last one.
+    """
+    key = _progress_key(campaign_id)
+    pipeline = redis_connection.pipeline()
+    pipeline.hincrby(key, "sent_chunks" if sent else "failed_chunks", 1)
+    pipeline.hincrby(key, "sent_recipients", recipients)
+    pipeline.hmget(key, "chunks", "sent_chunks", "failed_chunks")
+    _, _, (chunks, sent_chunks, failed_chunks) = pipeline.execute()
+
+    finished = int(sent_chunks) + int(failed_chunks)
+    if finished == int(chunks):
+        status = COMPLETED if not int(failed_chunks) else FAILED
+        redis_connection.hset(key, "status", status)
+
+
+############
+# Progress #
+############
+
+
+def campaign_progress(campaign_id: str) -> dict:
+    """
+    Return the progress record of a campaign. Empty if it doesn't exist.
+    """
+    progress = redis_connection.hgetall(_progress_key(campaign_id))
+    record = {key.decode(): value.decode() for key, value in progress.items()}
+    if not record:
+        return {}
+
+    for field in record:
+        if field not in ("event", "status"):
+            record[field] = int(record[field])
+    return record
@@ -0,0 +1,129 @@
+"""
+Mails db - Models
+"""
+
+import json
+from datetime import datetime, timedelta
+from typing import List
+from uuid import uuid4
+
+from tortoise import fields
+from tortoise.backends.base.client import BaseDBAsyncClient
+from utils.abstrac_model import UnuBaseModel
+
+
+# Outbox status
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class OutboxModel(UnuBaseModel):
+    """
+    Outbox entitie. A email to send, written in the same transaction of the
+    change that triggers it and delivered by the dispatcher (mails.outbox).
+    """
+
+    # The dotted path of the send function. Eg: mails.service.send_welcome_email
+    function = fields.CharField(max_length=120)
+    kwargs = fields.JSONField()
+    # A email is added once per key. Eg: welcome:<user id>
+    idempotency_key = fields.CharField(max_length=120, unique=True)
+    status = fields.CharField(max_length=10, default=PENDING)
+    attempts = fields.IntField(default=0)
+    # The rows are claimed when due. A claim also moves it (lease).
+    next_attempt_at = fields.DatetimeField()
+    last_error = fields.TextField(null=True)
+    sent_at = fields.DatetimeField(null=True)
+
+    class Meta:
+        """
+        Meta properties.
+        """
+
+        table = "mails_outbox"
+        indexes = (("status", "next_attempt_at"),)
+
+    @classmethod
+    async def add(
+        cls,
+        function: str,
+        kwargs: dict,
+        idempotency_key: str,
+        using_db: BaseDBAsyncClient,
+    ) -> bool:
+        """
+        Insert a email in the outbox. A key already added is skipped
+        (ON CONFLICT DO NOTHING), then retrying the trigger never duplicates it.
+
+        Params:
+        ------
+        - function: str - The dotted path of the send function.
+        - kwargs: dict - The send function params (json serializable).
+        - idempotency_key: str - The unique key of the email.
+        - using_db: BaseDBAsyncClient - The connection (transaction) to use.
+
+        Return:
+        ------
+        - added: bool - False if the key was already added.
+        """
+        now = datetime.utcnow()
+        rowcount, _ = await using_db.execute_query(
+            OUTBOX_ADD_SQL,
+            [uuid4(), function, json.dumps(kwargs), idempotency_key, now],
+        )
+        return bool(rowcount)
+
+    @classmethod
+    async def claim(
+        cls, limit: int, lease: int, using_db: BaseDBAsyncClient
+    ) -> List[dict]:
+        """
+        Take up to limit due emails. A claimed email is not due again until
+        the lease ends, then a dispatcher that dies while sending never
+        loses it (it's sent again, at least once).
+
+        Params:
+        ------
+        - limit: int - Max emails to claim.
+        - lease: int - Seconds to finish the claimed emails.
+
+        Return:
+        ------
+        - emails: List[dict] - id, function, kwargs, idempotency_key, attempts.
+        """
+        now = datetime.utcnow()
+        emails = await using_db.execute_query_dict(
+            OUTBOX_CLAIM_SQL, [limit, now + timedelta(seconds=lease), now]
+        )
+        for email in emails:
+            # asyncpg returns the jsonb columns as text.
+            if isinstance(email["kwargs"], str):
+                email["kwargs"] = json.loads(email["kwargs"])
+        return emails
+
+
+OUTBOX_ADD_SQL = """
+INSERT INTO "mails_outbox" ("id", "function", "kwargs", "idempotency_key",
+    "status", "attempts", "next_attempt_at", "created_at", "updated_at")
+VALUES ($1, $2, $3::jsonb, $4, 'pending', 0, $5, $5, $5)
+ON CONFLICT ("idempotency_key") DO NOTHING
+RETURNING "id"
+"""
+
+# Take the due emails (pending or with an expired lease) and move them to
+# the end of the lease. The rows locked by other dispatchers are skipped.
+OUTBOX_CLAIM_SQL = """
+UPDATE "mails_outbox"
+SET "status" = 'sending', "attempts" = "attempts" + 1,
+    "next_attempt_at" = $2, "updated_at" = $3
+WHERE "id" IN (
+    SELECT "id" FROM "mails_outbox"
+    WHERE "status" IN ('pending', 'sending') AND "next_attempt_at" <= $3
+    ORDER BY "next_attempt_at"
+    LIMIT $1
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING "id", "function", "kwargs", "idempotency_key", "attempts"
+"""
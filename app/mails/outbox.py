@@ -0,0 +1,229 @@
+"""
+Outbox - Transactional emails.
+
+The emails are added to the outbox table in the same transaction of the
+change that triggers them (Eg: the user signup), then a committed change
+always gets its email and a rolled back one never does. The dispatcher
+(a periodic rq job) drains the outbox:
+
+- Rate limit: a token bucket in redis shared by all the dispatchers.
+- Retries: exponential backoff with jitter, up to MAX_ATTEMPTS.
+- At least once: a claimed email is sent again if its dispatcher dies.
+  The idempotency key is marked in redis after each send, then a retry
+  of an already sent email is skipped.
+- Retention: the sent emails are deleted after SENT_RETENTION.
+
+The kwargs are stored in plain text, then never add secrets (Eg: tokens) to
+the outbox: store a reference and build the secret in the send function.
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from rq.utils import import_attribute
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.transactions import in_transaction
+
+from config import settings
+from worker.connection import redis_connection
+from db.jobs import run_db_job
+from .models import OutboxModel, SENT, PENDING, FAILED
+
+
+###################
+# Outbox Settings #
+###################
+
+# Emails claimed per query and seconds to send them before a retry.
+BATCH_SIZE = 100
+LEASE = 60 * 2
+# Seconds of a dispatcher run (the job runs every few seconds).
+DISPATCH_TIME = 30
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 10
+BACKOFF_MAX = 60 * 60
+SENT_MARKER_TTL = 60 * 60 * 24 * 3  # Three days
+SENT_RETENTION = 60 * 60 * 24 * 7  # A week
+BUCKET_KEY = "outbox:bucket"
+
+# KEYS[1]: bucket key - ARGV: rate (tokens/s), burst, requested, now (ms).
+# Return the granted tokens.
+TAKE_TOKENS_SCRIPT = redis_connection.register_script(
+    """
+    local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+    local now = tonumber(ARGV[4])
+    local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+    local tokens = tonumber(bucket[1]) or burst
+    local elapsed = math.max(now - (tonumber(bucket[2]) or now), 0)
+    tokens = math.min(burst, tokens + elapsed * rate / 1000)
+    local granted = math.min(math.floor(tokens), tonumber(ARGV[3]))
+    redis.call("HSET", KEYS[1], "tokens", tokens - granted, "updated", now)
+    redis.call("PEXPIRE", KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+    return granted
+    """
+)
+
+
+def _sent_key(idempotency_key: str) -> str:
+    return f"outbox:sent:{idempotency_key}"
+
+
+#############
+# Add Email #
+#############
+
+
+async def add_to_outbox(
+    function: str,
+    idempotency_key: str,
+    using_db: BaseDBAsyncClient = None,
+    **kwargs,
+) -> bool:
+    """
+    Add a email to the outbox. Pass the connection of the transaction of the
+    triggering change, then the email is committed (or not) with the change.
+
+    Params:
+    ------
+    - function: str - The dotted path of the send function.
+      Eg: mails.service.send_welcome_email
+    - idempotency_key: str - The unique key of the email. Eg: welcome:<user id>
+    - using_db: BaseDBAsyncClient - The transaction (default a new one).
+    - kwargs - The send function params (json serializable).
+
+    Return:
+    ------
+    - added: bool - False if the key was already added.
+    """
+    if using_db:
+        return await OutboxModel.add(function, kwargs, idempotency_key, using_db)
+
+    async with in_transaction() as connection:
+        return await OutboxModel.add(function, kwargs, idempotency_key, connection)
+
+
+##############
+# Dispatcher #
+##############
+
+
+def take_tokens(requested: int) -> int:
+    """
+    Take up to requested tokens (emails) of the global rate limit.
+    """
+    return TAKE_TOKENS_SCRIPT(
+        keys=[BUCKET_KEY],
+        args=[
+            settings.MAIL_RATE_LIMIT,
+            settings.MAIL_RATE_BURST,
+            requested,
+            int(time.time() * 1000),
+        ],
+    )
+
+
+def backoff(attempts: int) -> float:
+    """
+    Seconds to wait before the next attempt (exponential with full jitter).
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempts))
+
+
+def deliver(email: dict) -> None:
+    """
+    Call the send function of the email, once per idempotency key.
+    """
+    sent_key = _sent_key(email["idempotency_key"])
+    if redis_connection.exists(sent_key):
+        return
+
+    import_attribute(email["function"])(**email["kwargs"])
+    redis_connection.set(sent_key, 1, ex=SENT_MARKER_TTL)
+
+
+async def _send_batch(emails: List[dict]) -> None:
+    """
+    Send the emails at the rate limit and save the result of each one.
+    """
+    loop = asyncio.get_running_loop()
+    pending = list(emails)
+
+    while pending:
+        granted = take_tokens(len(pending))
+        if not granted:
+            await asyncio.sleep(1 / settings.MAIL_RATE_LIMIT)
+            continue
+
+        allowed, pending = pending[:granted], pending[granted:]
+        # The send functions are sync, they share the mail loop connections.
+        results = await asyncio.gather(
+            *[loop.run_in_executor(None, deliver, email) for email in allowed],
+            return_exceptions=True,
+        )
+
+        now = datetime.utcnow()
+        sent = [
+            email["id"]
+            for email, result in zip(allowed, results)
+            if not isinstance(result, Exception)
+        ]
+        if sent:
+            await OutboxModel.filter(id__in=sent).update(status=SENT, sent_at=now)
+
+        for email, result in zip(allowed, results):
+            if not isinstance(result, Exception):
+                continue
+
+            attempts = email["attempts"]
+            await OutboxModel.filter(id=email["id"]).update(
+                status=FAILED if attempts >= MAX_ATTEMPTS else PENDING,
+                next_attempt_at=now + timedelta(seconds=backoff(attempts)),
+                last_error=repr(result),
+            )
+
+
+async def purge_sent() -> int:
+    """
+    Delete the emails sent before the retention period.
+
+    Return:
+    ------
+    - deleted: int - The deleted emails.
+    """
+    sent_before = datetime.utcnow() - timedelta(seconds=SENT_RETENTION)
+    return await OutboxModel.filter(status=SENT, sent_at__lt=sent_before).delete()
+
+
+async def _dispatch_outbox() -> int:
+    """
+    Drain the due emails until the outbox is empty or the run time ends, then
+    purge the old sent ones.
+
+    Return:
+    ------
+    - claimed: int - The emails claimed in this run.
+    """
+    deadline = time.monotonic() + DISPATCH_TIME
+    claimed = 0
+
+    while time.monotonic() < deadline:
+        async with in_transaction() as connection:
+            emails = await OutboxModel.claim(BATCH_SIZE, LEASE, connection)
+        if not emails:
+            break
+
+        claimed += len(emails)
+        await _send_batch(emails)
+
+    await purge_sent()
+    return claimed
+
+
+def dispatch_outbox() -> None:
+    """
+    Dispatcher entrypoint (periodic rq job).
+    """
+    run_db_job(_dispatch_outbox)
@@ -1,12 +1,11 @@
 """
-Emails sender class - Sendgrid implementation.
+Emails sender class - Builds SendGrid v3 emails, sent by the configured transport.
 """
 
 import time
 from datetime import datetime
 from typing import List
 
-from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import (
     Mail,
     From,
@@ -20,9 +19,15 @@ from sendgrid.helpers.mail import (
     FileName,
     FileType,
     Disposition,
+    Personalization,
 )
 
 from config import settings
+from .transports import MailLoop, mail_loop
+
+
+# SendGrid limit of personalizations per request.
+MAX_PERSONALIZATIONS = 1000
 
 
 ############################
@@ -35,8 +40,8 @@ class EmailSender:
     Email sender abstraction.
     """
 
-    def __init__(self):
-        self.sendgrid = SendGridAPIClient(settings.SENDGRID_API_KEY)
+    def __init__(self, transport: MailLoop = None):
+        self.transport = transport or mail_loop
         self.from_email = settings.EMAIL_SENDER
 
     def create_email(
@@ -64,15 +69,57 @@ class EmailSender:
         ------
         message: Mail - The sendgrid email object.
         """
-        message = Mail()
-        message.from_email = From(self.from_email)
-        message.subject = Subject(subject)
+        message = self._create_message(
+            subject, html_content, image, content_type, send_at
+        )
 
         _users_list = []
         for _to in to_list:
             _users_list.append(To(_to))
         message.to = _users_list
 
+        return message
+
+    def create_bulk_email(
+        self,
+        to_list: List["str"],
+        subject: str,
+        html_content: str,
+        image: bytes = None,
+        content_type: str = None,
+        send_at: datetime = None,
+    ) -> Mail:
+        """
+        Create a sendgrid email with one personalization per recipient, then
+        each recipient only sees its own address. The params are the same of
+        create_email (max MAX_PERSONALIZATIONS recipients).
+        """
+        message = self._create_message(
+            subject, html_content, image, content_type, send_at
+        )
+
+        for index, _to in enumerate(to_list[:MAX_PERSONALIZATIONS]):
+            personalization = Personalization()
+            personalization.add_to(To(_to))
+            message.add_personalization(personalization, index=index)
+
+        return message
+
+    def _create_message(
+        self,
+        subject: str,
+        html_content: str,
+        image: bytes = None,
+        content_type: str = None,
+        send_at: datetime = None,
+    ) -> Mail:
+        """
+        Create the sendgrid email object without recipients.
+        """
+        message = Mail()
+        message.from_email = From(self.from_email)
+        message.subject = Subject(subject)
+
         if image:
             ext = str(content_type).split("/")[1]
             timestamp = datetime.utcnow().strftime("%Y-%m-%d-%H%M%S")
@@ -83,8 +130,9 @@ class EmailSender:
                 Disposition("attachment"),
             )
 
+        # Global send_at (applies to all the personalizations).
         if send_at:
-            message.send_at = SendAt(self.get_unix_time(send_at), p=0)
+            message.send_at = SendAt(self.get_unix_time(send_at))
 
         message.content = Content(MimeType.html, html_content)
         return message
@@ -97,8 +145,17 @@ class EmailSender:
         ------
         email_to_send: Mail - The sendgrid email object to send.
         """
+        self.transport.send(email_to_send.get())
+
+    async def send_email_async(self, email_to_send: Mail) -> None:
+        """
+        Send the email without blocking the event loop.
 
-        self.sendgrid.send(email_to_send)
+        Params:
+        ------
+        email_to_send: Mail - The sendgrid email object to send.
+        """
+        await self.transport.send_async(email_to_send.get())
 
     def get_unix_time(self, date_time: datetime) -> int:
         """
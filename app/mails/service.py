@@ -2,14 +2,14 @@
 Functions to manage the SendGrid Sender.
 """
 
-import base64
 from typing import List
 from datetime import datetime
 
 from config import settings
-from mails.templates.welcome import welcome_template
-from mails.templates.event_close import event_close_template
-from mails.templates.special_message import special_message_template
+from mails.templates.welcome import WELCOME
+from mails.templates.event_close import EVENT_CLOSE
+from mails.templates.special_message import SPECIAL_MESSAGE
+from .campaigns import start_campaign
 from .sender import EmailSender
 
 ############################
@@ -33,7 +33,7 @@ def send_welcome_email(username: str, email: str) -> None:
     - username: str - The username of the new user
     - email: str - The target email
     """
-    content = welcome_template(name=username)
+    content = WELCOME.render(name=username)
     email = sender.create_email(
         to_list=[email],
         subject=f"Unu app - Bienvenido {username}",
@@ -43,78 +43,92 @@ def send_welcome_email(username: str, email: str) -> None:
 
 
 def send_special_email(
+    event_id: str,
     event_name: str,
     message: str,
     subjet: str,
     to_list: List[str],
     event_url: str,
-    image: bytes = None,
-    content_type: str = None,
+    attachment_url: str = None,
     send_at: datetime = None,
-) -> None:
+) -> str:
     """
-    Send a special email.
+    Send a special email. The recipients are sent in chunks (background jobs).
 
     Params:
     ------
+    - event_id: str - The event uuid.
     - event_name: str - The event name.
     - message: str - The message to participants.
     - subject: str - The email sibject.
     - to_list: List[str] - The participants emails.
     - event_url: str - The url of the currect event.
-    - image: bytes - Optional image.
-    - content_type: str - The content type of the optional image.
+    - attachment_url: str - Optional file (uploaded to the storage), sent
+      as a link.
     - send_at: datetime - Optional date to send the mail.
+
+    Return:
+    ------
+    - campaign_id: str - The id to follow the sending progress.
     """
-    if image:
-        image = base64.b64encode(image).decode()
+    if send_at:
+        send_at = sender.get_unix_time(send_at)
 
-    content = special_message_template(event_name, message, event_url)
-    email = sender.create_email(
-        to_list=to_list,
+    content = SPECIAL_MESSAGE.render(
+        event_name=event_name, message=message, event_url=event_url
+    )
+    return start_campaign(
+        event_id=event_id,
         subject=subjet,
         html_content=content,
-        image=image,
-        content_type=content_type,
+        to_list=to_list,
+        attachment_url=attachment_url,
         send_at=send_at,
     )
-    sender.send_email(email_to_send=email)
 
 
 def send_close_event_email(
+    event_id: str,
     event_name: str,
     event_url: str,
     to_list: List[str],
-) -> None:
+) -> str:
     """
     Send a schedule email to notify that a event is tomorrow.
+    The recipients are sent in chunks (background jobs).
 
     Params:
     ------
+    - event_id: str - The event uuid.
     - event_name: str - The event name.
     - event_url: str - The public event url.
     - to_list: List[str] - The participants emails.
+
+    Return:
+    ------
+    - campaign_id: str - The id to follow the sending progress.
     """
-    # Create mail
-    content = event_close_template(event_name, event_url)
-    email = sender.create_email(
-        to_list=to_list,
+    content = EVENT_CLOSE.render(event_name=event_name, event_url=event_url)
+    return start_campaign(
+        event_id=event_id,
         subject="Unu Events - Notificación   =)",
         html_content=content,
+        to_list=to_list,
     )
 
-    sender.send_email(email)
-
 
-def send_recovery_password_email(email: str, token: str) -> None:
+def send_recovery_password_email(email: str) -> None:
     """
-    Send a email with a link with the token to reset the password.
+    Send a email with a link with the token to reset the password. The token
+    is created here, at send time, then it's never stored (Eg: in the outbox).
 
     Params:
     ------
     - email: str - The user email
-    - token: str - The encoded JWT for recovery password
     """
+    from auth.service import create_access_token
+
+    token = create_access_token(email, for_recovery_password=True)
     link = f"{settings.WEB_HOST}/recovery-password?token={token}"
     content = f"""
     <h1>Reset your password</h1>
@@ -0,0 +1,60 @@
+"""
+Email templates - Render micro-benchmark.
+
+Compare the source templates (string building on each call) with the
+compiled ones. Run from the app folder:
+
+    python -m mails.templates.benchmark [renders]
+"""
+
+import sys
+import timeit
+
+from .event_close import EVENT_CLOSE, event_close_template
+from .special_message import SPECIAL_MESSAGE, special_message_template
+from .welcome import WELCOME, welcome_template
+
+
+VALUES = {
+    "name": "Jhon Doe",
+    "event_name": "PyCon Latam",
+    "event_url": "python-org/pycon-latam",
+    "message": "Recuerda llevar tu documento de identidad.",
+}
+
+CASES = [
+    (WELCOME, welcome_template),
+    (EVENT_CLOSE, event_close_template),
+    (SPECIAL_MESSAGE, special_message_template),
+]
+
+
+def _rate(function, renders: int) -> float:
+    """
+    Return the renders per second (best of 3 runs).
+    """
+    best = min(timeit.repeat(function, number=renders, repeat=3))
+    return renders / best
+
+
+def run(renders: int = 10000) -> None:
+    """
+    Print the render throughput of each template.
+    """
+    print(f"{'template':<18}{'source/s':>12}{'compiled/s':>12}{'size':>14}")
+    for template, source in CASES:
+        values = {slot: VALUES[slot] for slot in template.slots}
+        args = [values[slot] for slot in template.slots]
+
+        source_rate = _rate(lambda: source(*args), renders)
+        compiled_rate = _rate(lambda: template.render(**values), renders)
+        sizes = f"{len(source(*args))}/{len(template.render(**values))}"
+
+        print(
+            f"{template.name:<18}{source_rate:>12.0f}{compiled_rate:>12.0f}"
+            f"{sizes:>14}"
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,80 @@
+"""
+Email templates compiler.
+
+A template is compiled once: the source function is called with markers
+in place of its params, then the HTML is minified and split in static
+segments and slots. They are compiled to a function that returns the
+minified HTML with the values (one f-string).
+"""
+
+import re
+from typing import Callable, List, Tuple
+
+
+# Marker of a slot in the compiled source. Eg: \x00event_name\x00
+SLOT_MARKER = "\x00{}\x00"
+SLOT_REGEX = re.compile("\x00([a-z_]+)\x00")
+WHITESPACE_REGEX = re.compile(r"\s+")
+
+
+def minify(html: str) -> str:
+    """
+    Collapse the whitespace runs (indentation and line breaks of the sources)
+    in a single space. The rendered email doesn't change.
+    """
+    return WHITESPACE_REGEX.sub(" ", html)
+
+
+class CompiledTemplate:
+    """
+    A template minified once and compiled to a render function.
+
+    Usage:
+    -----
+    template = CompiledTemplate("welcome", welcome_template, "name")
+    html = template.render(name="Jhon")
+    """
+
+    def __init__(self, name: str, source: Callable[..., str], *slots: str):
+        self.name = name
+        self.slots = slots
+        self.segments, self.slot_order = self._compile(source, slots)
+        self.render = self._render_function(self.segments, self.slot_order)
+
+    @staticmethod
+    def _compile(
+        source: Callable[..., str], slots: Tuple[str]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Render the source with the slot markers and split it.
+        Eg: ["<h1>", "</h1>"], ["name"]
+        """
+        marked = source(*[SLOT_MARKER.format(slot) for slot in slots])
+        parts = SLOT_REGEX.split(minify(marked))
+        # The split alternates static segments and slot names.
+        return parts[::2], parts[1::2]
+
+    @staticmethod
+    def _render_function(
+        segments: List[str], slot_order: List[str]
+    ) -> Callable[..., str]:
+        """
+        Return a function that renders the minified template with a single
+        f-string. Eg: def render(*, name): return f"<h1>{name}</h1>"
+        Then a render is as fast as the sources (without their concatenations).
+        The slot names are identifiers (SLOT_REGEX) and the segments come
+        from the template sources.
+        """
+        escaped = [segment.replace("{", "{{").replace("}", "}}") for segment in segments]
+        fields = [f"{{{slot}}}" for slot in slot_order] + [""]
+        template = "".join(segment + field for segment, field in zip(escaped, fields))
+
+        params = ", ".join(dict.fromkeys(slot_order))
+        namespace: dict = {}
+        exec(  # pylint: disable=exec-used
+            f"def render(*, {params}):\n    return f{template!r}\n"
+            if params
+            else f"def render():\n    return {template!r}\n",
+            namespace,
+        )
+        return namespace["render"]
@@ -2,6 +2,8 @@
 Event alert HTML text template.
 """
 
+from .compiler import CompiledTemplate
+
 
 def event_close_template(event_name: str, event_url: str) -> str:
     """
@@ -43,3 +45,9 @@ def event_close_template(event_name: str, event_url: str) -> str:
     </html>
     """
     )
+
+
+# Compiled once on import (see compiler.CompiledTemplate).
+EVENT_CLOSE = CompiledTemplate(
+    "event_close", event_close_template, "event_name", "event_url"
+)
@@ -2,6 +2,8 @@
 Special message HTML template.
 """
 
+from .compiler import CompiledTemplate
+
 
 def special_message_template(event_name: str, message: str, event_url: str) -> str:
     """
@@ -39,3 +41,9 @@ def special_message_template(event_name: str, message: str, event_url: str) -> s
     </html>
     """
     )
+
+
+# Compiled once on import (see compiler.CompiledTemplate).
+SPECIAL_MESSAGE = CompiledTemplate(
+    "special_message", special_message_template, "event_name", "message", "event_url"
+)
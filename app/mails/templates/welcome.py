@@ -2,6 +2,8 @@
 Welcome HTML template.
 """
 
+from .compiler import CompiledTemplate
+
 
 def welcome_template(name: str) -> str:
     """
@@ -50,3 +52,7 @@ def welcome_template(name: str) -> str:
     </html>
     """
     )
+
+
+# Compiled once on import (see compiler.CompiledTemplate).
+WELCOME = CompiledTemplate("welcome", welcome_template, "name")
@@ -0,0 +1,110 @@
+"""
+Mail transports.
+
+The transport is selected with settings.MAIL_TRANSPORT. All the sends of a
+process run in one event loop in a background thread (MailLoop), then the
+pooled connections are shared by the sync callers (rq jobs, background
+tasks) and the async ones.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable, Coroutine
+
+from config import settings
+from .base import MailTransport
+
+
+def create_transport(name: str = None) -> MailTransport:
+    """
+    Return a new transport. The modules are imported on demand, then only
+    the dependencies of the selected transport are required.
+
+    Params:
+    ------
+    - name: str - sendgrid | smtp | file | memory (default MAIL_TRANSPORT).
+    """
+    name = name or settings.MAIL_TRANSPORT
+
+    if name == "sendgrid":
+        from .sendgrid_api import SendGridTransport
+
+        return SendGridTransport()
+    if name == "smtp":
+        from .smtp import SMTPTransport
+
+        return SMTPTransport()
+    if name == "file":
+        from .sink import FileTransport
+
+        return FileTransport()
+    if name == "memory":
+        from .sink import MemoryTransport
+
+        return MemoryTransport()
+
+    raise ValueError(f"Unknown mail transport: {name}")
+
+
+class MailLoop:
+    """
+    Run the transport in a dedicated event loop thread (started on demand).
+    """
+
+    def __init__(self, transport_factory: Callable[[], MailTransport]):
+        self.transport_factory = transport_factory
+        self.transport = None
+        self.loop = None
+        self.lock = threading.Lock()
+        # A forked process (Eg: rq jobs) doesn't inherit the loop thread.
+        os.register_at_fork(after_in_child=self._reset)
+
+    def submit(self, payload: dict) -> Future:
+        """
+        Schedule a send and return its (thread-safe) future.
+        """
+        return asyncio.run_coroutine_threadsafe(self._send(payload), self._start())
+
+    def send(self, payload: dict) -> None:
+        """
+        Send and wait the result (sync callers).
+        """
+        self.submit(payload).result()
+
+    async def send_async(self, payload: dict) -> None:
+        """
+        Send without blocking the caller loop.
+        """
+        await asyncio.wrap_future(self.submit(payload))
+
+    def run(self, coroutine: Coroutine):
+        """
+        Run any coroutine in the mail loop (Eg: transport.close()).
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._start()).result()
+
+    async def _send(self, payload: dict) -> None:
+        if not self.transport:
+            self.transport = self.transport_factory()
+        await self.transport.send(payload)
+
+    def _reset(self) -> None:
+        self.transport = None
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self.lock:
+            if not self.loop:
+                self.loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=self.loop.run_forever, name="mail-loop", daemon=True
+                )
+                thread.start()
+        return self.loop
+
+
+# Shared by all the senders of the process.
+mail_loop = MailLoop(create_transport)
@@ -0,0 +1,45 @@
+"""
+Mail transports - Interface.
+
+A transport delivers emails in the SendGrid v3 format (Mail.get()), the
+format built by EmailSender. Each transport keeps its connections open
+between sends.
+"""
+
+from abc import ABC, abstractmethod
+from typing import List
+
+
+class MailTransport(ABC):
+    """
+    Mail transport interface.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def send(self, payload: dict) -> None:
+        """
+        Deliver the email.
+
+        Params:
+        ------
+        - payload: dict - The email in the SendGrid v3 format.
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        """
+        Close the open connections.
+        """
+
+
+def recipients(personalization: dict) -> List[str]:
+    """
+    Return all the addresses (to, cc and bcc) of a personalization.
+    """
+    return [
+        address["email"]
+        for field in ("to", "cc", "bcc")
+        for address in personalization.get(field, [])
+    ]
@@ -0,0 +1,39 @@
+"""
+Mail transports - SendGrid over a pooled async HTTP client.
+"""
+
+import httpx
+
+from config import settings
+from .base import MailTransport
+
+
+SENDGRID_API_URL = "https://api.sendgrid.com"
+SEND_TIMEOUT = 30
+
+
+class SendGridTransport(MailTransport):
+    """
+    Send the emails to the SendGrid v3 API. The HTTP connections are kept
+    alive and reused between sends (up to MAIL_POOL_SIZE).
+    """
+
+    name = "sendgrid"
+
+    def __init__(self, api_key: str = None, pool_size: int = None):
+        pool_size = pool_size or settings.MAIL_POOL_SIZE
+        self.client = httpx.AsyncClient(
+            base_url=SENDGRID_API_URL,
+            headers={"Authorization": f"Bearer {api_key or settings.SENDGRID_API_KEY}"},
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            timeout=SEND_TIMEOUT,
+        )
+
+    async def send(self, payload: dict) -> None:
+        response = await self.client.post("/v3/mail/send", json=payload)
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,53 @@
+"""
+Mail transports - Local sinks (tests and load benchmarks without network).
+"""
+
+import asyncio
+import json
+from typing import List
+
+from config import settings
+from .base import MailTransport
+
+
+class MemoryTransport(MailTransport):
+    """
+    Keep the sent emails in memory (see outbox).
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self.outbox: List[dict] = []
+
+    async def send(self, payload: dict) -> None:
+        self.outbox.append(payload)
+
+    async def close(self) -> None:
+        pass
+
+
+class FileTransport(MailTransport):
+    """
+    Append the sent emails to a file, one json per line.
+    """
+
+    name = "file"
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.MAIL_FILE_PATH
+        self.lock = asyncio.Lock()
+        self.file = None
+
+    async def send(self, payload: dict) -> None:
+        line = json.dumps(payload) + "\n"
+        async with self.lock:
+            if not self.file:
+                self.file = open(self.path, "a")
+            self.file.write(line)
+            self.file.flush()
+
+    async def close(self) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,132 @@
+"""
+Mail transports - SMTP with connection reuse.
+"""
+
+import asyncio
+import base64
+from email.message import EmailMessage
+from typing import List
+
+import aiosmtplib
+
+from config import settings
+from .base import MailTransport, recipients
+
+
+class SMTPTransport(MailTransport):
+    """
+    Send the emails to a SMTP server (Eg: a local stand-in like MailHog).
+    A pool of connections is opened on demand and reused; a broken
+    connection is replaced on the next send.
+
+    The pool lives as long as the process: in the rq fork mode
+    (WORKER_MODE=fork) each job runs in a new child, so its pool is opened
+    and dropped with the job and the connections are only reused by the
+    sends of that job (Eg: the chunks of a bulk email). The threads mode
+    and the API process keep them between jobs.
+
+    SMTP can't schedule a delivery, then the emails with send_at are
+    rejected instead of being sent right away.
+    """
+
+    name = "smtp"
+
+    def __init__(self, pool_size: int = None):
+        self.pool_size = pool_size or settings.MAIL_POOL_SIZE
+        self.pool = asyncio.Queue()
+        self.opened = 0
+
+    async def send(self, payload: dict) -> None:
+        if payload.get("send_at"):
+            raise ValueError("The SMTP transport doesn't support send_at")
+
+        client = await self._acquire()
+        try:
+            for message, to_list in self.to_messages(payload):
+                await client.send_message(message, recipients=to_list)
+        except Exception:
+            # Don't reuse a connection in unknown state.
+            self.opened -= 1
+            client.close()
+            raise
+        self.pool.put_nowait(client)
+
+    async def close(self) -> None:
+        while not self.pool.empty():
+            client = self.pool.get_nowait()
+            self.opened -= 1
+            await client.quit()
+
+    async def _acquire(self) -> aiosmtplib.SMTP:
+        """
+        Take a idle connection, open a new one or wait for one.
+        """
+        if self.pool.empty() and self.opened < self.pool_size:
+            self.opened += 1
+            try:
+                client = aiosmtplib.SMTP(
+                    hostname=settings.SMTP_HOST,
+                    port=settings.SMTP_PORT,
+                    use_tls=settings.SMTP_USE_TLS,
+                )
+                await self._connect(client)
+            except Exception:
+                self.opened -= 1
+                raise
+            return client
+
+        client = await self.pool.get()
+        if not client.is_connected:
+            try:
+                await self._connect(client)
+            except Exception:
+                self.opened -= 1
+                raise
+        return client
+
+    @staticmethod
+    async def _connect(client: aiosmtplib.SMTP) -> None:
+        """
+        Open the connection and authenticate (a dropped connection must log
+        in again after reconnecting).
+        """
+        await client.connect()
+        if settings.SMTP_USER:
+            await client.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+
+    @staticmethod
+    def to_messages(payload: dict) -> List[tuple]:
+        """
+        Build one MIME message per personalization.
+
+        Return:
+        ------
+        - messages: List[(EmailMessage, List[str])] - The messages and the
+        envelope recipients of each one.
+        """
+        html = next(
+            content["value"]
+            for content in payload["content"]
+            if content["type"] == "text/html"
+        )
+
+        messages = []
+        for personalization in payload["personalizations"]:
+            message = EmailMessage()
+            message["From"] = payload["from"]["email"]
+            message["Subject"] = personalization.get("subject", payload["subject"])
+            to_list = [address["email"] for address in personalization.get("to", [])]
+            message["To"] = ", ".join(to_list)
+            message.set_content(html, subtype="html")
+
+            for attachment in payload.get("attachments", []):
+                maintype, _, subtype = attachment["type"].partition("/")
+                message.add_attachment(
+                    base64.b64decode(attachment["content"]),
+                    maintype=maintype,
+                    subtype=subtype,
+                    filename=attachment["filename"],
+                )
+
+            messages.append((message, recipients(personalization)))
+        return messages
@@ -9,6 +9,7 @@ from db.db_config import TORTOISE_ORM_CONFIG
 
 from api import api_router
 from config import settings
+from logger.main import error_logger, server_error_handler
 
 ################
 # App Settings #
@@ -21,6 +22,15 @@ app = FastAPI(
 )
 
 
+################
+# Error Logger #
+################
+
+# Before the db, then its last flush runs before the connections close.
+app.add_event_handler("startup", error_logger.start)
+app.add_event_handler("shutdown", error_logger.stop)
+app.add_exception_handler(Exception, server_error_handler)
+
 ###############
 # DB Settings #
 ###############
@@ -5,7 +5,9 @@ Google Cloud Storage- Upload Functions.
 import os
 import base64
 from uuid import uuid4
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from urllib.parse import unquote
 
 import six
 from fastapi import status, HTTPException, UploadFile
@@ -129,3 +131,25 @@ def get_or_update_logo(encoded_image_or_url: str) -> str:
 
     # First the file is upload, then the generated url is returned.
     return upload_file(file_base64=encoded_image_or_url)
+
+
+def signed_url(url: str, expiration: int) -> str:
+    """
+    Return a temporary url to download a file uploaded with upload_file. The
+    link works even if the bucket is not public (signed with the service
+    account of the storage credentials).
+
+    Params:
+    ------
+    url: str - The file public url.
+    expiration: int - Seconds the link is valid (max 7 days).
+
+    Return:
+    ------
+    url: str - The signed url.
+    """
+    bucket = get_storage_bucket()
+    blob_name = unquote(url.split(f"/{bucket.name}/", 1)[1])
+    return bucket.blob(blob_name).generate_signed_url(
+        version="v4", expiration=timedelta(seconds=expiration), method="GET"
+    )
@@ -0,0 +1,87 @@
+"""
+Tests - Conditional GET validators.
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+from fastapi import Request, Response
+
+from utils.conditional import ConditionalGet, make_etag
+
+NOW = datetime(2020, 10, 21, 18, 0, 0)
+
+
+def entitie(updated_at: datetime = NOW) -> SimpleNamespace:
+    return SimpleNamespace(id=uuid4(), updated_at=updated_at)
+
+
+def conditional(**headers) -> ConditionalGet:
+    raw_headers = [
+        (name.replace("_", "-").encode(), value.encode())
+        for name, value in headers.items()
+    ]
+    request = Request({"type": "http", "headers": raw_headers})
+    return ConditionalGet(request, Response())
+
+
+def test_etag_changes_with_the_entities():
+    first, second = entitie(), entitie()
+    etag = make_etag(first, second)
+
+    assert etag.startswith('W/"')
+    assert make_etag(first, second) == etag
+    assert make_etag(first) != etag
+    assert make_etag(first, entitie()) != etag
+
+    first.updated_at += timedelta(seconds=1)
+    assert make_etag(first, second) != etag
+
+
+def test_fresh_etag_returns_304():
+    first = entitie()
+    not_modified = conditional(if_none_match=make_etag(first)).evaluate(first)
+
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == make_etag(first)
+
+
+def test_stale_etag_sets_the_validators():
+    first = entitie()
+    evaluator = conditional(if_none_match='W/"other"')
+
+    assert evaluator.evaluate(first) is None
+    assert evaluator.response.headers["etag"] == make_etag(first)
+    assert evaluator.response.headers["last-modified"] == (
+        "Wed, 21 Oct 2020 18:00:00 GMT"
+    )
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    first = entitie()
+    evaluator = conditional(
+        if_none_match='W/"other"', if_modified_since="Wed, 21 Oct 2020 19:00:00 GMT"
+    )
+    assert evaluator.evaluate(first) is None
+
+
+def test_if_modified_since():
+    first = entitie()
+    fresh = conditional(if_modified_since="Wed, 21 Oct 2020 18:00:00 GMT")
+    stale = conditional(if_modified_since="Wed, 21 Oct 2020 17:59:59 GMT")
+
+    assert fresh.evaluate(first).status_code == 304
+    assert stale.evaluate(first) is None
+
+
+def test_collection_is_validated_by_etag_only():
+    first, second = entitie(NOW - timedelta(days=1)), entitie()
+    # The last modified entity is kept, then max(updated_at) doesn't move.
+    evaluator = conditional(if_modified_since="Wed, 21 Oct 2020 18:00:00 GMT")
+
+    assert evaluator.evaluate_collection(second) is None
+    assert "last-modified" not in evaluator.response.headers
+
+    etag = make_etag(first, second)
+    assert conditional(if_none_match=etag).evaluate_collection(second) is None
@@ -0,0 +1,33 @@
+"""
+Tests - Event dates to UTC.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from utils.dates import to_utc
+
+
+@pytest.mark.parametrize(
+    "utc, expected",
+    [
+        ("-5", datetime(2020, 10, 21, 23, 0)),
+        ("+2", datetime(2020, 10, 21, 16, 0)),
+        ("UTC-03:00", datetime(2020, 10, 21, 21, 0)),
+        ("GMT+5:30", datetime(2020, 10, 21, 12, 30)),
+        ("", datetime(2020, 10, 21, 18, 0)),
+        ("unknown", datetime(2020, 10, 21, 18, 0)),
+    ],
+)
+def test_local_date_with_the_event_offset(utc, expected):
+    assert to_utc("2020-10-21T18:00", utc) == expected
+
+
+def test_date_with_its_own_offset_ignores_the_event_offset():
+    assert to_utc("2020-10-21T18:00Z", "-5") == datetime(2020, 10, 21, 18, 0)
+    assert to_utc("2020-10-21T18:00+02:00", "-5") == datetime(2020, 10, 21, 16, 0)
+
+
+def test_invalid_date():
+    assert to_utc("21/10/2020", "-5") is None
@@ -0,0 +1,77 @@
+"""
+Tests - Dead letters paging (needs the redis of REDIS_URL).
+"""
+
+import json
+from uuid import uuid4
+
+import pytest
+import redis
+
+from worker import deadletter
+from worker.connection import redis_connection
+
+
+def _redis_available() -> bool:
+    try:
+        return redis_connection.ping()
+    except redis.ConnectionError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _redis_available(), reason="redis not available")
+
+
+@pytest.fixture
+def store(monkeypatch):
+    prefix = f"test:{uuid4().hex}"
+    keys = [f"{prefix}:entries", f"{prefix}:status", f"{prefix}:index"]
+    monkeypatch.setattr(deadletter, "ENTRIES_KEY", keys[0])
+    monkeypatch.setattr(deadletter, "STATUS_KEY", keys[1])
+    monkeypatch.setattr(deadletter, "INDEX_KEY", keys[2])
+    monkeypatch.setattr(deadletter, "SCAN_PAGE", 2)
+    yield
+    redis_connection.delete(*keys)
+
+
+def add(job_id: str, failed_at: float) -> None:
+    entry = {
+        "id": job_id,
+        "function": "mails.campaigns.send_campaign_chunk",
+        "queue": "bulk",
+        "fingerprint": "f",
+        "failed_at": failed_at,
+    }
+    redis_connection.hset(deadletter.ENTRIES_KEY, job_id, json.dumps(entry))
+    redis_connection.hset(deadletter.STATUS_KEY, job_id, deadletter.DEAD)
+    redis_connection.zadd(deadletter.INDEX_KEY, {job_id: failed_at})
+
+
+def test_find_pages_all_entries(store):
+    for index in range(5):
+        add(f"job-{index}", 100 + index)
+
+    found = [entry["id"] for entry in deadletter.find()]
+    assert found == [f"job-{index}" for index in range(5)]
+
+
+def test_find_doesnt_skip_entries_that_fail_again(store):
+    for index in range(5):
+        add(f"job-{index}", 100 + index)
+
+    found = []
+    for entry in deadletter.find(until=200):
+        found.append(entry["id"])
+        # Replayed and dead again: the entry moves to the end of the index.
+        add(entry["id"], 300)
+
+    assert found == [f"job-{index}" for index in range(5)]
+
+
+def test_find_pages_entries_of_the_same_date(store):
+    for index in range(5):
+        add(f"job-{index}", 100)
+    add("job-5", 101)
+
+    found = [entry["id"] for entry in deadletter.find()]
+    assert found == [f"job-{index}" for index in range(6)]
@@ -0,0 +1,25 @@
+"""
+Tests - Error fingerprints.
+"""
+
+from utils.fingerprints import fingerprint, normalize_message
+
+
+def test_normalize_message_replaces_the_variable_parts():
+    message = (
+        "Timeout after 30s on 'a@b.com' (job 3f2b8c1e-1d2a-4c3b-9e8f-0a1b2c3d4e5f)"
+    )
+    assert normalize_message(message) == "Timeout after <n>s on <v> (job <id>)"
+
+
+def test_same_cause_same_fingerprint():
+    first = fingerprint("ConnectionError", "Refused by 10.0.0.1:25", "mails.send")
+    second = fingerprint("ConnectionError", "Refused by 10.0.0.2:587", "mails.send")
+    assert first == second
+    assert len(first) == 12
+
+
+def test_other_type_or_location_other_fingerprint():
+    base = fingerprint("ConnectionError", "Refused", "mails.send")
+    assert fingerprint("TimeoutError", "Refused", "mails.send") != base
+    assert fingerprint("ConnectionError", "Refused", "mails.close") != base
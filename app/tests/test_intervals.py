@@ -0,0 +1,74 @@
+"""
+Tests - Agenda time intervals.
+"""
+
+from contextlib import asynccontextmanager
+
+import pytest
+from tortoise import Tortoise
+
+from api.v1.agenda.intervals import find_overlaps, parse_hour
+from api.v1.agenda.models import AgendaDaysModel, ConferencesModel
+
+
+@asynccontextmanager
+async def agenda_day(*hours):
+    """
+    Yield a day (in a in-memory db) with one conference per (start, end).
+    """
+    await Tortoise.init(
+        db_url="sqlite://:memory:", modules={"models": ["api.v1.agenda.models"]}
+    )
+    await Tortoise.generate_schemas()
+    try:
+        day = await AgendaDaysModel.create(event="event", date="2020-10-21", title="")
+        for start, end in hours:
+            await ConferencesModel.create(
+                name=f"{start}-{end}",
+                start_hour=start,
+                end_hour=end,
+                description="",
+                speaker="speaker",
+                day=day,
+            )
+        yield ConferencesModel.filter(day=day)
+    finally:
+        await Tortoise.close_connections()
+
+
+@pytest.mark.parametrize(
+    "value, expected", [("9:30", "09:30"), (" 09:30 ", "09:30"), ("23:59", "23:59")]
+)
+def test_parse_hour(value, expected):
+    assert parse_hour(value) == expected
+
+
+@pytest.mark.parametrize("value", ["24:00", "9:3", "09:60", "9.30", ""])
+def test_parse_hour_invalid(value):
+    with pytest.raises(ValueError):
+        parse_hour(value)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [
+        # Between two talks.
+        ("10:00", "11:00", []),
+        # Starts inside the previous talk.
+        ("09:30", "10:30", ["09:00-10:00"]),
+        # Ends inside the next talk.
+        ("10:30", "11:30", ["11:00-12:00"]),
+        # Covers many talks.
+        ("08:00", "13:00", ["09:00-10:00", "11:00-12:00", "12:00-12:30"]),
+        # Inside a talk.
+        ("11:15", "11:45", ["11:00-12:00"]),
+        # Same start.
+        ("12:00", "12:15", ["12:00-12:30"]),
+    ],
+)
+async def test_find_overlaps(start, end, expected):
+    hours = [("09:00", "10:00"), ("11:00", "12:00"), ("12:00", "12:30")]
+    async with agenda_day(*hours) as bucket:
+        overlaps = await find_overlaps(bucket, start, end)
+    assert sorted(overlap.name for overlap in overlaps) == expected
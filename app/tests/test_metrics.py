@@ -0,0 +1,75 @@
+"""
+Tests - Jobs metrics.
+"""
+
+import pytest
+
+from worker import metrics
+
+
+def histogram_series(name: str, values: list, labels: dict) -> dict:
+    series = {}
+    for bucket in metrics.BUCKETS:
+        key = metrics._series(f"{name}_bucket", {**labels, "le": metrics._le(bucket)})
+        series[key] = sum(1 for value in values if value <= bucket)
+    series[metrics._series(f"{name}_sum", labels)] = sum(values)
+    series[metrics._series(f"{name}_count", labels)] = len(values)
+    return series
+
+
+def test_histogram_quantiles_are_bucket_upper_bounds():
+    labels = {"queue": "bulk"}
+    values = [0.2] * 50 + [0.8] * 45 + [4, 4, 4, 40, 40]
+    series = histogram_series("rq_job_run_seconds", values, labels)
+
+    summary = metrics.histogram("rq_job_run_seconds", labels, series)
+
+    assert summary["count"] == 100
+    assert summary["mean"] == round(sum(values) / 100, 3)
+    assert summary["p50"] == 0.25
+    assert summary["p95"] == 1
+
+
+def test_empty_histogram():
+    assert metrics.histogram("rq_job_run_seconds", {"queue": "bulk"}, {}) == {
+        "count": 0,
+        "mean": 0,
+        "p50": 0,
+        "p95": 0,
+    }
+
+
+def test_render_prometheus_text(monkeypatch):
+    labels = {"queue": "bulk"}
+    series = histogram_series("rq_job_wait_seconds", [3], labels)
+    series['rq_jobs_total{queue="bulk",function="a.b",status="failed"}'] = 2.0
+    series['unknown_total{queue="bulk"}'] = 1.0
+    monkeypatch.setattr(metrics, "read", lambda: series)
+
+    text = metrics.render([("rq_queue_depth", "Jobs.", {"queue": "bulk"}, 4)])
+    lines = text.splitlines()
+
+    assert "# TYPE rq_jobs_total counter" in lines
+    assert 'rq_jobs_total{queue="bulk",function="a.b",status="failed"} 2' in lines
+    assert "unknown_total" not in text
+    assert lines[-2:] == [
+        "# TYPE rq_queue_depth gauge",
+        'rq_queue_depth{queue="bulk"} 4',
+    ]
+
+    # The buckets of a series are sorted by their bound, +Inf the last.
+    buckets = [line for line in lines if "rq_job_wait_seconds_bucket" in line]
+    assert buckets[0] == 'rq_job_wait_seconds_bucket{queue="bulk",le="0.05"} 0'
+    assert buckets[-1] == 'rq_job_wait_seconds_bucket{queue="bulk",le="+Inf"} 1'
+    assert 'rq_job_wait_seconds_sum{queue="bulk"} 3' in lines
+
+
+@pytest.mark.parametrize(
+    "labels, expected",
+    [
+        ({}, "name"),
+        ({"a": 'say "hi"'}, 'name{a="say \\"hi\\""}'),
+    ],
+)
+def test_series_labels_are_escaped(labels, expected):
+    assert metrics._series("name", labels) == expected
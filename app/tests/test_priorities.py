@@ -0,0 +1,50 @@
+"""
+Tests - Priority classes of the jobs.
+"""
+
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+from worker.priorities import route, weighted_order, worker_queues
+
+
+def queues(*names) -> list:
+    return [SimpleNamespace(name=name) for name in names]
+
+
+def test_route():
+    assert route("mails.outbox.dispatch_outbox") == "critical"
+    assert route("mails.campaigns.send_campaign_chunk") == "bulk"
+    assert route("api.v1.agenda.jobs.unknown") == "default"
+
+
+def test_worker_queues_sorted_by_priority():
+    assert worker_queues([]) == ["critical", "default", "bulk"]
+    # Legacy queues go with their class, other queues with the default one.
+    assert worker_queues(["email", "custom", "default"]) == [
+        "critical",
+        "default",
+        "custom",
+        "bulk",
+        "email",
+    ]
+
+
+def test_weighted_order_follows_the_weights():
+    random.seed(7)
+    weights = {"critical": 10, "default": 3, "bulk": 1}
+    first = Counter(
+        weighted_order(queues("critical", "default", "bulk"), weights)[0].name
+        for _ in range(5000)
+    )
+
+    assert first["critical"] > first["default"] > first["bulk"] > 0
+    # P(first) = weight / total weight.
+    assert abs(first["critical"] / 5000 - 10 / 14) < 0.03
+
+
+def test_weighted_order_queues_without_weight_go_last():
+    ordered = weighted_order(queues("other", "email", "critical"), {"bulk": 1})
+    assert [queue.name for queue in ordered][:1] == ["email"]
+    assert {queue.name for queue in ordered[1:]} == {"other", "critical"}
@@ -0,0 +1,61 @@
+"""
+Tests - Scheduler coalescing windows.
+"""
+
+import json
+from unittest import mock
+
+import pytest
+
+from worker import scheduler
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    connection = mock.MagicMock()
+    monkeypatch.setattr(scheduler, "redis_connection", connection)
+    return connection.pipeline.return_value
+
+
+def test_coalesce_one_job_per_window(monkeypatch, pipeline):
+    monkeypatch.setattr(scheduler.time, "time", lambda: 1000.0)
+    first = scheduler.coalesce("a.b", "snapshot:1", 30, 1)
+    monkeypatch.setattr(scheduler.time, "time", lambda: 1019.9)
+    second = scheduler.coalesce("a.b", "snapshot:1", 30, 2)
+
+    # 1000 // 30 = 33: the window [990, 1020) runs at its end.
+    assert first == second == "coalesce:snapshot:1:33"
+    pipeline.zadd.assert_called_with(scheduler.SCHEDULE_KEY, {first: 1020}, nx=True)
+
+    # The last call params are kept.
+    job_id, payload = pipeline.hset.call_args[0][1:]
+    assert job_id == first
+    assert json.loads(payload)["args"] == [2]
+
+
+def test_coalesce_next_window_is_other_job(monkeypatch, pipeline):
+    monkeypatch.setattr(scheduler.time, "time", lambda: 1020.0)
+    assert scheduler.coalesce("a.b", "snapshot:1", 30) == "coalesce:snapshot:1:34"
+    assert scheduler.coalesce("a.b", "snapshot:2", 30) == "coalesce:snapshot:2:34"
+
+
+def test_promote_one_rq_job_per_run(monkeypatch, pipeline):
+    payload = json.dumps(
+        {"function": "a.b", "args": [1], "kwargs": {}, "queue": "default"}
+    ).encode()
+    claim = mock.MagicMock(return_value=[b"reminder:1", b"1020", payload])
+    monkeypatch.setattr(scheduler, "CLAIM_DUE_SCRIPT", claim)
+    monkeypatch.setattr(scheduler, "REMOVE_PROMOTED_SCRIPT", mock.MagicMock())
+    get_queue = mock.MagicMock()
+    monkeypatch.setattr(scheduler, "get_queue", get_queue)
+    monkeypatch.setattr(scheduler, "inc", mock.MagicMock())
+
+    assert scheduler.promote_due(now=1030.0) == 1
+
+    # The rq job id is per run, the schedule id is kept.
+    queue = get_queue.return_value
+    assert queue.create_job.call_args[1]["job_id"] == "reminder:1:1020"
+    scheduler.REMOVE_PROMOTED_SCRIPT.assert_called_with(
+        keys=[scheduler.SCHEDULE_KEY, scheduler.PAYLOADS_KEY],
+        args=[1030.0 + scheduler.PROMOTE_LEASE, b"reminder:1", payload],
+    )
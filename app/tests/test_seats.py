@@ -0,0 +1,81 @@
+"""
+Tests - Seats allocator (needs the redis of REDIS_URL).
+"""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+import redis
+
+from api.v1.participants.seats import (
+    _seats_key,
+    release_seats,
+    reserve_seats,
+    reset_seats,
+    seats_state,
+    seed_seats,
+)
+from worker.connection import redis_connection
+
+
+def _redis_available() -> bool:
+    try:
+        return redis_connection.ping()
+    except redis.ConnectionError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _redis_available(), reason="redis not available")
+
+
+@pytest.fixture
+def event_id():
+    event_id = str(uuid4())
+    yield event_id
+    redis_connection.delete(_seats_key(event_id))
+
+
+def used(event_id: str) -> int:
+    return int(redis_connection.hget(_seats_key(event_id), "used"))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reservations_never_oversell(event_id):
+    await seed_seats(event_id, 10)
+
+    results = await asyncio.gather(
+        *[reserve_seats(event_id, 100, 7) for _ in range(50)]
+    )
+
+    assert sum(granted for granted, _ in results) == 90
+    assert used(event_id) == 100
+
+
+@pytest.mark.asyncio
+async def test_not_seeded_counter_reserves_nothing(event_id):
+    assert await reserve_seats(event_id, 100, 1) == (None, 0)
+
+    await seed_seats(event_id, 95)
+    # A seeded counter is never seeded again (Eg: a concurrent seed).
+    await seed_seats(event_id, 0)
+
+    assert await reserve_seats(event_id, 100, 10) == (5, 0)
+    assert await reserve_seats(event_id, 100, 10) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_reset_starts_a_new_generation(event_id):
+    await seed_seats(event_id, 0)
+    granted, old_version = await reserve_seats(event_id, 10, 4)
+
+    await reset_seats(event_id)
+    assert await seats_state(event_id) == (old_version + 1, False)
+
+    await seed_seats(event_id, 2)
+    # The unused seats of a old reservation don't lower the new count.
+    await release_seats(event_id, granted, old_version)
+    assert used(event_id) == 2
+
+    await release_seats(event_id, 5)
+    assert used(event_id) == 0
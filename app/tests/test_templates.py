@@ -0,0 +1,35 @@
+"""
+Tests - Compiled email templates.
+"""
+
+import pytest
+
+from mails.templates.compiler import CompiledTemplate, minify
+from mails.templates.event_close import EVENT_CLOSE, event_close_template
+from mails.templates.special_message import SPECIAL_MESSAGE, special_message_template
+from mails.templates.welcome import WELCOME, welcome_template
+
+
+@pytest.mark.parametrize(
+    "template, source",
+    [
+        (WELCOME, welcome_template),
+        (EVENT_CLOSE, event_close_template),
+        (SPECIAL_MESSAGE, special_message_template),
+    ],
+)
+def test_render_is_the_minified_source(template, source):
+    values = {slot: f"<{slot}>" for slot in template.slots}
+    rendered = template.render(**values)
+
+    assert rendered == minify(source(*values.values()))
+    assert all(value in rendered for value in values.values())
+
+
+def test_values_are_not_formatted():
+    template = CompiledTemplate(
+        "test", lambda name: f"<p style='a:{{b}}'>\n  {name}</p>", "name"
+    )
+    rendered = template.render(name="{x} %s \\")
+
+    assert rendered == "<p style='a:{b}'> {x} %s \\</p>"
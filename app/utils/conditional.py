@@ -0,0 +1,164 @@
+"""
+Conditional GET - ETag and Last-Modified validators.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+
+######################
+# Auxiliar Functions #
+######################
+
+
+def _as_utc(date_time: datetime) -> datetime:
+    """
+    Return the datetime in UTC truncated to seconds (HTTP dates precision).
+    """
+    if date_time.tzinfo is None:
+        date_time = date_time.replace(tzinfo=timezone.utc)
+    return date_time.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def make_etag(*entities) -> str:
+    """
+    Derive a weak ETag from the number of entities and their id and
+    updated_at (then a removed entity changes it too).
+
+    Params:
+    ------
+    - entities: UnuBaseModel - The db models that build the representation.
+
+    Return:
+    ------
+    - etag: str - The weak validator. Eg: W/"9e107d9d372bb6826bd81d3542a419d6"
+    """
+    digest = hashlib.md5(f"{len(entities)};".encode())
+    for entitie in entities:
+        digest.update(f"{entitie.id}:{entitie.updated_at.isoformat()};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def last_modified(*entities) -> Optional[datetime]:
+    """
+    Return the most recent updated_at of the entities.
+    """
+    if not entities:
+        return None
+    return max(_as_utc(entitie.updated_at) for entitie in entities)
+
+
+def _strip_weak(etag: str) -> str:
+    """
+    Remove the weak prefix (weak comparison, RFC 7232 - 2.3.2).
+    """
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+#########################
+# Conditional Evaluator #
+#########################
+
+
+class ConditionalGet:
+    """
+    Dependency to answer read requests with 304 when the client copy is fresh.
+
+    Usage:
+    -----
+    conditional: ConditionalGet = Depends()
+    ...
+    not_modified = conditional.evaluate(entitie)
+    if not_modified:
+        return not_modified
+    """
+
+    cache_control = "private, no-cache"
+
+    def __init__(self, request: Request, response: Response):
+        self.if_none_match = request.headers.get("if-none-match")
+        self.if_modified_since = request.headers.get("if-modified-since")
+        self.response = response
+        self.headers = {}
+
+    def evaluate(self, *entities) -> Optional[Response]:
+        """
+        Compute the validators of the entities. If the request preconditions
+        match, return an empty 304 response (the body is never serialized).
+        Otherwise set the validators in the final response and return None.
+
+        Params:
+        ------
+        - entities: UnuBaseModel - The db models that build the representation.
+
+        Return:
+        ------
+        - response: Response | None - The 304 response if not modified.
+        """
+        return self.evaluate_validators(make_etag(*entities), last_modified(*entities))
+
+    def evaluate_collection(self, *entities) -> Optional[Response]:
+        """
+        Same as evaluate, for lists. Only the ETag is sent: a deleted entity
+        doesn't move the max updated_at, then If-Modified-Since would answer
+        a false 304 with a stale list.
+        """
+        return self.evaluate_validators(make_etag(*entities))
+
+    def evaluate_validators(
+        self, etag: str, modified_at: datetime = None, cache_control: str = None
+    ) -> Optional[Response]:
+        """
+        Same as evaluate, for representations with their own validators.
+        The headers are also kept in self.headers for custom responses
+        (Eg: StreamingResponse).
+
+        Params:
+        ------
+        - etag: str - The representation ETag.
+        - modified_at: datetime - The last modification date (optional).
+        - cache_control: str - Override the default Cache-Control.
+
+        Return:
+        ------
+        - response: Response | None - The 304 response if not modified.
+        """
+        self.headers = {
+            "ETag": etag,
+            "Cache-Control": cache_control or self.cache_control,
+        }
+        if modified_at:
+            last_modified_header = format_datetime(modified_at, usegmt=True)
+            self.headers.update({"Last-Modified": last_modified_header})
+
+        if self._is_fresh(etag, modified_at):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers=self.headers
+            )
+
+        self.response.headers.update(self.headers)
+        return None
+
+    def _is_fresh(self, etag: str, modified_at: Optional[datetime]) -> bool:
+        """
+        If-None-Match takes precedence over If-Modified-Since.
+        """
+        if self.if_none_match:
+            if self.if_none_match.strip() == "*":
+                return True
+            candidates = {_strip_weak(tag) for tag in self.if_none_match.split(",")}
+            return _strip_weak(etag) in candidates
+
+        if self.if_modified_since and modified_at:
+            try:
+                since = _as_utc(parsedate_to_datetime(self.if_modified_since))
+            except (TypeError, ValueError):
+                return False
+            return modified_at <= since
+
+        return False
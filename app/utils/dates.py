@@ -0,0 +1,49 @@
+"""
+Dates - Helpers to normalize the event dates.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+
+# Eg: -5 | +2 | UTC-03:00 | GMT+5:30
+UTC_OFFSET_REGEX = re.compile(r"([+-]?)(\d{1,2})(?::?(\d{2}))?\s*$")
+
+
+def utc_offset(utc: str) -> timedelta:
+    """
+    Parse the utc offset of a event. Unknown formats are taken as UTC.
+    """
+    match = UTC_OFFSET_REGEX.search(str(utc or ""))
+    if not match:
+        return timedelta()
+
+    sign, hours, minutes = match.groups()
+    offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+    return -offset if sign == "-" else offset
+
+
+def to_utc(local_date: str, utc: str) -> Optional[datetime]:
+    """
+    Convert the local start date of a event to a naive UTC datetime
+    (the format of the db timestamps).
+
+    Params:
+    ------
+    - local_date: str - ISO date in the event timezone. Eg: 2020-10-21T18:00
+    - utc: str - The event utc offset. Eg: -5
+
+    Return:
+    ------
+    - date: datetime - The date in UTC. None if the date isn't valid.
+    """
+    try:
+        date = datetime.fromisoformat(str(local_date).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+    # A date with its own offset doesn't need the event offset.
+    if date.tzinfo:
+        return date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date - utc_offset(utc)
@@ -0,0 +1,40 @@
+"""
+Fingerprints - Group the errors that have the same cause.
+"""
+
+import re
+from hashlib import sha1
+
+
+# The variable parts of a error message (ids, numbers, quoted values).
+VARIABLE_PARTS = [
+    (re.compile(r"[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}", re.I), "<id>"),
+    (re.compile(r"\b0x[0-9a-f]+\b", re.I), "<n>"),
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "<v>"),
+    (re.compile(r"\d+"), "<n>"),
+]
+
+
+def normalize_message(message: str) -> str:
+    """
+    Replace the variable parts of the message. Eg:
+    "Timeout after 30s on 'a@b.com'" -> "Timeout after <n>s on <v>"
+    """
+    for pattern, replacement in VARIABLE_PARTS:
+        message = pattern.sub(replacement, message)
+    return message.strip()
+
+
+def fingerprint(error_type: str, message: str, location: str = "") -> str:
+    """
+    Return a short hash of the error: same type, same place and same message
+    (without its variable parts).
+
+    Params:
+    ------
+    - error_type: str - The exception class name. Eg: ConnectionError
+    - message: str - The exception message.
+    - location: str - Where it was raised. Eg: the job function path.
+    """
+    key = f"{error_type}|{location}|{normalize_message(message)}"
+    return sha1(key.encode()).hexdigest()[:12]
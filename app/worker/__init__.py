@@ -1 +1 @@
-from .main import create_job
+from .main import create_job, create_job_async, enqueue_many, enqueue_many_async
@@ -0,0 +1,195 @@
+"""
+Concurrent worker - Run many jobs at once in a single process.
+
+Almost all our jobs wait on the network (email provider, storage, db), then
+a thread pool runs them concurrently instead of forking a process per job.
+Each queue can have a lower limit (Eg: don't let a campaign take all the
+threads). The db jobs of the threads share one event loop and connection
+pool (db.jobs.start_job_loop).
+
+There is no job timeout in threads mode (see NoDeathPenalty), then the
+entries of the running jobs in the started registries are extended while
+they run: a long job (Eg: a campaign chunk) is never moved to the failed
+registry (nor replayed as a dead letter) while it's still running. If the
+worker dies, its entries expire and rq fails them as usual.
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from rq.job import Job
+
+from rq import Queue
+from rq.exceptions import DequeueTimeout
+from rq.timeouts import BaseDeathPenalty
+from rq.worker import WorkerStatus
+
+from .priorities import PriorityWorker
+
+
+# Seconds to wait for a job (or a free slot) before checking again.
+POLL_TIMEOUT = 1
+# Seconds the started registry entry of a running job is kept after each
+# refresh (the refreshes run every job_monitoring_interval).
+STARTED_TTL_MARGIN = 60
+
+
+class NoDeathPenalty(BaseDeathPenalty):
+    """
+    The job timeouts use SIGALRM, only available in the main thread. The
+    jobs of a concurrent worker must finish by themselves (Eg: use the
+    timeouts of the http and db clients): their job.timeout is not enforced.
+    """
+
+    def setup_death_penalty(self):
+        pass
+
+    def cancel_death_penalty(self):
+        pass
+
+
+class ConcurrentWorker(PriorityWorker):
+    """
+    Worker that runs up to concurrency jobs in threads.
+
+    Params:
+    ------
+    - queues: List[str] - The queues to listen, by priority.
+    - concurrency: int - Max jobs running at once.
+    - queue_limits: Dict[str, int] - Optional max jobs running per queue.
+    - weights: Dict[str, int] - Optional weight per priority class.
+    """
+
+    death_penalty_class = NoDeathPenalty
+
+    def __init__(
+        self,
+        queues: List[str],
+        concurrency: int,
+        queue_limits: Dict[str, int] = None,
+        **kwargs,
+    ):
+        super().__init__(queues, **kwargs)
+        self.concurrency = concurrency
+        self.limits = {
+            queue.name: min(
+                (queue_limits or {}).get(queue.name, concurrency), concurrency
+            )
+            for queue in self.queues
+        }
+        self.running = Counter()
+        # job id: (job, queue) - The jobs running in the threads.
+        self.started: Dict[str, Tuple[Job, Queue]] = {}
+        self.started_refreshed_at = 0
+        self.slot_freed = threading.Condition()
+        self.executor = ThreadPoolExecutor(concurrency, thread_name_prefix=self.name)
+
+    def register_death(self) -> None:
+        """
+        Wait for the running jobs before leaving (warm shutdown).
+        """
+        self.executor.shutdown(wait=True)
+        super().register_death()
+
+    def execute_job(self, job, queue: Queue) -> None:
+        """
+        Start the job in a thread (the slot was taken by the dequeue).
+        """
+        self.set_state(WorkerStatus.BUSY)
+        with self.slot_freed:
+            self.started[job.id] = (job, queue)
+        self.executor.submit(self._perform, job, queue)
+
+    def dequeue_job_and_maintain_ttl(self, timeout: int):
+        """
+        Wait a job of the queues with free slots. Return None to stop: on a
+        warm shutdown, or in burst mode (timeout None) when the queues are
+        empty and no job is running.
+        """
+        self.procline("Listening on " + ",".join(self.queue_names()))
+
+        while not self._stop_requested:
+            self.heartbeat()
+            self._refresh_started()
+            if self.should_run_maintenance_tasks:
+                self.run_maintenance_tasks()
+
+            with self.slot_freed:
+                if not sum(self.running.values()):
+                    self.set_state(WorkerStatus.IDLE)
+                queues = self._free_queues()
+                if not queues:
+                    self.slot_freed.wait(POLL_TIMEOUT)
+                    continue
+
+            try:
+                result = self.queue_class.dequeue_any(
+                    queues,
+                    POLL_TIMEOUT if timeout else None,
+                    connection=self.connection,
+                    job_class=self.job_class,
+                )
+            except DequeueTimeout:
+                continue
+
+            if result:
+                job, queue = result
+                with self.slot_freed:
+                    self.running[queue.name] += 1
+                self.log.info("%s: %s", queue.name, job.id)
+                return result
+
+            with self.slot_freed:
+                if timeout is None and not sum(self.running.values()):
+                    return None
+                self.slot_freed.wait(POLL_TIMEOUT)
+
+        return None
+
+    def _free_queues(self) -> List[Queue]:
+        """
+        Return the queues under their limit (all if any slot is free).
+        """
+        if sum(self.running.values()) >= self.concurrency:
+            return []
+        return [
+            queue
+            for queue in self.ordered_queues()
+            if self.running[queue.name] < self.limits[queue.name]
+        ]
+
+    def _refresh_started(self) -> None:
+        """
+        Extend the started registry entries of the running jobs. Only the
+        entries still in the registry are updated (XX), then a job that just
+        finished is never added again.
+        """
+        now = time.monotonic()
+        if now - self.started_refreshed_at < self.job_monitoring_interval:
+            return
+        self.started_refreshed_at = now
+
+        with self.slot_freed:
+            started = list(self.started.values())
+        if not started:
+            return
+
+        expires_at = time.time() + self.job_monitoring_interval + STARTED_TTL_MARGIN
+        pipeline = self.connection.pipeline()
+        for job, queue in started:
+            pipeline.zadd(
+                queue.started_job_registry.key, {job.id: expires_at}, xx=True
+            )
+        pipeline.execute()
+
+    def _perform(self, job, queue: Queue) -> None:
+        try:
+            self.perform_job(job, queue)
+        finally:
+            with self.slot_freed:
+                self.started.pop(job.id, None)
+                self.running[queue.name] -= 1
+                self.slot_freed.notify()
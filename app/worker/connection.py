@@ -0,0 +1,32 @@
+"""
+Redis connection - One connection pool per process.
+
+The queues and the redis helpers of all the modules share this pool, then
+an enqueue reuses an open connection instead of opening a new one.
+"""
+
+from typing import Dict
+
+import redis
+from rq import Queue
+
+from config import settings
+
+
+redis_pool = redis.ConnectionPool.from_url(settings.REDIS_URL)
+redis_connection = redis.Redis(connection_pool=redis_pool)
+
+_queues: Dict[str, Queue] = {}
+
+
+def get_queue(name: str = "default") -> Queue:
+    """
+    Return the queue (built once per process) bound to the shared pool.
+
+    Params:
+    ------
+    - name: str - The name of the task queue.
+    """
+    if name not in _queues:
+        _queues[name] = Queue(name, connection=redis_connection)
+    return _queues[name]
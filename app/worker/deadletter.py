@@ -0,0 +1,370 @@
+"""
+Dead letters - The jobs that failed all their retries.
+
+The workers add each dead job to a store in redis (not the db, then the
+failures of a db outage are recorded too) with the fingerprint of its
+error, to find them by cause. After fixing the cause (Eg: a provider
+outage) the dead jobs are replayed in rate limited batches. Each dead
+entry is replayed once: the replay claims it by job id, then a second
+replay (or two admins at once) never enqueues it twice. A replayed job that
+fails again is a new dead entry (one more attempt) and can be replayed
+again. The guarantee is per entry, not per side effect: the replayed job
+runs the whole function again, then the jobs must be idempotent by
+themselves (Eg: the outbox sent marker, the campaign chunk job ids).
+
+Usage:
+-----
+python3 worker/deadletter.py summary --since 2020-10-21T10:00
+python3 worker/deadletter.py list --fingerprint 3f1a9c0b2d4e
+python3 worker/deadletter.py replay --function mails.campaigns --rate 20
+"""
+
+import argparse
+import json
+import logging
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
+
+from config import settings
+from utils.fingerprints import fingerprint
+from worker.connection import redis_connection, get_queue
+from worker.priorities import PRIORITY_QUEUES, LEGACY_QUEUES
+from worker.scheduler import to_epoch
+
+
+logger = logging.getLogger(__name__)
+
+
+########################
+# Dead Letter Settings #
+########################
+
+ENTRIES_KEY = "deadletter:entries"
+STATUS_KEY = "deadletter:status"
+INDEX_KEY = "deadletter:index"
+DEAD = "dead"
+REPLAYED = "replayed"
+RETENTION = 60 * 60 * 24 * 30  # One month
+# Old entries removed per new dead job.
+PRUNE_BATCH = 100
+SCAN_PAGE = 1000
+TRACEBACK_SIZE = 4000
+
+# KEYS[1]: status - ARGV: job ids. Mark the dead jobs as replayed and return
+# them (the rest were replayed already).
+CLAIM_REPLAY_SCRIPT = redis_connection.register_script(
+    """
+    local claimed = {}
+    for _, id in ipairs(ARGV) do
+        if redis.call("HGET", KEYS[1], id) == "dead" then
+            redis.call("HSET", KEYS[1], id, "replayed")
+            table.insert(claimed, id)
+        end
+    end
+    return claimed
+    """
+)
+
+
+##########
+# Record #
+##########
+
+
+def record(job: Job, error_type: str, message: str, trace: str = "") -> dict:
+    """
+    Add a dead job to the store (a replayed job that fails again is dead
+    again, with one more attempt).
+    """
+    previous = redis_connection.hget(ENTRIES_KEY, job.id)
+    attempts = json.loads(previous)["attempts"] + 1 if previous else 1
+    entry = {
+        "id": job.id,
+        "function": job.func_name,
+        "queue": job.origin,
+        "args": job.args,
+        "kwargs": job.kwargs,
+        "error_type": error_type,
+        "error": message[:1000],
+        "traceback": trace[-TRACEBACK_SIZE:],
+        "fingerprint": fingerprint(error_type, message, job.func_name),
+        "failed_at": time.time(),
+        "attempts": attempts,
+    }
+
+    pipeline = redis_connection.pipeline()
+    pipeline.hset(ENTRIES_KEY, job.id, json.dumps(entry, default=str))
+    pipeline.hset(STATUS_KEY, job.id, DEAD)
+    pipeline.zadd(INDEX_KEY, {job.id: entry["failed_at"]})
+    pipeline.execute()
+
+    prune(entry["failed_at"] - RETENTION)
+    return entry
+
+
+def prune(before: float, limit: int = PRUNE_BATCH) -> int:
+    """
+    Remove the entries older than before (epoch).
+    """
+    ids = redis_connection.zrangebyscore(INDEX_KEY, "-inf", before, start=0, num=limit)
+    if ids:
+        pipeline = redis_connection.pipeline()
+        pipeline.zrem(INDEX_KEY, *ids)
+        pipeline.hdel(ENTRIES_KEY, *ids)
+        pipeline.hdel(STATUS_KEY, *ids)
+        pipeline.execute()
+    return len(ids)
+
+
+def dead_letter_handler(job: Job, exc_type, exc_value, exc_traceback) -> bool:
+    """
+    Worker exception handler: record the job if it has no retries left.
+    """
+    if job.get_status() == JobStatus.FAILED:
+        trace = "".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
+        record(job, exc_type.__name__, str(exc_value), trace)
+    return True
+
+
+def collect() -> int:
+    """
+    Record the failed jobs of the rq registries that aren't in the store
+    (Eg: the work horse was killed, or they failed before the store).
+    Periodic job.
+    """
+    collected = 0
+    for name in dict.fromkeys(PRIORITY_QUEUES + list(LEGACY_QUEUES) + settings.QUEUES):
+        registry = get_queue(name).failed_job_registry
+        for job_id in registry.get_job_ids():
+            if redis_connection.hexists(STATUS_KEY, job_id):
+                continue
+            try:
+                job = Job.fetch(job_id, connection=redis_connection)
+            except NoSuchJobError:
+                continue
+
+            trace = job.exc_info or ""
+            error_type, _, message = trace.strip().rpartition("\n")[-1].partition(": ")
+            record(job, error_type or "Error", message, trace)
+            collected += 1
+
+    logger.info("Dead letters collected: %s", collected)
+    return collected
+
+
+########
+# Find #
+########
+
+
+def find(
+    function: str = None,
+    queue: str = None,
+    error: str = None,
+    since: float = "-inf",
+    until: float = "+inf",
+    status: Optional[str] = DEAD,
+) -> Iterator[dict]:
+    """
+    Yield the entries that match the filters, from the oldest. The index is
+    paged by failure date (not offset), then an entry that fails again while
+    iterating (Eg: in a replay) moves after the until date and the rest of
+    the entries are never skipped.
+
+    Params:
+    ------
+    - function: str - Prefix of the job function path. Eg: mails.campaigns
+    - queue: str - The queue of the jobs.
+    - error: str - The error fingerprint.
+    - since, until: float - Range of the failure dates (epoch).
+    - status: str - dead, replayed or None for both.
+    """
+    # The ids of the last date already read (the next page starts on it).
+    seen = set()
+    while True:
+        page = redis_connection.zrangebyscore(
+            INDEX_KEY, since, until, start=0, num=SCAN_PAGE + len(seen), withscores=True
+        )
+        ids = [job_id for job_id, _ in page if job_id not in seen]
+        if not ids:
+            return
+        since = page[-1][1]
+        seen = {job_id for job_id, score in page if score == since}
+
+        pipeline = redis_connection.pipeline()
+        pipeline.hmget(ENTRIES_KEY, ids)
+        pipeline.hmget(STATUS_KEY, ids)
+        entries, statuses = pipeline.execute()
+
+        for entry, entry_status in zip(entries, statuses):
+            entry_status = (entry_status or b"").decode()
+            if not entry or (status and entry_status != status):
+                continue
+            entry = json.loads(entry)
+            if function and not entry["function"].startswith(function):
+                continue
+            if queue and entry["queue"] != queue:
+                continue
+            if error and entry["fingerprint"] != error:
+                continue
+            yield {**entry, "status": entry_status}
+
+
+def summary(**filters) -> List[dict]:
+    """
+    Return the matching entries grouped by error fingerprint, the most
+    frequent first.
+    """
+    groups = {}
+    counts = Counter()
+    for entry in find(**filters):
+        counts[entry["fingerprint"]] += 1
+        groups[entry["fingerprint"]] = entry
+
+    return [
+        {
+            "fingerprint": key,
+            "count": count,
+            "function": groups[key]["function"],
+            "error_type": groups[key]["error_type"],
+            "error": groups[key]["error"],
+            "last_failed_at": datetime.utcfromtimestamp(groups[key]["failed_at"]),
+        }
+        for key, count in counts.most_common()
+    ]
+
+
+##########
+# Replay #
+##########
+
+
+def _replay_job(entry: dict) -> Job:
+    """
+    Return the rq job of the entry. If rq removed it already, it's built
+    again from the entry (only for json args).
+    """
+    try:
+        return Job.fetch(entry["id"], connection=redis_connection)
+    except NoSuchJobError:
+        return get_queue(entry["queue"]).create_job(
+            entry["function"],
+            args=entry["args"],
+            kwargs=entry["kwargs"],
+            job_id=entry["id"],
+        )
+
+
+def replay(
+    batch_size: int = 100, rate: float = 10, dry_run: bool = False, **filters
+) -> int:
+    """
+    Enqueue the dead jobs that match the filters again, in batches of
+    batch_size at most rate jobs per second.
+
+    Return:
+    ------
+    - replayed: int - The jobs enqueued.
+    """
+    filters = {"until": time.time(), **filters, "status": DEAD}
+    replayed = 0
+    batch = []
+
+    def _enqueue(entries: List[dict]) -> int:
+        if dry_run:
+            return len(entries)
+
+        claimed = set(
+            CLAIM_REPLAY_SCRIPT(keys=[STATUS_KEY], args=[e["id"] for e in entries])
+        )
+        pipeline = redis_connection.pipeline()
+        for entry in entries:
+            if entry["id"].encode() not in claimed:
+                continue
+            job = _replay_job(entry)
+            queue = get_queue(entry["queue"])
+            queue.failed_job_registry.remove(job, pipeline=pipeline)
+            queue.enqueue_job(job, pipeline=pipeline)
+        pipeline.execute()
+        return len(claimed)
+
+    for entry in find(**filters):
+        batch.append(entry)
+        if len(batch) < batch_size:
+            continue
+
+        started = time.monotonic()
+        replayed += _enqueue(batch)
+        batch = []
+        time.sleep(max(batch_size / rate - (time.monotonic() - started), 0))
+
+    if batch:
+        replayed += _enqueue(batch)
+    return replayed
+
+
+#######
+# CLI #
+#######
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect and replay dead jobs.")
+    parser.add_argument("command", choices=["summary", "list", "replay", "collect"])
+    parser.add_argument("--function", help="Prefix of the job function path.")
+    parser.add_argument("--queue")
+    parser.add_argument("--fingerprint")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="UTC date.")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="UTC date.")
+    parser.add_argument("--replayed", action="store_true", help="Only replayed.")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=10, help="Jobs per second.")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "collect":
+        collect()
+        return
+
+    filters = {
+        "function": args.function,
+        "queue": args.queue,
+        "error": args.fingerprint,
+        "since": to_epoch(args.since) if args.since else "-inf",
+        "until": to_epoch(args.until) if args.until else "+inf",
+    }
+    if args.command == "summary":
+        for group in summary(**filters):
+            print(
+                f"{group['fingerprint']} x{group['count']} {group['function']}"
+                f" - {group['error_type']}: {group['error']}"
+                f" (last: {group['last_failed_at']:%Y-%m-%d %H:%M})"
+            )
+    elif args.command == "list":
+        status = REPLAYED if args.replayed else DEAD
+        for index, entry in enumerate(find(**filters, status=status)):
+            if index >= args.limit:
+                break
+            failed_at = datetime.utcfromtimestamp(entry["failed_at"])
+            print(
+                f"{entry['id']} {failed_at:%Y-%m-%d %H:%M} {entry['function']}"
+                f" [{entry['fingerprint']}] x{entry['attempts']}"
+                f" - {entry['error_type']}: {entry['error']}"
+            )
+    else:
+        if args.until is None:
+            filters.pop("until")
+        replayed = replay(args.batch, args.rate, args.dry_run, **filters)
+        action = "Would replay" if args.dry_run else "Replayed"
+        print(f"{action}: {replayed} jobs")
+
+
+if __name__ == "__main__":
+    main()
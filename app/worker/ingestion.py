@@ -0,0 +1,42 @@
+"""
+Ingestion worker - Commit the queued registrations in batches.
+
+Usage:
+-----
+python3 worker/ingestion.py
+python3 worker/ingestion.py --replay-dead
+"""
+
+import argparse
+import logging
+import socket
+
+from rq.defaults import DEFAULT_LOGGING_DATE_FORMAT, DEFAULT_LOGGING_FORMAT
+
+from db.jobs import run_db_job
+from api.v1.participants.ingestion import (
+    consume_registrations,
+    replay_dead_registrations,
+)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format=DEFAULT_LOGGING_FORMAT,
+        datefmt=DEFAULT_LOGGING_DATE_FORMAT,
+    )
+    parser = argparse.ArgumentParser(description="Commit the queued registrations.")
+    parser.add_argument(
+        "--replay-dead",
+        action="store_true",
+        help="Push the dead registrations back to the stream and exit.",
+    )
+    if parser.parse_args().replay_dead:
+        print(f"Replayed: {replay_dead_registrations()} registrations")
+        raise SystemExit(0)
+
+    # Stable per container, then a restarted worker recovers its pending entries.
+    consumer_name = socket.gethostname()
+    print(f" -- Ingestion worker starting: {consumer_name} -- ")
+    run_db_job(consume_registrations, consumer_name)
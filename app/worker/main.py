@@ -2,25 +2,44 @@
 Redis Queue Module - For manage background process.
 """
 
+import logging
+import os
+import signal
 from datetime import datetime, timedelta
+from multiprocessing import Process
+from typing import Iterable, List
 
-import redis
-from rq import Queue, Connection, Retry, Worker
+from fastapi.concurrency import run_in_threadpool
+from rq import Connection, Retry
+from rq.defaults import DEFAULT_LOGGING_DATE_FORMAT, DEFAULT_LOGGING_FORMAT
 
 from config import settings
+from db.jobs import start_job_loop
+from worker.concurrent import ConcurrentWorker
+from worker.connection import redis_connection, get_queue
+from worker.deadletter import dead_letter_handler
+from worker.metrics import inc
+from worker.periodic import schedule_all
+from worker.priorities import PriorityWorker, route, worker_queues
+from worker.scheduler import coalesce, schedule_at
 
 
 #############
 # Job Queue #
 #############
 
+# Default seconds to coalesce the jobs with the same dedupe key.
+COALESCE_WINDOW = 10
+
 
 def create_job(
     function: callable,
     *args,
     date_time: datetime = None,
     utc_hours: int = 0,
-    queue_name: str = "email",
+    queue_name: str = None,
+    dedupe_key: str = None,
+    coalesce_window: float = COALESCE_WINDOW,
     **kwargs,
 ) -> str:
     """
@@ -30,56 +49,177 @@ def create_job(
     ------
     - function: callable - The job function
     - date_time: datetime - The specific time when the job must be executed
+      (see worker.scheduler, the params must be json serializable).
     - utc_hours: int - Eg: -5 or +2 The specific GTM.
-    - queue_name: str - The name of the task queue.
+    - queue_name: str - The name of the task queue (default the priority
+      class of the function, see worker.priorities).
+    - dedupe_key: str - Only the last job of the key runs: once per
+      coalesce_window, or at date_time (the params must be json serializable).
+      Eg: reminder:<event id>
+    - coalesce_window: float - Seconds to coalesce the jobs of the dedupe key.
 
     Return:
     ------
     - job_id: str - The specifc job id
     """
-    with Connection(redis.from_url(settings.REDIS_URL)):
-
-        # Task to be schedule inmediatly.
-        if not date_time:
-            redis_queue_default = Queue()
-            job = redis_queue_default.enqueue(f=function, args=args, kwargs=kwargs)
-            return job.get_id()
-
-        # Task with schedule datetime.
-        redis_queue = Queue(queue_name)
-
-        # Fix the correct time to execute.
-        utc_to_place_time = datetime.utcnow() + timedelta(hours=utc_hours)
-        seconds = date_time - utc_to_place_time
-        minutes = seconds.seconds / 60
-
-        # Enqueue the job.
-        job = redis_queue.enqueue_in(
-            time_delta=timedelta(minutes=minutes),
-            func=function,
-            kwargs=kwargs,
-            retry=Retry(max=3, interval=[10, 30, 60]),
+    queue_name = queue_name or route(function)
+
+    # Task coalesced with the other ones of its key in the window.
+    if dedupe_key and not date_time:
+        return coalesce(
+            function,
+            dedupe_key,
+            coalesce_window,
+            *args,
+            queue_name=queue_name,
+            **kwargs,
         )
 
+    # Task to be schedule inmediatly.
+    if not date_time:
+        job = get_queue(queue_name).enqueue(f=function, args=args, kwargs=kwargs)
+        inc("rq_jobs_enqueued_total", {"queue": queue_name, "function": job.func_name})
         return job.get_id()
 
+    # Task with schedule datetime (the place time to UTC).
+    run_at = date_time - timedelta(hours=utc_hours)
+    job_id = f"dedupe:{dedupe_key}" if dedupe_key else None
+    return schedule_at(
+        function, run_at, *args, job_id=job_id, queue_name=queue_name, **kwargs
+    )
+
+
+def enqueue_many(
+    function: callable,
+    jobs: Iterable[dict],
+    queue_name: str = None,
+    retry: Retry = None,
+) -> List[str]:
+    """
+    Add many jobs of the same function in a single round trip (one redis
+    pipeline). Eg: the chunks of a campaign.
+
+    Params:
+    ------
+    - function: callable - The job function
+    - jobs: Iterable[dict] - The args (tuple), kwargs (dict) and optional
+      job_id of each job.
+    - queue_name: str - The name of the task queue (default the priority
+      class of the function).
+    - retry: Retry - Optional retries of each job.
+
+    Return:
+    ------
+    - job_ids: List[str] - The ids, in the same order.
+    """
+    queue = get_queue(queue_name or route(function))
+
+    with redis_connection.pipeline() as pipeline:
+        enqueued = [
+            queue.enqueue_job(
+                queue.create_job(
+                    function,
+                    args=job.get("args"),
+                    kwargs=job.get("kwargs"),
+                    job_id=job.get("job_id"),
+                    retry=retry,
+                ),
+                pipeline=pipeline,
+            )
+            for job in jobs
+        ]
+        if enqueued:
+            labels = {"queue": queue.name, "function": enqueued[0].func_name}
+            inc("rq_jobs_enqueued_total", labels, len(enqueued), pipeline)
+        pipeline.execute()
+
+    return [job.get_id() for job in enqueued]
+
+
+async def create_job_async(function: callable, *args, **kwargs) -> str:
+    """
+    Same as create_job, without blocking the event loop (async handlers).
+    """
+    return await run_in_threadpool(create_job, function, *args, **kwargs)
+
+
+async def enqueue_many_async(
+    function: callable, jobs: Iterable[dict], **kwargs
+) -> List[str]:
+    """
+    Same as enqueue_many, without blocking the event loop (async handlers).
+    """
+    return await run_in_threadpool(enqueue_many, function, list(jobs), **kwargs)
+
 
 ######################
 # Queue Worker Setup #
 ######################
 
 
-def __run_worker__() -> None:
+def _start_worker(name: str) -> None:
     """
-    Start a worker to manage the enqueue jobs.
+    Run one worker process until it's stopped.
     """
-    redis_url = settings.REDIS_URL
-    redis_connection = redis.from_url(redis_url)
+    queues = worker_queues(settings.QUEUES)
+    weights = settings.WORKER_PRIORITY_WEIGHTS
+
     with Connection(redis_connection):
-        worker = Worker(settings.QUEUES, name="unu-worker")
+        if settings.WORKER_MODE == "threads":
+            start_job_loop()
+            worker = ConcurrentWorker(
+                queues,
+                concurrency=settings.WORKER_CONCURRENCY,
+                queue_limits=settings.WORKER_QUEUE_LIMITS,
+                weights=weights,
+                exception_handlers=[dead_letter_handler],
+                name=name,
+            )
+        else:
+            worker = PriorityWorker(
+                queues,
+                weights=weights,
+                exception_handlers=[dead_letter_handler],
+                name=name,
+            )
         worker.work(with_scheduler=True)
 
 
+def __run_worker__() -> None:
+    """
+    Start the workers to manage the enqueue jobs (WORKER_PROCESSES named
+    <WORKER_NAME>-<n>). A SIGTERM is passed to all of them.
+    """
+    schedule_all()
+    if settings.WORKER_PROCESSES <= 1:
+        _start_worker(settings.WORKER_NAME)
+        return
+
+    workers = [
+        Process(target=_start_worker, args=(f"{settings.WORKER_NAME}-{number}",))
+        for number in range(1, settings.WORKER_PROCESSES + 1)
+    ]
+    for worker in workers:
+        worker.start()
+
+    def _stop_workers(signum, frame):
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signum)
+
+    # Ctrl+C already reaches the whole process group.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _stop_workers)
+    for worker in workers:
+        worker.join()
+
+
 if __name__ == "__main__":
+    # The logs of the jobs in the rq format.
+    logging.basicConfig(
+        level=logging.INFO,
+        format=DEFAULT_LOGGING_FORMAT,
+        datefmt=DEFAULT_LOGGING_DATE_FORMAT,
+    )
     print(" -- Redis Worker starting -- ")
     __run_worker__()
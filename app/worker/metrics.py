@@ -0,0 +1,228 @@
+"""
+Metrics - Counters and histograms of the jobs.
+
+The workers run in many processes (and fork a process per job), then the
+metrics are kept in a redis hash shared by all of them: each field is a
+Prometheus series. Eg: rq_jobs_total{queue="bulk",function="...",status="failed"}
+The API renders them in the Prometheus text format (render).
+"""
+
+import math
+import re
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from redis.client import Pipeline
+from rq import Worker
+from rq.job import Job
+
+from .connection import redis_connection
+
+
+####################
+# Metrics Settings #
+####################
+
+METRICS_KEY = "metrics:jobs"
+# Seconds of the histograms buckets (from a email send to a campaign).
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, math.inf)
+
+# name: (type, help)
+METRICS = {
+    "rq_jobs_enqueued_total": ("counter", "Jobs enqueued."),
+    "rq_jobs_total": ("counter", "Jobs run by status (finished, retried, failed)."),
+    "rq_job_wait_seconds": ("histogram", "Seconds from the enqueue to the start."),
+    "rq_job_run_seconds": ("histogram", "Seconds running the job."),
+}
+
+SERIES_REGEX = re.compile(r"^(\w+?)(_bucket|_sum|_count)?\{(.*)\}$")
+LABEL_REGEX = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _series(name: str, labels: Dict[str, str]) -> str:
+    values = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels.items()
+    )
+    return f"{name}{{{values}}}" if values else name
+
+
+def _le(bucket: float) -> str:
+    return "+Inf" if bucket == math.inf else str(bucket)
+
+
+############
+# Registry #
+############
+
+
+def inc(name: str, labels: Dict[str, str], amount: int = 1, pipeline=None) -> None:
+    """
+    Increment a counter. Pass a pipeline to send it with other commands.
+    """
+    (pipeline or redis_connection).hincrby(METRICS_KEY, _series(name, labels), amount)
+
+
+def observe(name: str, labels: Dict[str, str], value: float, pipeline=None) -> None:
+    """
+    Add a value to a histogram (its buckets are cumulative).
+    """
+    pipe = pipeline or redis_connection.pipeline()
+    for bucket in BUCKETS:
+        if value <= bucket:
+            pipe.hincrby(
+                METRICS_KEY, _series(f"{name}_bucket", {**labels, "le": _le(bucket)}), 1
+            )
+    pipe.hincrbyfloat(METRICS_KEY, _series(f"{name}_sum", labels), value)
+    pipe.hincrby(METRICS_KEY, _series(f"{name}_count", labels), 1)
+    if pipeline is None:
+        pipe.execute()
+
+
+def read() -> Dict[str, float]:
+    """
+    Return all the series and their values.
+    """
+    return {
+        series.decode(): float(value)
+        for series, value in redis_connection.hgetall(METRICS_KEY).items()
+    }
+
+
+def series_labels(name: str, series: Dict[str, float]) -> List[Tuple[dict, float]]:
+    """
+    Return the labels and value of each series of a counter.
+    """
+    found = []
+    for key, value in series.items():
+        match = SERIES_REGEX.match(key)
+        if match and match.group(1) == name and not match.group(2):
+            found.append((dict(LABEL_REGEX.findall(match.group(3))), value))
+    return found
+
+
+def histogram(name: str, labels: Dict[str, str], series: Dict[str, float]) -> dict:
+    """
+    Return the count, mean and approximate p50 / p95 (the upper bound of
+    their bucket) of a histogram.
+    """
+    count = series.get(_series(f"{name}_count", labels), 0)
+    total = series.get(_series(f"{name}_sum", labels), 0)
+    buckets = [
+        (
+            bucket,
+            series.get(_series(f"{name}_bucket", {**labels, "le": _le(bucket)}), 0),
+        )
+        for bucket in BUCKETS
+    ]
+
+    def quantile(q: float) -> float:
+        for bucket, observed in buckets:
+            if count and observed >= q * count:
+                return bucket
+        return 0
+
+    return {
+        "count": int(count),
+        "mean": round(total / count, 3) if count else 0,
+        "p50": quantile(0.5),
+        "p95": quantile(0.95),
+    }
+
+
+def render(gauges: Iterable[Tuple[str, str, Dict[str, str], float]] = ()) -> str:
+    """
+    Return the metrics in the Prometheus text format.
+
+    Params:
+    ------
+    - gauges: (name, help, labels, value) - Values read on each scrape.
+      Eg: the depth of each queue.
+    """
+    grouped: Dict[str, List[Tuple[tuple, str]]] = {name: [] for name in METRICS}
+    for series, value in read().items():
+        match = SERIES_REGEX.match(series)
+        if not match or match.group(1) not in grouped:
+            continue
+        name, suffix, labels = match.groups()
+        le = re.search(r'le="([^"]+)"', labels)
+        order = (re.sub(r',?le="[^"]+"', "", labels), suffix or "", _sort_le(le))
+        grouped[name].append((order, f"{series} {_number(value)}"))
+
+    lines = []
+    for name, (metric_type, help_text) in METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+        lines += [line for _, line in sorted(grouped[name])]
+
+    gauge_lines = {}
+    for name, help_text, labels, value in gauges:
+        if name not in gauge_lines:
+            gauge_lines[name] = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        gauge_lines[name].append(f"{_series(name, labels)} {_number(value)}")
+    for metric_lines in gauge_lines.values():
+        lines += metric_lines
+
+    return "\n".join(lines) + "\n"
+
+
+def _sort_le(match) -> float:
+    if not match:
+        return math.inf
+    return math.inf if match.group(1) == "+Inf" else float(match.group(1))
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+###########
+# Workers #
+###########
+
+
+def _seconds(start: datetime, end: datetime) -> float:
+    return max((end - start).total_seconds(), 0) if start and end else None
+
+
+def observe_job(job: Job, queue_name: str, status: str, pipeline: Pipeline) -> None:
+    """
+    Count a run of the job and observe its wait and run times.
+    """
+    labels = {"queue": queue_name}
+    inc(
+        "rq_jobs_total",
+        {**labels, "function": job.func_name, "status": status},
+        1,
+        pipeline,
+    )
+
+    wait = _seconds(job.enqueued_at, job.started_at)
+    if wait is not None:
+        observe("rq_job_wait_seconds", labels, wait, pipeline)
+    run = _seconds(job.started_at, job.ended_at)
+    if run is not None:
+        observe("rq_job_run_seconds", labels, run, pipeline)
+
+
+class InstrumentedWorker(Worker):
+    """
+    Worker that records the metrics of each job it runs.
+    """
+
+    def handle_job_success(self, job: Job, queue, started_job_registry) -> None:
+        super().handle_job_success(job, queue, started_job_registry)
+        self._record(job, queue.name, "finished")
+
+    def handle_job_failure(self, job: Job, queue, *args, **kwargs) -> None:
+        retried = bool(job.retries_left and job.retries_left > 0)
+        super().handle_job_failure(job, queue, *args, **kwargs)
+        self._record(job, queue.name, "retried" if retried else "failed")
+
+    def _record(self, job: Job, queue_name: str, status: str) -> None:
+        # The metrics never change the result of the job.
+        try:
+            pipeline = redis_connection.pipeline(transaction=False)
+            observe_job(job, queue_name, status, pipeline)
+            pipeline.execute()
+        except Exception:  # pylint: disable=broad-except
+            self.log.warning("Job metrics not recorded: %s", job.id, exc_info=True)
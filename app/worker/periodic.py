@@ -0,0 +1,63 @@
+"""
+Periodic jobs - Jobs that schedule their next run when they finish.
+"""
+
+import time
+
+from rq.utils import import_attribute
+
+from .priorities import route
+from .scheduler import schedule_at
+
+
+#################
+# Periodic Jobs #
+#################
+
+# (function path, interval in seconds)
+PERIODIC_JOBS = [
+    ("api.v1.participants.jobs.reconcile_counts", 60 * 10),
+    ("mails.outbox.dispatch_outbox", 5),
+    ("api.v1.mails.jobs.send_reminders", 60 * 30),
+    ("worker.priorities.report_queues", 60),
+    ("worker.deadletter.collect", 60 * 10),
+]
+
+
+def schedule_periodic(function_path: str, interval: int) -> None:
+    """
+    Schedule the next run of a periodic job (worker.scheduler), at the start
+    of the next interval. The job id is fixed, then scheduling it again (Eg:
+    on each worker start) only replaces it.
+
+    Params:
+    ------
+    - function_path: str - The dotted path of the job function.
+    - interval: int - Seconds between runs.
+    """
+    schedule_at(
+        run_periodic,
+        (time.time() // interval + 1) * interval,
+        function_path,
+        interval,
+        job_id=f"periodic:{function_path}",
+        queue_name=route(function_path),
+    )
+
+
+def run_periodic(function_path: str, interval: int) -> None:
+    """
+    Run the job and schedule the next run, even if this one fails.
+    """
+    try:
+        import_attribute(function_path)()
+    finally:
+        schedule_periodic(function_path, interval)
+
+
+def schedule_all() -> None:
+    """
+    Schedule all the periodic jobs.
+    """
+    for function_path, interval in PERIODIC_JOBS:
+        schedule_periodic(function_path, interval)
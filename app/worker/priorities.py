@@ -0,0 +1,175 @@
+"""
+Priorities - Priority classes of the jobs.
+
+Each class is a rq queue. The jobs are routed to their class by function
+(ROUTES), then a password reset is never waiting behind a campaign:
+
+- critical: transactional emails (outbox dispatcher, password reset).
+- default: the rest of the jobs.
+- bulk: mass emails and maintenance (Eg: the campaign chunks).
+
+The workers take the jobs by strict priority, or by weights if
+WORKER_PRIORITY_WEIGHTS is set (Eg: {"critical": 10, "default": 3,
+"bulk": 1}, then bulk is never starved).
+"""
+
+import logging
+import random
+from datetime import datetime
+from typing import Callable, Dict, List, Union
+
+from rq import Queue
+
+from .connection import get_queue
+from .metrics import InstrumentedWorker
+
+
+logger = logging.getLogger(__name__)
+
+
+#####################
+# Priority Settings #
+#####################
+
+CRITICAL = "critical"
+NORMAL = "default"
+BULK = "bulk"
+# From the highest priority.
+PRIORITY_QUEUES = [CRITICAL, NORMAL, BULK]
+# Old queues still drained by the workers, with the priority of their class.
+LEGACY_QUEUES = {"email": BULK}
+
+# Function path -> priority class (default NORMAL).
+ROUTES = {
+    "mails.outbox.dispatch_outbox": CRITICAL,
+    "mails.service.send_welcome_email": CRITICAL,
+    "mails.service.send_recovery_password_email": CRITICAL,
+    "mails.campaigns.send_campaign_chunk": BULK,
+    "api.v1.participants.jobs.reconcile_counts": BULK,
+    "worker.deadletter.collect": BULK,
+}
+
+
+###########
+# Routing #
+###########
+
+
+def function_path(function: Union[Callable, str]) -> str:
+    """
+    Return the dotted path of a job function.
+    """
+    if isinstance(function, str):
+        return function
+    return f"{function.__module__}.{function.__qualname__}"
+
+
+def route(function: Union[Callable, str]) -> str:
+    """
+    Return the queue (priority class) of a job function.
+    """
+    return ROUTES.get(function_path(function), NORMAL)
+
+
+def worker_queues(names: List[str]) -> List[str]:
+    """
+    Return the queues a worker listens: all the priority classes and the
+    other passed queues, sorted by priority.
+    """
+    names = list(dict.fromkeys(PRIORITY_QUEUES + names))
+    rank = {name: index for index, name in enumerate(PRIORITY_QUEUES)}
+    return sorted(names, key=lambda name: rank.get(LEGACY_QUEUES.get(name, name), 1))
+
+
+###########
+# Workers #
+###########
+
+
+def weighted_order(queues: List[Queue], weights: Dict[str, int]) -> List[Queue]:
+    """
+    Return the queues in a random order where each queue goes first with a
+    probability proportional to its weight (weighted sampling without
+    replacement). The queues without weight go last.
+    """
+
+    def key(queue: Queue) -> float:
+        name = LEGACY_QUEUES.get(queue.name, queue.name)
+        weight = weights.get(name, 0)
+        return random.random() ** (1 / weight) if weight > 0 else -1
+
+    return sorted(queues, key=key, reverse=True)
+
+
+class PriorityWorker(InstrumentedWorker):
+    """
+    Worker that takes the jobs by strict priority (the order of the queues),
+    or by weights if given.
+
+    Params:
+    ------
+    - queues: List[str] - The queues to listen, by priority.
+    - weights: Dict[str, int] - Optional weight per priority class.
+    """
+
+    def __init__(self, queues: List[str], weights: Dict[str, int] = None, **kwargs):
+        super().__init__(queues, **kwargs)
+        self.weights = weights or {}
+        self.priority_queues = list(self.queues)
+
+    def ordered_queues(self) -> List[Queue]:
+        """
+        Return the queues in the order to take the next job.
+        """
+        if not self.weights:
+            return self.priority_queues
+        return weighted_order(self.priority_queues, self.weights)
+
+    def dequeue_job_and_maintain_ttl(self, timeout: int):
+        self.queues = self.ordered_queues()
+        return super().dequeue_job_and_maintain_ttl(timeout)
+
+
+##########
+# Report #
+##########
+
+
+def queue_stats() -> List[dict]:
+    """
+    Return the depth and the wait (seconds since the oldest job was
+    enqueued) of each priority class.
+    """
+    now = datetime.utcnow()
+    stats = []
+    for name in PRIORITY_QUEUES + list(LEGACY_QUEUES):
+        queue = get_queue(name)
+        oldest = queue.get_jobs(0, 1)
+        wait = 0
+        if oldest and oldest[0].enqueued_at:
+            wait = max((now - oldest[0].enqueued_at).total_seconds(), 0)
+        stats.append(
+            {
+                "queue": name,
+                "priority": LEGACY_QUEUES.get(name, name),
+                "depth": queue.count,
+                "wait": round(wait, 3),
+                "running": queue.started_job_registry.count,
+            }
+        )
+    return stats
+
+
+def report_queues() -> None:
+    """
+    Periodic job: log the depth and wait of each priority class.
+    """
+    for stat in queue_stats():
+        logger.info(
+            "Queue %s (%s) - depth: %s - wait: %ss - running: %s",
+            stat["queue"],
+            stat["priority"],
+            stat["depth"],
+            stat["wait"],
+            stat["running"],
+        )
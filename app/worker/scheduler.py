@@ -0,0 +1,328 @@
+"""
+Scheduler - Delayed jobs at absolute UTC timestamps.
+
+The scheduled jobs are kept in a redis sorted set (score: the UTC epoch
+to run) and their payloads in a hash, then schedule, cancel and
+reschedule are O(log n) and the due jobs are taken with a single range
+query. The scheduler process promotes the due jobs to their rq queue in
+batches.
+
+Usage:
+-----
+schedule_at(send_reminder, run_at, "<event id>", job_id="reminder:<event id>")
+reschedule("reminder:<event id>", new_run_at)
+cancel("reminder:<event id>")
+coalesce(rebuild_snapshot, "snapshot:<event id>", 30, "<event id>")
+
+python3 worker/scheduler.py
+"""
+
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Union
+from uuid import uuid4
+
+from rq import Retry
+from rq.defaults import DEFAULT_LOGGING_DATE_FORMAT, DEFAULT_LOGGING_FORMAT
+
+from worker.connection import redis_connection, get_queue
+from worker.metrics import inc
+from worker.priorities import function_path, route
+
+
+######################
+# Scheduler Settings #
+######################
+
+SCHEDULE_KEY = "scheduler:schedule"
+PAYLOADS_KEY = "scheduler:payloads"
+# Due jobs promoted per round trip.
+PROMOTE_BATCH = 1000
+# Max seconds between two promotions (the next due job is waited exactly).
+POLL_INTERVAL = 1
+# Seconds a promoted job is kept in the schedule, in case the promoter dies
+# before enqueuing it. If it dies after enqueuing it (before removing it),
+# the job is enqueued again after the lease: the scheduled jobs run at least
+# once, then they must be idempotent (Eg: the reminder mark).
+PROMOTE_LEASE = 60
+JOB_RETRY = Retry(max=3, interval=[10, 30, 60])
+
+# KEYS[1]: schedule, KEYS[2]: payloads - ARGV: now, limit, lease.
+# Move the due jobs to now + lease and return [id, score, payload, ...].
+CLAIM_DUE_SCRIPT = redis_connection.register_script(
+    """
+    local due = redis.call(
+        "ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[1], "WITHSCORES", "LIMIT", 0, ARGV[2]
+    )
+    local claimed = {}
+    for i = 1, #due, 2 do
+        local id = due[i]
+        local payload = redis.call("HGET", KEYS[2], id)
+        if payload then
+            redis.call("ZADD", KEYS[1], tonumber(ARGV[1]) + tonumber(ARGV[3]), id)
+            table.insert(claimed, id)
+            table.insert(claimed, due[i + 1])
+            table.insert(claimed, payload)
+        else
+            redis.call("ZREM", KEYS[1], id)
+        end
+    end
+    return claimed
+    """
+)
+
+# KEYS[1]: schedule, KEYS[2]: payloads - ARGV: lease score, [id, payload]...
+# Remove the promoted jobs, unless they were changed while promoted (Eg: a
+# coalesced call), then they run again after the lease.
+REMOVE_PROMOTED_SCRIPT = redis_connection.register_script(
+    """
+    local lease = tonumber(ARGV[1])
+    for i = 2, #ARGV, 2 do
+        local id = ARGV[i]
+        if tonumber(redis.call("ZSCORE", KEYS[1], id)) == lease
+            and redis.call("HGET", KEYS[2], id) == ARGV[i + 1] then
+            redis.call("ZREM", KEYS[1], id)
+            redis.call("HDEL", KEYS[2], id)
+        end
+    end
+    """
+)
+
+
+def to_epoch(run_at: Union[datetime, float]) -> float:
+    """
+    Return the UTC epoch of the date. The naive datetimes are taken as UTC
+    (the format of the db timestamps).
+    """
+    if not isinstance(run_at, datetime):
+        return float(run_at)
+    if not run_at.tzinfo:
+        run_at = run_at.replace(tzinfo=timezone.utc)
+    return run_at.timestamp()
+
+
+#################
+# Schedule Jobs #
+#################
+
+
+def schedule_at(
+    function: Union[Callable, str],
+    run_at: Union[datetime, float],
+    *args,
+    job_id: str = None,
+    queue_name: str = None,
+    **kwargs,
+) -> str:
+    """
+    Schedule a job. Scheduling an existing job id replaces it.
+
+    Params:
+    ------
+    - function: callable | str - The job function (or its dotted path).
+    - run_at: datetime | float - When to run it (UTC datetime or epoch).
+    - job_id: str - Optional fixed id. Eg: reminder:<event id>
+    - queue_name: str - The rq queue of the job (default its priority class).
+
+    Return:
+    ------
+    - job_id: str - The id to reschedule or cancel the job.
+    """
+    job_id = job_id or uuid4().hex
+    payload = {
+        "function": function_path(function),
+        "args": args,
+        "kwargs": kwargs,
+        "queue": queue_name or route(function),
+    }
+
+    pipeline = redis_connection.pipeline()
+    pipeline.hset(PAYLOADS_KEY, job_id, json.dumps(payload))
+    pipeline.zadd(SCHEDULE_KEY, {job_id: to_epoch(run_at)})
+    pipeline.execute()
+    return job_id
+
+
+def coalesce(
+    function: Union[Callable, str],
+    key: str,
+    window: float,
+    *args,
+    queue_name: str = None,
+    **kwargs,
+) -> str:
+    """
+    Run the job once per window and key, with the params of the last call.
+    The first call of a window schedules the job at the end of it, the next
+    ones only replace its params (atomic, in one transaction).
+
+    Params:
+    ------
+    - function: callable | str - The job function (or its dotted path).
+    - key: str - The coalescing key. Eg: reminder:<event id>
+    - window: float - Seconds of the window.
+    - queue_name: str - The rq queue of the job (default its priority class).
+
+    Return:
+    ------
+    - job_id: str - The id of the job of the window.
+    """
+    window_number = int(time.time() // window)
+    job_id = f"coalesce:{key}:{window_number}"
+    payload = {
+        "function": function_path(function),
+        "args": args,
+        "kwargs": kwargs,
+        "queue": queue_name or route(function),
+    }
+
+    pipeline = redis_connection.pipeline()
+    pipeline.hset(PAYLOADS_KEY, job_id, json.dumps(payload))
+    pipeline.zadd(SCHEDULE_KEY, {job_id: (window_number + 1) * window}, nx=True)
+    pipeline.execute()
+    return job_id
+
+
+def reschedule(job_id: str, run_at: Union[datetime, float]) -> bool:
+    """
+    Move a scheduled job. Return False if the job isn't scheduled.
+    """
+    if redis_connection.zscore(SCHEDULE_KEY, job_id) is None:
+        return False
+
+    redis_connection.zadd(SCHEDULE_KEY, {job_id: to_epoch(run_at)}, xx=True)
+    return True
+
+
+def cancel(job_id: str) -> bool:
+    """
+    Remove a scheduled job. Return False if the job isn't scheduled.
+    """
+    pipeline = redis_connection.pipeline()
+    pipeline.zrem(SCHEDULE_KEY, job_id)
+    pipeline.hdel(PAYLOADS_KEY, job_id)
+    removed, _ = pipeline.execute()
+    return bool(removed)
+
+
+def scheduled_at(job_id: str) -> Optional[datetime]:
+    """
+    Return when the job runs (UTC). None if it isn't scheduled.
+    """
+    score = redis_connection.zscore(SCHEDULE_KEY, job_id)
+    if score is None:
+        return None
+    return datetime.fromtimestamp(score, timezone.utc)
+
+
+def list_scheduled(
+    start: Union[datetime, float] = "-inf",
+    end: Union[datetime, float] = "+inf",
+    offset: int = 0,
+    limit: int = 100,
+) -> List[dict]:
+    """
+    Return a page of the scheduled jobs between two dates, by run date.
+    """
+    entries = redis_connection.zrangebyscore(
+        SCHEDULE_KEY,
+        start if isinstance(start, str) else to_epoch(start),
+        end if isinstance(end, str) else to_epoch(end),
+        start=offset,
+        num=limit,
+        withscores=True,
+    )
+    if not entries:
+        return []
+
+    payloads = redis_connection.hmget(PAYLOADS_KEY, [job_id for job_id, _ in entries])
+    return [
+        {
+            "id": job_id.decode(),
+            "run_at": datetime.fromtimestamp(score, timezone.utc),
+            **json.loads(payload or "{}"),
+        }
+        for (job_id, score), payload in zip(entries, payloads)
+    ]
+
+
+#############
+# Promotion #
+#############
+
+
+def promote_due(now: float = None, limit: int = PROMOTE_BATCH) -> int:
+    """
+    Enqueue the due jobs in their queues (in one pipeline) and remove them
+    from the schedule. The rq job id is <schedule id>:<run score>, one per
+    run: the schedule id is kept to reschedule or cancel the next runs and
+    a new run never replaces the rq job of the previous one.
+
+    Return:
+    ------
+    - promoted: int - The jobs enqueued.
+    """
+    now = now or time.time()
+    claimed = CLAIM_DUE_SCRIPT(
+        keys=[SCHEDULE_KEY, PAYLOADS_KEY], args=[now, limit, PROMOTE_LEASE]
+    )
+    if not claimed:
+        return 0
+
+    ids, scores, payloads = claimed[::3], claimed[1::3], claimed[2::3]
+    enqueued = Counter()
+    pipeline = redis_connection.pipeline()
+    for job_id, score, payload in zip(ids, scores, payloads):
+        payload = json.loads(payload)
+        enqueued[payload["queue"], payload["function"]] += 1
+        queue = get_queue(payload["queue"])
+        job = queue.create_job(
+            payload["function"],
+            args=payload["args"],
+            kwargs=payload["kwargs"],
+            job_id=f"{job_id.decode()}:{score.decode()}",
+            retry=JOB_RETRY,
+        )
+        queue.enqueue_job(job, pipeline=pipeline)
+    for (queue_name, function), count in enqueued.items():
+        labels = {"queue": queue_name, "function": function}
+        inc("rq_jobs_enqueued_total", labels, count, pipeline)
+    pipeline.execute()
+
+    # Only the jobs not rescheduled meanwhile (still in the lease) are removed.
+    promoted = [item for pair in zip(ids, payloads) for item in pair]
+    REMOVE_PROMOTED_SCRIPT(
+        keys=[SCHEDULE_KEY, PAYLOADS_KEY], args=[now + PROMOTE_LEASE, *promoted]
+    )
+
+    return len(ids)
+
+
+def run_scheduler() -> None:
+    """
+    Promote the due jobs forever. Many schedulers can run: each due job is
+    claimed by only one of them.
+    """
+    while True:
+        promoted = promote_due()
+        if promoted >= PROMOTE_BATCH:
+            continue
+
+        next_job = redis_connection.zrange(SCHEDULE_KEY, 0, 0, withscores=True)
+        wait = POLL_INTERVAL
+        if next_job:
+            wait = min(max(next_job[0][1] - time.time(), 0), POLL_INTERVAL)
+        time.sleep(wait)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format=DEFAULT_LOGGING_FORMAT,
+        datefmt=DEFAULT_LOGGING_DATE_FORMAT,
+    )
+    print(" -- Scheduler starting -- ")
+    run_scheduler()